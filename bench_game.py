@@ -0,0 +1,214 @@
+"""
+X/Y/Z カード対戦ゲーム - ゲームロジックのマイクロベンチマーク
+- game01.py / game01_streamlit.py / game02_eng_streamlit.py の関数を計測
+- ウォームアップ + 繰り返し計測で中央値とばらつき（四分位範囲）を出す
+- 結果をJSONのベースラインに保存し、比較して遅くなった関数を検出
+
+使い方:
+    python bench_game.py run --save baseline.json
+    python bench_game.py run --save new.json
+    python bench_game.py compare baseline.json new.json --threshold 0.10
+"""
+
+import argparse
+import ast
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import timeit
+
+GAME_MODULES = ['game01.py', 'game01_streamlit.py', 'game02_eng_streamlit.py']
+BENCH_FUNCTIONS = [
+    'deal_hand', 'get_hand_rank', 'get_majority', 'compare_hands',
+    'exchange_cards', 'get_cpu_comment', 'get_card_reveal', 'display_cards',
+]
+
+CARDS = ['X', 'Y', 'Z']
+ALL_HANDS = [[a, b, c] for a in CARDS for b in CARDS for c in CARDS]
+HAND_PAIRS = [(ALL_HANDS[i], ALL_HANDS[(i * 7 + 3) % 27]) for i in range(27)]
+WIN_COUNTS = [0, 15, 40, 70, 150, 250]  # 各難易度モードから1つずつ
+
+
+# =============================================================================
+# 計測対象の読み込み
+# =============================================================================
+def load_game_functions(path):
+    """
+    Streamlitの画面部分を実行せずに、ファイル内の関数と定数だけを読み込む
+    （import streamlit とデコレータ付きの関数は読み飛ばす）
+    """
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    body = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            if not any(alias.name.startswith('streamlit') for alias in node.names):
+                body.append(node)
+        elif isinstance(node, ast.ImportFrom):
+            if not (node.module or '').startswith('streamlit'):
+                body.append(node)
+        elif isinstance(node, ast.FunctionDef) and not node.decorator_list:
+            body.append(node)
+        elif isinstance(node, ast.Assign) and all(
+            isinstance(target, ast.Name) and target.id.isupper() for target in node.targets
+        ):
+            body.append(node)
+
+    namespace = {'__name__': 'bench_' + os.path.splitext(os.path.basename(path))[0]}
+    exec(compile(ast.Module(body=body, type_ignores=[]), path, 'exec'), namespace)
+    return namespace
+
+
+def make_cases(module):
+    """関数名 → (引数なしで呼べる計測用関数, 1回の呼び出しで処理する件数)"""
+    cases = {}
+    if 'deal_hand' in module:
+        deal_hand = module['deal_hand']
+        cases['deal_hand'] = (deal_hand, 1)
+    for name in ['get_hand_rank', 'get_majority', 'display_cards']:
+        if name in module:
+            fn = module[name]
+            cases[name] = (lambda fn=fn: [fn(hand) for hand in ALL_HANDS], len(ALL_HANDS))
+    if 'compare_hands' in module:
+        fn = module['compare_hands']
+        cases['compare_hands'] = (lambda fn=fn: [fn(p, c) for p, c in HAND_PAIRS], len(HAND_PAIRS))
+    if 'exchange_cards' in module:
+        fn = module['exchange_cards']
+        positions = list(module['POSITION_TO_INDEX'])
+        args = [(p, c, positions[i % 3], positions[i // 3 % 3]) for i, (p, c) in enumerate(HAND_PAIRS)]
+        cases['exchange_cards'] = (lambda fn=fn, args=args: [fn(*a) for a in args], len(args))
+    for name in ['get_cpu_comment', 'get_card_reveal']:
+        if name in module:
+            fn = module[name]
+            args = [(hand, wc) for hand in ALL_HANDS for wc in WIN_COUNTS]
+            cases[name] = (lambda fn=fn, args=args: [fn(*a) for a in args], len(args))
+    return cases
+
+
+# =============================================================================
+# 計測
+# =============================================================================
+def measure(func, per_call, repeat=15, warmup=3, min_time=0.02):
+    """
+    1件あたりの実行時間（ナノ秒）を計測
+    - ループ回数は1回の計測が約 min_time 秒になるよう決める
+    - warmup 回捨ててから repeat 回計測し、中央値と四分位範囲を返す
+    """
+    timer = timeit.Timer(func)
+    loops, elapsed = timer.autorange()
+    loops = max(1, int(min_time * loops / elapsed))
+
+    for _ in range(warmup):
+        timer.timeit(loops)
+
+    samples = []
+    for _ in range(repeat):
+        samples.append(timer.timeit(loops) / loops / per_call * 1e9)
+
+    quartiles = statistics.quantiles(samples, n=4)
+    return {
+        'median_ns': statistics.median(samples),
+        'iqr_ns': quartiles[2] - quartiles[0],
+        'min_ns': min(samples),
+        'max_ns': max(samples),
+        'loops': loops,
+        'repeat': repeat,
+    }
+
+
+def run_benchmarks(modules=GAME_MODULES, functions=BENCH_FUNCTIONS, repeat=15, warmup=3, seed=0):
+    """全モジュール×全関数を計測して、結果の辞書を返す"""
+    results = {}
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    for filename in modules:
+        module = load_game_functions(os.path.join(base_dir, filename))
+        cases = make_cases(module)
+        for name in functions:
+            if name not in cases:
+                continue  # このモジュールにない関数
+            func, per_call = cases[name]
+            random.seed(seed)  # 乱数を使う関数も毎回同じ条件で
+            key = f"{os.path.splitext(filename)[0]}.{name}"
+            results[key] = measure(func, per_call, repeat=repeat, warmup=warmup)
+            stats = results[key]
+            print(f"{key:40s} {stats['median_ns']:10.1f} ns  ±{stats['iqr_ns']:7.1f} (IQR)")
+    return {
+        'meta': {
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'repeat': repeat,
+            'warmup': warmup,
+        },
+        'results': results,
+    }
+
+
+def compare_results(baseline, current, threshold=0.10):
+    """
+    中央値を比べて、threshold（0.10 = 10%）より遅くなった関数のリストを返す
+    ばらつき（IQR）より小さい差は誤差として扱う
+    """
+    regressions = []
+    for key, base in baseline['results'].items():
+        new = current['results'].get(key)
+        if new is None:
+            continue
+        change = (new['median_ns'] - base['median_ns']) / base['median_ns']
+        noise = max(base['iqr_ns'], new['iqr_ns'])
+        slower = change > threshold and new['median_ns'] - base['median_ns'] > noise
+        mark = "遅くなった!" if slower else ""
+        print(f"{key:40s} {base['median_ns']:10.1f} → {new['median_ns']:10.1f} ns  {change:+7.1%}  {mark}")
+        if slower:
+            regressions.append((key, change))
+    return regressions
+
+
+# =============================================================================
+# コマンドライン
+# =============================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="X/Y/Z ゲームロジックのベンチマーク")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = sub.add_parser('run', help="計測する")
+    run_parser.add_argument('--save', help="結果を保存するJSONファイル")
+    run_parser.add_argument('--repeat', type=int, default=15)
+    run_parser.add_argument('--warmup', type=int, default=3)
+    run_parser.add_argument('--filter', default='', help="関数名の一部で絞り込む")
+
+    compare_parser = sub.add_parser('compare', help="2つのJSONを比較する")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.10)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        functions = [name for name in BENCH_FUNCTIONS if args.filter in name]
+        data = run_benchmarks(functions=functions, repeat=args.repeat, warmup=args.warmup)
+        if args.save:
+            with open(args.save, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            print(f"保存しました: {args.save}")
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, encoding='utf-8') as f:
+        current = json.load(f)
+    regressions = compare_results(baseline, current, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} 個の関数が {args.threshold:.0%} 以上遅くなりました")
+        return 1
+    print("\n遅くなった関数はありません")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
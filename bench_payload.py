@@ -0,0 +1,80 @@
+"""
+X/Y/Z カード対戦ゲーム - 再実行1回あたりの送信量を計測
+- streamlit.testing の AppTest でアプリを実行し、画面を作る要素の数と
+  protobuf のバイト数（WebSocketで送られるデルタの中身）を数える
+- 通常表示（full）と軽量表示（lite, ?render=lite）を比べる
+
+使い方:
+    python bench_payload.py
+"""
+
+import os
+import sys
+
+from streamlit.testing.v1 import AppTest
+
+APP_FILE = 'game01_streamlit.py'
+
+# 画面, プレイヤー手札, CPU手札, 連勝数（結果画面は勝ち・負け・引き分け）
+SCENARIOS = [
+    ('playing', ['X', 'X', 'Y'], ['Z', 'Y', 'Z'], 3),
+    ('result(勝ち)', ['X', 'X', 'X'], ['Z', 'Y', 'Z'], 9),
+    ('result(負け)', ['X', 'X', 'Y'], ['Z', 'Z', 'Z'], 3),
+    ('result(引分)', ['X', 'Y', 'Z'], ['Z', 'Y', 'X'], 3),
+]
+
+
+def count_payload(node):
+    """要素ツリーをたどって (要素数, ブロック数, バイト数) を返す"""
+    elements = blocks = size = 0
+    proto = getattr(node, 'proto', None)
+    if proto is not None:
+        size += proto.ByteSize()
+    children = getattr(node, 'children', None)
+    if isinstance(children, dict):
+        if proto is not None:
+            blocks += 1
+        for child in children.values():
+            e, b, s = count_payload(child)
+            elements += e
+            blocks += b
+            size += s
+    elif proto is not None:
+        elements += 1
+    return elements, blocks, size
+
+
+def measure_screen(render, screen, player_hand, cpu_hand, win_count):
+    """指定した画面を1回再実行したときの送信量を計測"""
+    at = AppTest.from_file(APP_FILE, default_timeout=30)
+    at.query_params['render'] = render
+    at.session_state['game_state'] = screen.split('(')[0]
+    at.session_state['player_hand'] = player_hand
+    at.session_state['cpu_hand'] = cpu_hand
+    at.session_state['win_count'] = win_count
+    at.session_state['result_processed'] = True
+    at.session_state['last_exchange'] = None
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return count_payload(at.main)
+
+
+def main():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    os.chdir(base_dir)
+    sys.path.insert(0, base_dir)
+
+    print(f"{'画面':14s} {'表示':5s} {'要素':>5s} {'ブロック':>6s} {'バイト':>7s}")
+    for screen, player_hand, cpu_hand, win_count in SCENARIOS:
+        rows = {}
+        for render in ['full', 'lite']:
+            rows[render] = measure_screen(render, screen, player_hand, cpu_hand, win_count)
+            elements, blocks, size = rows[render]
+            print(f"{screen:14s} {render:5s} {elements:5d} {blocks:6d} {size:7d}")
+        saved = 1 - rows['lite'][2] / rows['full'][2]
+        print(f"{'':14s} → 要素 {rows['full'][0]}→{rows['lite'][0]}、バイト {saved:.0%} 削減\n")
+
+
+if __name__ == "__main__":
+    main()
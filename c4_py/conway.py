@@ -1,69 +1,438 @@
 # Conwayのライフゲーム
-import random, time, copy, sys
+#
+# 使い方:
+#     python conway.py                                   # 60×20 をターミナルに表示
+#     python conway.py --width 120 --height 40 --seed 1 --delay 0.1 --half-block
+#     python conway.py --width 200 --height 100 --delay 0 --fps 20 --engine numpy   # 計算は全速、表示は20回/秒
+#     python conway.py --no-render --engine numpy --width 4096 --height 4096 --generations 100
+#     python conway.py --pattern gosper.rle --offset 10,10 --width 80 --height 40
+#     python conway.py --rule B36/S23 --engine numpy
+#     python conway.py --no-render --engine numpy --width 8192 --height 8192 --generations 1000000 --checkpoint run.ckpt
+#     python conway.py --no-render --resume run.ckpt --generations 1000000   # Ctrl-C で止めたところから続ける
+#     python conway.py --no-render --engine numpy --generations 100000 --stats stats.csv --stop-on-extinction
+import argparse, asyncio, contextlib, importlib, random, time, sys
 WIDTH = 60
 HEIGHT = 20
 
-# セルを格納するリストのリストを作成
-next_cells = []
-for x in range(WIDTH):
-    column = [] # 新しい列を作成
-    for y in range(HEIGHT):
-        if random.randint(0, 1) == 0:
-            column.append('#') # 生きたセルを追加
-        else:
-            column.append(' ') # 死んだセルを追加
-    next_cells.append(column) # next_cellsは列のリストのリスト
-
-try:
-    while True: # メインループ
-        print('\n' * 5) # ステップ間を開業で分ける
-        current_cells = copy.deepcopy(next_cells)
-
-        # current_cellsの内容を表示する
-        for y in range(HEIGHT):
-            for x in range(WIDTH):
-                print(current_cells[x][y], end='') # #または空白を表示
-            print() # 各行の終わりで改行する
-
-        # 現在のセルに基づきnext_cellsの内容を計算する
-        for x in range(WIDTH):
-            for y in range(HEIGHT):
-                # 隣接座標を取得
-                # `% WIDTH`により left_coord を0〜WIDTH-1の範囲の値にする
-                left_coord  = (x - 1) % WIDTH
-                right_coord = (x + 1) % WIDTH
-                above_coord = (y - 1) % HEIGHT
-                below_coord = (y + 1) % HEIGHT
-
-                # 生きた隣接セルの数を数える
-                num_neighbors = 0
-                if current_cells[left_coord][above_coord] == '#':
-                    num_neighbors += 1 # 左上
-                if current_cells[x][above_coord] == '#':
-                    num_neighbors += 1 # 上
-                if current_cells[right_coord][above_coord] == '#':
-                    num_neighbors += 1 # 右上
-                if current_cells[left_coord][y] == '#':
-                    num_neighbors += 1 # 左
-                if current_cells[right_coord][y] == '#':
-                    num_neighbors += 1 # 右
-                if current_cells[left_coord][below_coord] == '#':
-                    num_neighbors += 1 # 左下
-                if current_cells[x][below_coord] == '#':
-                    num_neighbors += 1 # 下
-                if current_cells[right_coord][below_coord] == '#':
-                    num_neighbors += 1 # 右下
-
-                # ライフゲームのルールに基づき、次の世代のセルを決定する
-                if current_cells[x][y] == '#' and (num_neighbors == 2 or num_neighbors == 3):
-                    # 生きたセルに隣接する生きたセルが2個か3個
-                    next_cells[x][y] = '#' # 生きたセルはそのまま生きる
-                elif current_cells[x][y] == ' ' and num_neighbors == 3:
-                    # 死んだセルに隣接する生きたセルが3個
-                    next_cells[x][y] = '#' # 死んだセルは誕生する
+# B3/S23 以外のルール（--rule）を使えるエンジン
+RULE_ENGINES = ('fast', 'numpy', 'active', 'tiled')
+# エンジン名 → (モジュール, クラス)。reference はこのファイルの next_generation
+# （hashlife だけは盤面の端がつながらない無限平面で計算する）
+ENGINES = {
+    'reference': None,
+    'fast': ('conway_fast', 'FastLife'),
+    'bitboard': ('conway_bitboard', 'BitboardLife'),
+    'numpy': ('conway_numpy', 'NumpyLife'),
+    'bitslice': ('conway_bitslice', 'BitsliceLife'),
+    'hashlife': ('conway_hashlife', 'HashLife'),
+    'tiled': ('conway_tiled', 'TiledLife'),
+    'active': ('conway_active', 'ActiveLife'),
+}
+# 盤面の端がつながらない無限平面で計算するエンジン（端に届くと他のエンジンと結果が変わる）
+PLANE_ENGINES = ('hashlife',)
+# チェックポイントを取りながら進めるとき、まとめて step() する1回の長さの目安（秒）
+# （Ctrl-C は step() の間は待たせるので、だいたいこの時間以内に止まる）
+CHUNK_SECONDS = 0.5
+
+
+def random_cells(width=WIDTH, height=HEIGHT, density=0.5, seed=None):
+    """ランダムな盤面（列のリストのリスト）を作る（density は生きたセルの割合）"""
+    rng = random.Random(seed)
+    # セルを格納するリストのリストを作成
+    next_cells = []
+    for x in range(width):
+        column = [] # 新しい列を作成
+        for y in range(height):
+            if rng.random() < density:
+                column.append('#') # 生きたセルを追加
+            else:
+                column.append(' ') # 死んだセルを追加
+        next_cells.append(column) # next_cellsは列のリストのリスト
+    return next_cells
+
+
+def next_generation(current_cells):
+    """現在のセルに基づき次の世代のセルを計算する（他のエンジンの基準になる実装）"""
+    width = len(current_cells)
+    height = len(current_cells[0])
+    next_cells = [[' '] * height for _ in range(width)]
+
+    for x in range(width):
+        for y in range(height):
+            # 隣接座標を取得
+            # `% width`により left_coord を0〜width-1の範囲の値にする
+            left_coord  = (x - 1) % width
+            right_coord = (x + 1) % width
+            above_coord = (y - 1) % height
+            below_coord = (y + 1) % height
+
+            # 生きた隣接セルの数を数える
+            num_neighbors = 0
+            if current_cells[left_coord][above_coord] == '#':
+                num_neighbors += 1 # 左上
+            if current_cells[x][above_coord] == '#':
+                num_neighbors += 1 # 上
+            if current_cells[right_coord][above_coord] == '#':
+                num_neighbors += 1 # 右上
+            if current_cells[left_coord][y] == '#':
+                num_neighbors += 1 # 左
+            if current_cells[right_coord][y] == '#':
+                num_neighbors += 1 # 右
+            if current_cells[left_coord][below_coord] == '#':
+                num_neighbors += 1 # 左下
+            if current_cells[x][below_coord] == '#':
+                num_neighbors += 1 # 下
+            if current_cells[right_coord][below_coord] == '#':
+                num_neighbors += 1 # 右下
+
+            # ライフゲームのルールに基づき、次の世代のセルを決定する
+            if current_cells[x][y] == '#' and (num_neighbors == 2 or num_neighbors == 3):
+                # 生きたセルに隣接する生きたセルが2個か3個
+                next_cells[x][y] = '#' # 生きたセルはそのまま生きる
+            elif current_cells[x][y] == ' ' and num_neighbors == 3:
+                # 死んだセルに隣接する生きたセルが3個
+                next_cells[x][y] = '#' # 死んだセルは誕生する
+            else:
+                next_cells[x][y] = ' ' # その他の場合は死ぬ
+    return next_cells
+
+
+def print_cells(cells):
+    """セルの内容を表示する"""
+    for y in range(len(cells[0])):
+        for x in range(len(cells)):
+            print(cells[x][y], end='') # #または空白を表示
+        print() # 各行の終わりで改行する
+
+
+def cells_to_bytes(cells):
+    """盤面を行優先の bytes（1=生, 0=死、長さ 幅×高さ）に変換する（エンジン間の受け渡し用）"""
+    width = len(cells)
+    height = len(cells[0])
+    return bytes(1 if cells[x][y] == '#' else 0 for y in range(height) for x in range(width))
+
+
+def bytes_to_cells(width, height, data):
+    """cells_to_bytes の逆変換"""
+    return [['#' if data[y * width + x] else ' ' for y in range(height)] for x in range(width)]
+
+
+def random_bytes(width=WIDTH, height=HEIGHT, density=0.5, seed=None):
+    """ランダムな盤面を行優先の bytes で作る（大きな盤面向け。割合の刻みは1/256）"""
+    rng = random.Random(seed)
+    threshold = round(density * 256)
+    table = bytes(1 if b < threshold else 0 for b in range(256))
+    return rng.randbytes(width * height).translate(table)
+
+
+class ReferenceLife:
+    """next_generation をそのまま使うエンジン（他のエンジンと同じ使い方ができるようにしたもの）"""
+
+    def __init__(self, cells):
+        self.cells = cells
+        self.width = len(cells)
+        self.height = len(cells[0])
+        self.generation = 0
+
+    @classmethod
+    def from_cells(cls, cells):
+        return cls(cells)
+
+    @classmethod
+    def from_bytes(cls, width, height, data):
+        return cls(bytes_to_cells(width, height, data))
+
+    def step(self, generations=1):
+        for _ in range(generations):
+            self.cells = next_generation(self.cells)
+            self.generation += 1
+
+    def population(self):
+        return sum(column.count('#') for column in self.cells)
+
+    def to_cells(self):
+        return self.cells
+
+    def to_bytes(self):
+        return cells_to_bytes(self.cells)
+
+
+def make_engine(name, width, height, data, rule=None):
+    """エンジン名と盤面の bytes からエンジンを作る（必要なモジュールだけ読み込む）"""
+    if ENGINES[name] is None:
+        return ReferenceLife.from_bytes(width, height, data)
+    module_name, class_name = ENGINES[name]
+    engine_class = getattr(importlib.import_module(module_name), class_name)
+    if rule is not None:
+        return engine_class.from_bytes(width, height, data, rule=rule)
+    return engine_class.from_bytes(width, height, data)
+
+
+def parse_args(argv=None):
+    """コマンドライン引数を読む"""
+    parser = argparse.ArgumentParser(description='Conwayのライフゲーム')
+    parser.add_argument('--width', type=int, default=None, help=f'盤面の幅（省略時: {WIDTH}）')
+    parser.add_argument('--height', type=int, default=None, help=f'盤面の高さ（省略時: {HEIGHT}）')
+    parser.add_argument('--density', type=float, default=0.5, help='最初に生きているセルの割合')
+    parser.add_argument('--seed', type=int, default=None, help='乱数の種（同じ種なら同じ盤面）')
+    parser.add_argument('--generations', type=int, default=None,
+                        help='何世代目まで進めるか（省略時: 表示ありなら無限、表示なしなら100）')
+    parser.add_argument('--engine', choices=list(ENGINES), default='reference', help='計算に使うエンジン')
+    parser.add_argument('--no-render', action='store_true', help='表示せずに計測だけする')
+    parser.add_argument('--delay', type=float, default=1.0, help='表示のときの1世代ごとの待ち時間（秒）。0 なら全速で計算する')
+    parser.add_argument('--fps', type=float, default=30.0,
+                        help='1秒に描く回数の上限（計算が速いときは途中の世代を飛ばして描く）')
+    parser.add_argument('--asyncio', action='store_true', help='表示を asyncio のタスクで動かす')
+    parser.add_argument('--half-block', action='store_true', help='上下2行を1文字にまとめて表示する')
+    parser.add_argument('--rule', default=None,
+                        help=f'B/S 記法のルール（例: B36/S23, highlife）。使えるエンジン: {", ".join(RULE_ENGINES)}')
+    parser.add_argument('--stop-on-cycle', action='store_true',
+                        help='表示なしのとき、盤面がくり返しになった時点で計算をやめる（残りは周期で飛ばす）')
+    parser.add_argument('--stats', help='表示なしのとき、世代ごとの統計を書くファイル（.csv ならCSV、それ以外はバイナリ）')
+    parser.add_argument('--stop-on-extinction', action='store_true', help='表示なしのとき、生きたセルがなくなったら止める')
+    parser.add_argument('--pattern', help='ランダムの代わりに読み込むパターンファイル（.rle / .cells）')
+    parser.add_argument('--offset', default='0,0', help='パターンを置く位置 x,y')
+    parser.add_argument('--no-wrap', action='store_true', help='盤面からはみ出したパターンを折り返さずに捨てる')
+    parser.add_argument('--checkpoint', help='途中の盤面を定期的に保存するファイル（Ctrl-C のときも保存する）')
+    parser.add_argument('--checkpoint-interval', type=float, default=60.0, help='チェックポイントを保存する間隔（秒）')
+    parser.add_argument('--resume', help='チェックポイントから再開する（盤面・エンジン・ルールはファイルのものを使う）')
+    args = parser.parse_args(argv)
+    if args.stop_on_cycle and (args.stats or args.stop_on_extinction):
+        parser.error('--stop-on-cycle は --stats / --stop-on-extinction と一緒には使えません')
+    args.rule_given = args.rule is not None  # B3/S23 を指定したときもパターンファイルのルールより優先する
+    if args.rule is not None:
+        from conway_rules import is_life
+
+        try:
+            if is_life(args.rule):
+                args.rule = None  # ふつうのライフゲームはどのエンジンでも使える
+            elif args.engine not in RULE_ENGINES:
+                parser.error(f'--engine {args.engine} は B3/S23 にしか対応していません')
+        except ValueError as e:
+            parser.error(str(e))
+    return args
+
+
+def run_headless(engine, target, stop_on_cycle=False, checkpointer=None):
+    """表示せずに target 世代目まで進め、世代/秒 と セル更新/秒 を表示する"""
+    first = engine.generation  # チェックポイントから再開したときは0でない
+    start = time.perf_counter()
+    if stop_on_cycle:
+        from conway_cycle import CycleDetector
+
+        detector = CycleDetector(engine)
+        while not detector.found and engine.generation < target:
+            detector.step()
+            if checkpointer is not None:
+                checkpointer.maybe_save(engine)
+        if detector.found:
+            print(f'{detector.start} 世代目から周期 {detector.period} のくり返し')
+    elif checkpointer is None:
+        engine.step(target - engine.generation)
+    else:
+        step_with_checkpoints(engine, target, checkpointer)
+    generations = engine.generation - first  # 実際に計算した世代数
+    elapsed = time.perf_counter() - start
+    per_second = generations / elapsed if elapsed > 0 else float('inf')
+    print(f'{generations} 世代 / {elapsed:.3f} 秒: {per_second:,.1f} 世代/秒, '
+          f'{per_second * engine.width * engine.height:,.0f} セル更新/秒, 生きたセル {engine.population():,}')
+    if stop_on_cycle and detector.found and target > engine.generation:
+        detector.fast_forward(target)
+        print(f'{target} 世代目まで周期で飛ばしました: 生きたセル {engine.population():,}')
+
+
+def step_with_checkpoints(engine, target, checkpointer):
+    """
+    target 世代目まで、次の保存（か CHUNK_SECONDS）までに終わる世代数ずつまとめて進める
+    1回に進める世代数は、直前の1世代あたりの時間から決める（急に増やしすぎないよう前回の2倍まで）
+    """
+    chunk = 1
+    while engine.generation < target:
+        chunk = min(chunk, target - engine.generation)
+        start = time.perf_counter()
+        engine.step(chunk)
+        per_generation = (time.perf_counter() - start) / chunk
+        checkpointer.maybe_save(engine)
+        budget = min(checkpointer.seconds_until_save(), CHUNK_SECONDS)
+        fits = int(budget / per_generation) if per_generation > 0 else 2 * chunk
+        chunk = max(1, min(fits, 2 * chunk))
+
+
+def run_stats(engine, target, path=None, stop_on_extinction=False, checkpointer=None):
+    """表示せずに target 世代目まで進めながら世代ごとの統計を取り、path に書いて最後にまとめを表示する"""
+    import conway_stats
+
+    records = conway_stats.generation_stats(engine, target)
+    if stop_on_extinction:
+        records = conway_stats.stop_on_extinction(records)
+    average = conway_stats.RollingAverage(100)
+    summary = conway_stats.RunningSummary()
+    activity = conway_stats.RunningSummary('activity')
+    observers = [average, summary, activity]
+    if checkpointer is not None:
+        observers.append(lambda record: checkpointer.maybe_save(engine))
+    with conway_stats.open_sink(path) if path else contextlib.nullcontext() as sink:
+        if sink is not None:
+            observers.append(sink)
+        start = time.perf_counter()
+        last = conway_stats.drain(conway_stats.observe(records, *observers))
+        elapsed = time.perf_counter() - start
+    if last is None:
+        return
+    print(f'{summary.count} 世代 / {elapsed:.3f} 秒: 生きたセル 平均 {summary.mean:,.1f}'
+          f'（最小 {summary.minimum:,}, 最大 {summary.maximum:,}, 直近100世代 {average.value:,.1f}）, '
+          f'変化したセルの割合 平均 {activity.mean:.4%}')
+    if last.population == 0:
+        print(f'{last.generation} 世代目で全滅しました')
+    else:
+        print(f'{last.generation} 世代目: 生きたセル {last.population:,}, '
+              f'範囲 ({last.x0}, {last.y0})～({last.x1}, {last.y1})')
+
+
+def run_terminal(engine, generations, delay, half_block, checkpointer=None, fps=30.0, use_asyncio=False):
+    """
+    ターミナルに表示しながら進める（generations が None なら Ctrl-C まで）
+    計算は別スレッドで delay 秒ごとに進め、表示は fps 回/秒で一番新しい世代を描く
+    """
+    from conway_pipeline import FrameProducer, play, play_async
+    from conway_render import TerminalRenderer
+
+    renderer = TerminalRenderer(half_block=half_block) # 変わったセルだけを書き換えて表示する
+
+    def draw(generation, data):
+        renderer.render(data, engine.width, engine.height)
+
+    on_step = checkpointer.maybe_save if checkpointer is not None else None
+    try:
+        with FrameProducer(engine, generations, delay, on_step=on_step) as producer:
+            if use_asyncio:
+                asyncio.run(play_async(producer, draw, fps))
+            else:
+                play(producer, draw, fps)
+    finally:
+        renderer.close()
+
+
+def initial_board(args):
+    """
+    最初の盤面を (幅, 高さ, bytes, ルール) で返す（パターン指定がなければランダム）
+    ルールはパターンファイルに書いてあるもの（ランダムのときは None）
+    """
+    if not args.pattern:
+        width = args.width or WIDTH
+        height = args.height or HEIGHT
+        return width, height, random_bytes(width, height, args.density, args.seed), None
+
+    from conway_patterns import load_pattern
+
+    offset = tuple(int(v) for v in args.offset.split(','))
+    board, width, height, pattern = load_pattern(args.pattern, args.width, args.height, offset, not args.no_wrap)
+    return width, height, board, pattern.rule
+
+
+def pattern_rule(args, rule):
+    """
+    --rule を指定していなければ、パターンファイルのルールを使う
+    戻り値: 使うルール（B3/S23 なら None）。エンジンが対応していなければ終了する
+    """
+    if args.rule_given or rule is None:
+        return args.rule
+    from conway_rules import is_life, normalize_rule
+
+    try:
+        if is_life(rule):
+            return None
+        rule = normalize_rule(rule)
+    except ValueError as e:
+        sys.exit(f'{args.pattern} のルールが読めません: {e}')
+    if args.engine not in RULE_ENGINES:
+        sys.exit(f'{args.pattern} のルールは {rule} です。--engine {args.engine} は B3/S23 にしか対応していません'
+                 f'（使えるエンジン: {", ".join(RULE_ENGINES)}）')
+    print(f'{args.pattern} のルール {rule} で計算します')
+    return rule
+
+
+def resume_board(args):
+    """チェックポイントを読み、args をその設定にそろえて (幅, 高さ, bytes, 世代) を返す"""
+    from conway_checkpoint import read_checkpoint
+
+    meta, data = read_checkpoint(args.resume)
+    args.engine = meta['engine']
+    args.rule = meta.get('rule')
+    args.seed = meta.get('seed')
+    args.density = meta.get('density', args.density)
+    args.pattern = meta.get('pattern')
+    print(f'{args.resume} の {meta["generation"]} 世代目から再開します')
+    return meta['width'], meta['height'], data, meta['generation']
+
+
+def warn_plane(engine, before_run):
+    """
+    無限平面のエンジンについて標準エラーに注意を出す
+    計算の前は結果がトーラスと違いうること、計算の後は盤面の外に出たセルがあればその数
+    """
+    if before_run:
+        print('注意: このエンジンは盤面の端がつながらない無限平面で計算します。'
+              '生きたセルが端に届くと、他のエンジン（上下左右がつながった盤面）とは結果が変わります',
+              file=sys.stderr)
+        return
+    outside = engine.population() - sum(engine.to_bytes())
+    if outside:
+        print(f'注意: 生きたセルのうち {outside:,} 個が盤面の外に出ています（他のエンジンの結果とは違います）',
+              file=sys.stderr)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.resume:
+        width, height, data, generation = resume_board(args)
+    else:
+        if args.checkpoint and args.seed is None and not args.pattern:
+            args.seed = random.randrange(1 << 32)  # 同じ盤面を作り直せるように種を決めて保存する
+        width, height, data, rule = initial_board(args)
+        args.rule = pattern_rule(args, rule)
+        generation = 0
+    engine = make_engine(args.engine, width, height, data, args.rule)
+    engine.generation = generation
+    if args.engine in PLANE_ENGINES:
+        warn_plane(engine, before_run=True)
+
+    checkpoint = contextlib.nullcontext()
+    path = args.checkpoint or args.resume
+    if path:
+        from conway_checkpoint import Checkpointer
+
+        meta = {'engine': args.engine, 'rule': args.rule, 'seed': args.seed,
+                'density': args.density, 'pattern': args.pattern}
+        checkpoint = Checkpointer(path, meta, args.checkpoint_interval)
+    try:
+        with checkpoint as checkpointer: # 抜けるときに書き待ちのチェックポイントを書き終える
+            try:
+                if args.no_render and (args.stats or args.stop_on_extinction):
+                    run_stats(engine, 100 if args.generations is None else args.generations,
+                              args.stats, args.stop_on_extinction, checkpointer)
+                elif args.no_render:
+                    run_headless(engine, 100 if args.generations is None else args.generations,
+                                 args.stop_on_cycle, checkpointer)
                 else:
-                    next_cells[x][y] = ' ' # その他の場合は死ぬ
+                    run_terminal(engine, args.generations, args.delay, args.half_block, checkpointer,
+                                 args.fps, args.asyncio)
+            except KeyboardInterrupt:
+                if checkpointer is None:
+                    raise
+                checkpointer.save(engine) # 止めたところから再開できるように保存する
+                print(f'\n{engine.generation} 世代目を {path} に保存しました')
+                raise
+            if checkpointer is not None:
+                checkpointer.save(engine)
+    except KeyboardInterrupt:
+        sys.exit() # Ctrl-Cで終了
+    finally:
+        if args.engine in PLANE_ENGINES:
+            warn_plane(engine, before_run=False)
+        if hasattr(engine, 'close'):
+            engine.close()
+
 
-        time.sleep(1) # ちらつきを防ぐため1秒間待つ
-except KeyboardInterrupt:
-    sys.exit() # Ctrl-Cで終了
\ No newline at end of file
+if __name__ == '__main__':
+    main()
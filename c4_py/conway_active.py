@@ -0,0 +1,201 @@
+# Conwayのライフゲーム - 変化のあった場所だけを計算するエンジン（NumPy）
+# - 盤面を TILE × TILE のタイルに分け、前の世代で変化があったタイルを覚えておく
+# - 次の世代で変化しうるのは、変化のあったタイルとその周り8タイルだけなので、そこだけ計算する
+#   （静かな場所は計算しない。落ち着いた盤面では変化の量に比例した時間で進む）
+# - 計算するタイルは、周り1セルの縁を付けてまとめて取り出し、配列演算で一度に進める
+#   （ほとんどのタイルが動いているときは、盤面全体をまとめて計算する）
+# - 盤面の端はトーラス状につながる（結果は全体を計算したときと同じ）
+import numpy as np
+
+import conway
+from conway_numpy import step as full_step
+from conway_rules import is_life, normalize_rule, rule_table
+
+TILE = 16
+FULL_SWEEP = 0.5  # 計算するタイルがこの割合を超えたら、盤面全体をまとめて計算した方が速い
+
+
+class ActiveLife:
+    """変化のあったタイルだけを計算するエンジン（conway.py と同じルール・トーラス盤面）"""
+
+    def __init__(self, board, tile=TILE, rule=None):
+        self.board = np.array(board, dtype=np.uint8, order='C')  # 渡された配列は書き換えない
+        self.height, self.width = self.board.shape
+        self.tile = tile
+        self.generation = 0
+        self.rule = normalize_rule(rule or 'B3/S23')
+        self._table = None if is_life(rule) else np.frombuffer(rule_table(rule), dtype=np.uint8)
+        tiles_y = -(-self.height // tile)
+        tiles_x = -(-self.width // tile)
+
+        # タイルごとの「縁付きで読む行・列」と「書き戻す行・列」
+        # 盤面の大きさが tile で割り切れないときは、はみ出した分が反対側の端に重なるだけで、
+        # どのセルにも正しい値が書かれる
+        offsets = np.arange(-1, tile + 1)
+        self._read_rows = (np.arange(tiles_y)[:, None] * tile + offsets) % self.height
+        self._read_cols = (np.arange(tiles_x)[:, None] * tile + offsets) % self.width
+        self._write_rows = self._read_rows[:, 1:-1]
+        self._write_cols = self._read_cols[:, 1:-1]
+
+        self.active = np.ones((tiles_y, tiles_x), dtype=bool)  # 最初は全部計算する
+        self.last_computed = 0  # 直前の世代で計算したタイルの数
+        # 直前の世代で変わったタイルの (行, 列, 新しい値, 古い値)。全体を計算した世代は変化の配列
+        self._last_change = None
+        # step_stats() を使い始めたら、生きたセルがあるかもしれないタイル（多めでよい）と生きたセルの数を覚える
+        self._occupied = None
+        self._population = None
+
+    @classmethod
+    def from_cells(cls, cells, **kwargs):
+        """conway.py の盤面から作る"""
+        return cls.from_bytes(len(cells), len(cells[0]), conway.cells_to_bytes(cells), **kwargs)
+
+    @classmethod
+    def from_bytes(cls, width, height, data, **kwargs):
+        """行優先の bytes（1=生, 0=死）から作る"""
+        return cls(np.frombuffer(data, dtype=np.uint8).reshape(height, width), **kwargs)
+
+    def _candidates(self):
+        """変化のあったタイルとその周り8タイル"""
+        active = self.active
+        grown = active.copy()
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                if dy or dx:
+                    grown |= np.roll(active, (dy, dx), axis=(0, 1))
+        return np.nonzero(grown)
+
+    def step(self, generations=1):
+        """generations 世代進める"""
+        for _ in range(generations):
+            ty, tx = self._candidates()
+            self.last_computed = len(ty)
+            if len(ty) == 0:
+                self._last_change = None
+                self.generation += 1
+                continue
+            if len(ty) > FULL_SWEEP * self.active.size:
+                self._step_full()
+                continue
+
+            # 縁付きのタイルをまとめて取り出す: (タイル数, tile+2, tile+2)
+            rows = self._read_rows[ty][:, :, None]
+            cols = self._read_cols[tx][:, None, :]
+            patch = self.board[rows, cols]
+            old = patch[:, 1:-1, 1:-1]
+            vertical = patch[:, :-2] + patch[:, 1:-1] + patch[:, 2:]
+            neighbors = vertical[:, :, :-2] + vertical[:, :, 1:-1] + vertical[:, :, 2:] - old
+            if self._table is None:
+                new = ((neighbors == 3) | ((old == 1) & (neighbors == 2))).view(np.uint8)
+            else:
+                new = self._table[old * 9 + neighbors]
+
+            # 変わったタイルだけ書き戻し、次の世代ではそこだけを起点にする
+            changed = (new != old).any(axis=(1, 2))
+            self.active[:] = False
+            self.active[ty[changed], tx[changed]] = True
+            out_rows = self._write_rows[ty[changed]][:, :, None]
+            out_cols = self._write_cols[tx[changed]][:, None, :]
+            self._last_change = (out_rows, out_cols, new[changed], old[changed])
+            self.board[out_rows, out_cols] = new[changed]
+            if self._occupied is not None:
+                self._occupied[ty[changed], tx[changed]] = new[changed].any(axis=(1, 2))
+            self.generation += 1
+
+    def _step_full(self):
+        """盤面全体を計算し、タイルごとに変化があったかを記録する"""
+        new = full_step(self.board, table=self._table)
+        diff = new != self.board
+        self.active[:] = self._tile_any(diff)
+        if self._occupied is not None:
+            self._occupied[:] = self._tile_any(new)
+        self._last_change = diff
+        self.board = new
+        self.generation += 1
+
+    def _tile_any(self, mask):
+        """盤面の大きさの配列から、タイルごとに0でないセルがあるかの配列を作る"""
+        tiles_y, tiles_x = self.active.shape
+        if mask.shape != (tiles_y * self.tile, tiles_x * self.tile):
+            # 割り切れないときは、タイルの大きさの倍数まで0で埋める
+            padded = np.zeros((tiles_y * self.tile, tiles_x * self.tile), dtype=bool)
+            padded[:self.height, :self.width] = mask
+            mask = padded
+        return mask.reshape(tiles_y, self.tile, tiles_x, self.tile).any(axis=(1, 3))
+
+    def step_stats(self):
+        """
+        1世代進め、(生きたセルの数, 生まれた数, 死んだ数, 外接矩形) を返す
+        変わったセルだけから数え、生きたセルの数は差分で更新する（盤面全体は見ない）
+        """
+        if self._occupied is None:
+            self._occupied = self._tile_any(self.board)
+        if self._population is None or self._population[0] != self.generation:
+            self._population = (self.generation, int(np.count_nonzero(self.board)))
+        self.step()
+        if isinstance(self._last_change, np.ndarray):  # 全体を計算した世代
+            changed = int(np.count_nonzero(self._last_change))
+            births = int(np.count_nonzero(np.logical_and(self._last_change, self.board)))
+        else:
+            indices = self.changed_cells()
+            changed = len(indices)
+            births = int(np.count_nonzero(self.board.ravel()[indices]))
+        deaths = changed - births
+        population = self._population[1] + births - deaths
+        self._population = (self.generation, population)
+        return population, births, deaths, self._bounding_box()
+
+    def _bounding_box(self):
+        """
+        生きたセルを囲む最小の長方形 (x0, y0, x1, y1)。生きたセルがなければ None
+        生きたセルがあるかもしれないタイルの範囲の端から、帯状に盤面を見て詰める
+        """
+        tile = self.tile
+        board = self.board
+        tile_rows = np.flatnonzero(self._occupied.any(axis=1))
+        tile_cols = np.flatnonzero(self._occupied.any(axis=0))
+
+        def first_in(strips, axis, reverse):
+            for start, strip in strips:
+                hits = np.flatnonzero(strip.any(axis=axis))
+                if len(hits):
+                    return int(start + (hits[-1] if reverse else hits[0]))
+            return None
+
+        y0 = first_in(((ty * tile, board[ty * tile:(ty + 1) * tile]) for ty in tile_rows), 1, False)
+        if y0 is None:
+            return None
+        y1 = first_in(((ty * tile, board[ty * tile:(ty + 1) * tile]) for ty in tile_rows[::-1]), 1, True)
+        rows = board[y0:y1 + 1]
+        x0 = first_in(((tx * tile, rows[:, tx * tile:(tx + 1) * tile]) for tx in tile_cols), 0, False)
+        x1 = first_in(((tx * tile, rows[:, tx * tile:(tx + 1) * tile]) for tx in tile_cols[::-1]), 0, True)
+        return x0, y0, x1, y1
+
+    def changed_cells(self):
+        """直前の step で変わったセルの位置（行優先の添字の配列）"""
+        if self._last_change is None:
+            return np.empty(0, dtype=np.intp)
+        if isinstance(self._last_change, np.ndarray):  # 全体を計算した世代
+            return np.flatnonzero(self._last_change)
+        rows, cols, new, old = self._last_change
+        mask = new != old
+        indices = (np.broadcast_to(rows, mask.shape)[mask] * self.width
+                   + np.broadcast_to(cols, mask.shape)[mask])
+        # 端のタイルが重なる盤面では同じセルが2回出てくるので1つにまとめる
+        return np.unique(indices)
+
+    def active_fraction(self):
+        """直前の世代で計算したタイルの割合"""
+        return self.last_computed / self.active.size
+
+    def population(self):
+        """生きたセルの数"""
+        return int(np.count_nonzero(self.board))
+
+    def to_cells(self):
+        """conway.py の盤面に変換する"""
+        return conway.bytes_to_cells(self.width, self.height, self.to_bytes())
+
+    def to_bytes(self):
+        """行優先の bytes に変換する"""
+        return self.board.tobytes()
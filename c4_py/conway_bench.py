@@ -0,0 +1,370 @@
+"""
+Conwayのライフゲーム - 全エンジンの正しさの確認とベンチマーク
+- 確認: 決まったパターン（ブリンカー、グライダー、ゴスパーのグライダー銃、R-ペントミノ）と
+  ランダムな盤面を、conway.py の next_generation と世代ごとに比べる
+  （hashlife は端がつながらない無限平面なので、生きたセルが盤面の端に届かない場合だけ比べる）
+- step_stats() があるエンジンは、B0 などのルールのまばらな盤面で統計（外接矩形を含む）も比べる
+- 計測: 盤面の大きさ（60×20 ～ 8192×8192）ごとに、セル更新/秒・最大メモリ・最初の盤面が出るまでの時間
+- 結果をJSONのベースラインに保存し、比較して遅くなった・メモリが増えたエンジンを検出
+
+使い方:
+    python conway_bench.py verify
+    python conway_bench.py run --save baseline.json
+    python conway_bench.py run --sizes 60x20,1024x1024 --engines numpy,bitslice --save new.json
+    python conway_bench.py compare baseline.json new.json --threshold 0.10
+"""
+
+import argparse
+import gc
+import importlib
+import io
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import conway
+from conway_patterns import new_board, place, read_rle
+from conway_stats import bytes_stats
+
+SIZES = [(60, 20), (256, 256), (1024, 1024), (4096, 4096), (8192, 8192)]
+
+# 遅いエンジンはこのセル数までの盤面だけ計測する（それより大きいと1世代に何十秒もかかる）
+MAX_CELLS = {
+    'reference': 256 * 256,
+    'hashlife': 256 * 256,  # ランダムな盤面ではノードが使い回せず、メモリも時間もかかる
+    'fast': 4096 * 4096,
+    'bitboard': 4096 * 4096,
+}
+
+# =============================================================================
+# 確認に使うパターン
+# =============================================================================
+PATTERNS = {
+    'blinker': 'x = 3, y = 1\n3o!',
+    'glider': 'x = 3, y = 3\nbo$2bo$3o!',
+    'r-pentomino': 'x = 3, y = 3\nb2o$2o$bo!',
+    'gosper-gun': (
+        'x = 36, y = 9, rule = B3/S23\n'
+        '24bo$22bobo$12b2o6b2o12b2o$11bo3bo4b2o12b2o$2o8bo5bo3b2o$2o8bo3bob2o4bobo$'
+        '10bo5bo7bo$11bo3bo$12b2o!'
+    ),
+}
+
+# (名前, パターン名 または None（ランダム）, 幅, 高さ, 置く位置 または (割合, 種), 世代数)
+CASES = [
+    ('blinker', 'blinker', 5, 5, (1, 2), 6),
+    ('glider', 'glider', 20, 20, (1, 1), 80),  # 80世代で盤面を1周して元の位置に戻る
+    ('glider-plane', 'glider', 40, 40, (2, 2), 60),
+    ('r-pentomino', 'r-pentomino', 80, 60, (38, 28), 60),
+    ('gosper-gun', 'gosper-gun', 60, 40, (2, 2), 90),
+    ('soup-60x20', None, 60, 20, (0.5, 1), 50),
+    ('soup-130x40', None, 130, 40, (0.3, 2), 30),  # 幅が64の倍数でない（ビットスライスの端の確認）
+]
+
+# step_stats() の確認: (名前, ルール, 幅, 高さ, 生きたセルの位置, 世代数)
+# B0 のルールでは生きたセルから離れたところにも生まれるので、まばらな盤面で外接矩形を確かめる
+STATS_CASES = [
+    ('stats-b0s8', 'B0/S8', 50, 40, [(10, 10)], 6),
+    ('stats-b01', 'B01/S', 50, 40, [(10, 10), (11, 10)], 6),
+    ('stats-life', 'B3/S23', 40, 40, [(2, 1), (3, 2), (1, 3), (2, 3), (3, 3)], 40),
+]
+
+
+def case_board(pattern_name, width, height, placement):
+    """確認用の盤面を行優先の bytes で作る"""
+    if pattern_name is None:
+        density, seed = placement
+        return conway.random_bytes(width, height, density, seed)
+    board = new_board(width, height)
+    place(read_rle(io.StringIO(PATTERNS[pattern_name])), board, width, height, placement)
+    return bytes(board)
+
+
+def reference_run(width, height, data, generations):
+    """
+    next_generation で進め、各世代の盤面（bytes）の一覧と、
+    生きたセルが一度も盤面の端に届かなかったか（無限平面でも同じ結果になるか）を返す
+    """
+    def touches_edge(board):
+        rows = [board[y * width:(y + 1) * width] for y in range(height)]
+        return any(rows[0]) or any(rows[-1]) or any(row[0] or row[-1] for row in rows)
+
+    cells = conway.bytes_to_cells(width, height, data)
+    boards = [data]
+    for _ in range(generations):
+        cells = conway.next_generation(cells)
+        boards.append(conway.cells_to_bytes(cells))
+    return boards, not any(touches_edge(board) for board in boards)
+
+
+def close_engine(engine):
+    if hasattr(engine, 'close'):
+        engine.close()
+
+
+def verify_engine(name, width, height, data, expected):
+    """
+    1世代ずつ進めて毎世代比べ、別のエンジンでまとめて進めた結果も比べる
+    戻り値: 'ok' か、最初に違った世代の説明
+    """
+    generations = len(expected) - 1
+    engine = conway.make_engine(name, width, height, data)
+    try:
+        for generation in range(1, generations + 1):
+            engine.step()
+            if engine.to_bytes() != expected[generation]:
+                return f'{generation} 世代目が違う'
+    finally:
+        close_engine(engine)
+    engine = conway.make_engine(name, width, height, data)
+    try:
+        engine.step(generations)
+        if engine.to_bytes() != expected[-1] or engine.generation != generations:
+            return f'step({generations}) の結果が違う'
+    finally:
+        close_engine(engine)
+    return 'ok'
+
+
+def verify_all(engines, cases=CASES):
+    """全ケース×全エンジンを確認して {エンジン: {ケース: 結果}} を返す（結果は 'ok' / 'skip' / 違いの説明）"""
+    results = {name: {} for name in engines}
+    for case_name, pattern_name, width, height, placement, generations in cases:
+        data = case_board(pattern_name, width, height, placement)
+        expected, plane_safe = reference_run(width, height, data, generations)
+        for name in engines:
+            if name == 'reference':
+                continue
+            if name == 'hashlife' and not plane_safe:
+                result = 'skip'  # 端に届くとトーラスと無限平面で結果が変わる
+            else:
+                result = verify_engine(name, width, height, data, expected)
+            results[name][case_name] = result
+            print(f"{name:10s} {case_name:14s} {result}")
+    for case_name, rule, width, height, cells, generations in STATS_CASES:
+        board = bytearray(width * height)
+        for x, y in cells:
+            board[y * width + x] = 1
+        for name in engines:
+            if name not in conway.RULE_ENGINES:
+                continue
+            result = verify_stats(name, width, height, bytes(board), rule, generations)
+            results[name][case_name] = result
+            print(f"{name:10s} {case_name:14s} {result}")
+    return results
+
+
+def verify_stats(name, width, height, data, rule, generations):
+    """
+    step_stats() の結果を、新旧の盤面から数え直した bytes_stats() と毎世代比べる
+    戻り値: 'ok' / 'skip'（step_stats がない）か、最初に違った世代の説明
+    """
+    engine = conway.make_engine(name, width, height, data, rule=rule)
+    try:
+        if not hasattr(engine, 'step_stats'):
+            return 'skip'
+        previous = engine.to_bytes()
+        for generation in range(1, generations + 1):
+            stats = engine.step_stats()
+            current = engine.to_bytes()
+            expected = bytes_stats(previous, current, width)
+            if tuple(stats) != expected:
+                return f'{generation} 世代目の統計が違う {tuple(stats)} != {expected}'
+            previous = current
+    finally:
+        close_engine(engine)
+    return 'ok'
+
+
+def failures(verify_results):
+    """確認に失敗した (エンジン, ケース, 説明) の一覧"""
+    return [(name, case, result)
+            for name, cases in verify_results.items()
+            for case, result in cases.items() if result not in ('ok', 'skip')]
+
+
+# =============================================================================
+# 計測
+# =============================================================================
+def peak_memory(name, width, height, data, generations=2):
+    """エンジンを作って generations 世代進める間に確保したメモリの最大（バイト。共有メモリは含まない）"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        engine = conway.make_engine(name, width, height, data)
+        try:
+            engine.step(generations)
+            engine.to_bytes()
+        finally:
+            close_engine(engine)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(name, width, height, density=0.3, seed=0, repeat=5, min_time=0.2):
+    """
+    ランダムな盤面で1つのエンジンを計測する
+    - first_frame_s: エンジンを作ってから最初の盤面を bytes で取り出すまで（モジュールの読み込みは含まない）
+    - 1世代だけ進めて（ウォームアップ）、1回の計測が約 min_time 秒になる世代数を決め、
+      repeat 回計測した1世代あたりの時間の中央値と四分位範囲を出す
+    - peak_bytes は時間とは別に計測する（tracemalloc を動かすと遅くなるため）
+    """
+    data = conway.random_bytes(width, height, density, seed)
+    if conway.ENGINES[name] is not None:
+        importlib.import_module(conway.ENGINES[name][0])
+    gc.collect()
+    start = time.perf_counter()
+    engine = conway.make_engine(name, width, height, data)
+    engine.to_bytes()
+    first_frame = time.perf_counter() - start
+    try:
+        start = time.perf_counter()
+        engine.step()
+        warmup = time.perf_counter() - start
+        per_sample = max(1, int(min_time / warmup)) if warmup > 0 else 1
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            engine.step(per_sample)
+            samples.append((time.perf_counter() - start) / per_sample)
+    finally:
+        close_engine(engine)
+
+    median = statistics.median(samples)
+    quartiles = statistics.quantiles(samples, n=4) if len(samples) > 1 else [median] * 3
+    return {
+        'width': width,
+        'height': height,
+        'seconds_per_generation': median,
+        'iqr_s': quartiles[2] - quartiles[0],
+        'cell_updates_per_s': width * height / median if median > 0 else float('inf'),
+        'generations': 1 + per_sample * repeat,
+        'first_frame_s': first_frame,
+        'peak_bytes': peak_memory(name, width, height, data),
+    }
+
+
+def run_benchmarks(engines, sizes=SIZES, repeat=5):
+    """全エンジン×全サイズを計測して、結果の辞書を返す"""
+    results = {}
+    for width, height in sizes:
+        for name in engines:
+            if width * height > MAX_CELLS.get(name, width * height):
+                continue
+            key = f"{name} {width}x{height}"
+            results[key] = stats = measure(name, width, height, repeat=repeat)
+            print(f"{key:22s} {stats['cell_updates_per_s']:16,.0f} セル更新/秒  "
+                  f"最初の盤面 {stats['first_frame_s'] * 1e3:9.1f} ms  "
+                  f"メモリ {stats['peak_bytes'] / 1e6:9.1f} MB")
+    return results
+
+
+def compare_results(baseline, current, threshold=0.10):
+    """
+    1世代の時間（中央値）と最大メモリを比べて、threshold（0.10 = 10%）より悪くなったものの一覧を返す
+    時間はばらつき（IQR）より小さい差は誤差として扱う。最初の盤面までの時間は表示だけ
+    確認（verify）で新しく失敗したものも返す
+    """
+    regressions = []
+    for key, base in baseline['results'].items():
+        new = current['results'].get(key)
+        if new is None:
+            continue
+        change = (new['seconds_per_generation'] - base['seconds_per_generation']) / base['seconds_per_generation']
+        noise = max(base['iqr_s'], new['iqr_s'])
+        slower = change > threshold and new['seconds_per_generation'] - base['seconds_per_generation'] > noise
+        memory = (new['peak_bytes'] - base['peak_bytes']) / max(base['peak_bytes'], 1)
+        larger = memory > threshold
+        first = (new['first_frame_s'] - base['first_frame_s']) / max(base['first_frame_s'], 1e-9)
+        marks = ("遅くなった! " if slower else "") + ("メモリが増えた!" if larger else "")
+        print(f"{key:22s} {base['cell_updates_per_s']:16,.0f} → {new['cell_updates_per_s']:16,.0f} セル更新/秒 "
+              f"{-change / (1 + change):+7.1%}  メモリ {memory:+7.1%}  最初の盤面 {first:+7.1%}  {marks}")
+        if slower:
+            regressions.append((key, 'time', change))
+        if larger:
+            regressions.append((key, 'memory', memory))
+
+    before = set((name, case) for name, case, _ in failures(baseline.get('verify', {})))
+    for name, case, result in failures(current.get('verify', {})):
+        if (name, case) not in before:
+            print(f"{name} {case}: {result}")
+            regressions.append((f"{name} {case}", 'verify', result))
+    return regressions
+
+
+# =============================================================================
+# コマンドライン
+# =============================================================================
+def parse_sizes(text):
+    """'60x20,1024x1024' → [(60, 20), (1024, 1024)]"""
+    return [tuple(int(v) for v in size.split('x')) for size in text.split(',')]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ライフゲームのエンジンの確認とベンチマーク")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    verify_parser = sub.add_parser('verify', help="conway.py と同じ結果になるか確認する")
+    verify_parser.add_argument('--engines', default=','.join(conway.ENGINES))
+
+    run_parser = sub.add_parser('run', help="確認してから計測する")
+    run_parser.add_argument('--save', help="結果を保存するJSONファイル")
+    run_parser.add_argument('--engines', default=','.join(conway.ENGINES))
+    run_parser.add_argument('--sizes', default=','.join(f'{w}x{h}' for w, h in SIZES), help="例: 60x20,1024x1024")
+    run_parser.add_argument('--repeat', type=int, default=5)
+    run_parser.add_argument('--no-verify', action='store_true', help="確認を飛ばして計測だけする")
+
+    compare_parser = sub.add_parser('compare', help="2つのJSONを比較する")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.10)
+
+    args = parser.parse_args(argv)
+
+    if args.command in ('verify', 'run'):
+        engines = args.engines.split(',')
+        unknown = [name for name in engines if name not in conway.ENGINES]
+        if unknown:
+            parser.error(f"知らないエンジンです: {', '.join(unknown)}")
+
+    if args.command == 'verify':
+        failed = failures(verify_all(engines))
+        print(f"\n{len(failed)} 件の違いがありました" if failed else "\nすべて conway.py と同じ結果でした")
+        return 1 if failed else 0
+
+    if args.command == 'run':
+        verify_results = {} if args.no_verify else verify_all(engines)
+        data = {
+            'meta': {
+                'python': sys.version.split()[0],
+                'platform': platform.platform(),
+                'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'repeat': args.repeat,
+            },
+            'verify': verify_results,
+            'results': run_benchmarks(engines, parse_sizes(args.sizes), args.repeat),
+        }
+        if args.save:
+            with open(args.save, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            print(f"保存しました: {args.save}")
+        return 1 if failures(verify_results) else 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, encoding='utf-8') as f:
+        current = json.load(f)
+    regressions = compare_results(baseline, current, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} 件が {args.threshold:.0%} 以上悪くなりました")
+        return 1
+    print("\n悪くなったものはありません")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
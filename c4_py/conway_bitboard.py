@@ -0,0 +1,83 @@
+# Conwayのライフゲーム - ビットボード版エンジン（NumPy不要）
+# - 盤面の1行を1つのPythonの整数にする（ビット x = 列 x のセル、1=生）
+# - 隣接セルは行を1ビット回転（左右の端はつながる）した整数で表し、
+#   8つの隣接を XOR / AND の加算器でまとめて足す（1回の演算で1行分のセルを処理）
+# - メモリは1セル1ビット
+import conway
+
+# 0/1 のバイト列 ⇔ '0'/'1' の文字列
+TO_DIGITS = bytes.maketrans(b'\x00\x01', b'01')
+FROM_DIGITS = bytes.maketrans(b'01', b'\x00\x01')
+
+
+def full_add(a, b, c):
+    """3つのビット列の和を (1の位, 2の位) で返す"""
+    t = a ^ b
+    return t ^ c, (a & b) | (t & c)
+
+
+class BitboardLife:
+    """ビットボード版のエンジン（conway.py と同じルール・トーラス盤面）"""
+
+    def __init__(self, width, height, rows=None):
+        self.width = width
+        self.height = height
+        self.generation = 0
+        self.rows = list(rows) if rows is not None else [0] * height
+        self._mask = (1 << width) - 1
+
+    @classmethod
+    def from_cells(cls, cells):
+        """conway.py の盤面から作る"""
+        return cls.from_bytes(len(cells), len(cells[0]), conway.cells_to_bytes(cells))
+
+    @classmethod
+    def from_bytes(cls, width, height, data):
+        """行優先の bytes（1=生, 0=死）から作る"""
+        data = bytes(data).translate(TO_DIGITS)
+        # 文字列の先頭が列0なので、逆順にしてから2進数として読む
+        rows = [int(data[y * width:(y + 1) * width][::-1], 2) for y in range(height)]
+        return cls(width, height, rows)
+
+    def step(self, generations=1):
+        """generations 世代進める"""
+        width = self.width
+        mask = self._mask
+        shift = width - 1
+        for _ in range(generations):
+            rows = self.rows
+            # west[y] のビット x = 列 x-1 のセル、east[y] のビット x = 列 x+1 のセル
+            west = [((r << 1) | (r >> shift)) & mask for r in rows]
+            east = [(r >> 1) | ((r & 1) << shift) for r in rows]
+
+            next_rows = []
+            for y, middle in enumerate(rows):
+                up = y - 1  # -1 は最後の行（Pythonの添字でそのまま上下がつながる）
+                down = (y + 1) % self.height
+                # 8つの隣接の和を、1の位 s0・2の位 s1・4以上かどうか high に分けて求める
+                ones_a, twos_a = full_add(west[up], rows[up], east[up])
+                ones_b, twos_b = full_add(west[down], rows[down], east[down])
+                ones_c = west[y] ^ east[y]
+                twos_c = west[y] & east[y]
+                s0, twos_d = full_add(ones_a, ones_b, ones_c)
+                twos, fours = full_add(twos_a, twos_b, twos_c)
+                s1 = twos ^ twos_d
+                high = fours | (twos & twos_d)
+                # 次も生きている = 隣接が3、または生きていて隣接が2
+                next_rows.append(s1 & (s0 | middle) & ~high & mask)
+            self.rows = next_rows
+            self.generation += 1
+
+    def population(self):
+        """生きたセルの数"""
+        return sum(r.bit_count() for r in self.rows)
+
+    def to_bytes(self):
+        """行優先の bytes に変換する"""
+        width = self.width
+        digits = b''.join(format(r, f'0{width}b').encode('ascii')[::-1] for r in self.rows)
+        return digits.translate(FROM_DIGITS)
+
+    def to_cells(self):
+        """conway.py の盤面に変換する"""
+        return conway.bytes_to_cells(self.width, self.height, self.to_bytes())
@@ -0,0 +1,135 @@
+# Conwayのライフゲーム - ビットスライス版エンジン（NumPy、1ワード=64セル）
+# - 盤面を words[y, k] の uint64 配列にする（ワード k のビット j = 列 64k+j のセル）
+# - 左右の隣接はワードのシフト＋隣のワードからの繰り上がりで作る
+#   （行の端では同じ行の反対側の端とつながる。幅は64の倍数でなくてよい）
+# - 隣接の数は全加算器（XOR / AND）で配列全体を一度に足す
+# - 1セル1ビットなので、数億セルの盤面もメモリに収まる
+import numpy as np
+
+import conway
+
+# 1回にまとめて計算するワード数（L2キャッシュに収まる程度）
+BLOCK_WORDS = 8192
+
+# 1バイトの中の1の数（np.bitwise_count がない古いNumPy用）
+POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def full_add(a, b, c):
+    """3つのビット列の和を (1の位, 2の位) で返す"""
+    t = a ^ b
+    return t ^ c, (a & b) | (t & c)
+
+
+def pack_board(board):
+    """board[y, x]（uint8, 1=生）を words[y, k]（uint64）に詰める"""
+    height, width = board.shape
+    n_words = (width + 63) // 64
+    packed = np.packbits(board.astype(bool), axis=1, bitorder='little')
+    padded = np.zeros((height, n_words * 8), dtype=np.uint8)
+    padded[:, :packed.shape[1]] = packed
+    return padded.view('<u8').astype(np.uint64)
+
+
+def unpack_board(words, width):
+    """pack_board の逆変換"""
+    as_bytes = np.ascontiguousarray(words, dtype='<u8').view(np.uint8)
+    return np.unpackbits(as_bytes, axis=1, bitorder='little')[:, :width]
+
+
+class BitsliceLife:
+    """ビットスライス版のエンジン（conway.py と同じルール・トーラス盤面）"""
+
+    def __init__(self, words, width):
+        self.words = np.ascontiguousarray(words, dtype=np.uint64)
+        self.height = self.words.shape[0]
+        self.width = width
+        self.generation = 0
+        # 最後のワードで使っているビット数（1～64）と、その範囲のマスク
+        self._tail_bits = width - 64 * (self.words.shape[1] - 1)
+        self._tail_mask = np.uint64((1 << self._tail_bits) - 1)
+
+    @classmethod
+    def from_array(cls, board):
+        """board[y, x] の uint8 配列から作る"""
+        return cls(pack_board(board), board.shape[1])
+
+    @classmethod
+    def from_cells(cls, cells):
+        """conway.py の盤面から作る"""
+        return cls.from_bytes(len(cells), len(cells[0]), conway.cells_to_bytes(cells))
+
+    @classmethod
+    def from_bytes(cls, width, height, data):
+        """行優先の bytes（1=生, 0=死）から作る"""
+        return cls.from_array(np.frombuffer(data, dtype=np.uint8).reshape(height, width))
+
+    def _west(self, x):
+        """ビット j に列 j-1 のセルが来るようにずらす"""
+        one, top = np.uint64(1), np.uint64(63)
+        out = x << one
+        out[:, 1:] |= x[:, :-1] >> top
+        # 列0の左は列 width-1（最後のワードの最上位の使用ビット）
+        out[:, 0] = (x[:, 0] << one) | ((x[:, -1] >> np.uint64(self._tail_bits - 1)) & one)
+        return out
+
+    def _east(self, x):
+        """ビット j に列 j+1 のセルが来るようにずらす"""
+        one, top = np.uint64(1), np.uint64(63)
+        out = x >> one
+        out[:, :-1] |= x[:, 1:] << top
+        # 列 width-1 の右は列0
+        out[:, -1] = (x[:, -1] >> one) | ((x[:, 0] & one) << np.uint64(self._tail_bits - 1))
+        return out
+
+    def step(self, generations=1):
+        """generations 世代進める"""
+        height = self.height
+        block = max(1, BLOCK_WORDS // self.words.shape[1])
+        for _ in range(generations):
+            x = self.words
+            out = np.empty_like(x)
+            # キャッシュに収まる行数ずつ、上下1行（端は反対側の行）を足して計算する
+            for start in range(0, height, block):
+                stop = min(start + block, height)
+                rows = x.take(np.arange(start - 1, stop + 1) % height, axis=0)
+                out[start:stop] = self._next_rows(rows)
+            self.words = out
+            self.generation += 1
+
+    def _next_rows(self, rows):
+        """上下1行ずつ余分に付いた rows から、真ん中の行の次の世代を計算する"""
+        # 各行で「左 + 自分 + 右」の3セルの和（0～3）を2ビットに分けて持つ
+        row_ones, row_twos = full_add(self._west(rows), rows, self._east(rows))
+
+        # 上・自分・下の行の和 = 自分を含む3×3の生きたセルの数 total（0～9）
+        s0, carry = full_add(row_ones[:-2], row_ones[1:-1], row_ones[2:])
+        twos, fours = full_add(row_twos[:-2], row_twos[1:-1], row_twos[2:])
+        s1 = twos ^ carry
+        # 2の位の個数 = twos + 2 * fours + carry（0～4）が ちょうど2 かどうか
+        two_pairs = fours ^ (twos & carry)
+
+        # 次も生きている = total が3、または生きていて total が4
+        # total == 3: s0=1, s1=1, fours=0 / total == 4: s0=0, s1=0, 2の位がちょうど2
+        three = s0 & s1 & ~fours
+        three |= rows[1:-1] & ~(s0 | s1) & two_pairs
+        three[:, -1] &= self._tail_mask  # 幅の外のビットは0のままにする
+        return three
+
+    def population(self):
+        """生きたセルの数"""
+        if hasattr(np, 'bitwise_count'):
+            return int(np.bitwise_count(self.words).sum(dtype=np.int64))
+        return int(POPCOUNT[self.words.view(np.uint8)].sum(dtype=np.int64))
+
+    def to_array(self):
+        """board[y, x] の uint8 配列に変換する"""
+        return unpack_board(self.words, self.width)
+
+    def to_bytes(self):
+        """行優先の bytes に変換する"""
+        return self.to_array().tobytes()
+
+    def to_cells(self):
+        """conway.py の盤面に変換する"""
+        return conway.bytes_to_cells(self.width, self.height, self.to_bytes())
@@ -0,0 +1,167 @@
+# Conwayのライフゲーム - 長い計算の途中保存（チェックポイント）と再開
+# - 保存するもの: 盤面、世代数、乱数の種、エンジン名やルールなどの設定
+# - ファイルの形式: 先頭の目印（MAGIC）、設定のJSONの長さ（4バイト）、設定のJSON、
+#   盤面を1セル1ビットに詰めて zlib で圧縮したもの
+# - 保存はバックグラウンドのスレッドで行う。計算側は盤面の bytes を受け渡すだけで止まらない
+#   （書いている間に次の保存が来たら、古い方は捨てて新しい方だけを書く）
+# - ファイルは一時ファイルに書いてから置き換えるので、途中で落ちても前のチェックポイントは壊れない
+# - 読み込みは盤面のバイト数に比例した時間で終わる（世代をやり直す必要はない）
+import json
+import os
+import signal
+import threading
+import time
+import zlib
+
+try:
+    import numpy as np
+except ImportError:  # NumPyがなくても純Pythonで動く
+    np = None
+
+MAGIC = b'C4LIFE\x00\x01'
+COMPRESS_LEVEL = 6
+INTERVAL = 60.0  # 保存の間隔（秒）
+
+TO_DIGITS = bytes.maketrans(b'\x00\x01', b'01')
+FROM_DIGITS = bytes.maketrans(b'01', b'\x00\x01')
+
+
+def pack_cells(data):
+    """行優先の bytes（1=生, 0=死）を1セル1ビットに詰める（セル i は i // 8 バイト目の i % 8 ビット目）"""
+    if np is not None:
+        return np.packbits(np.frombuffer(data, dtype=np.uint8), bitorder='little').tobytes()
+    # '0'/'1' の文字列を逆順にして2進数として読むと、セル i がビット i になる
+    value = int(bytes(data).translate(TO_DIGITS)[::-1] or b'0', 2)
+    return value.to_bytes((len(data) + 7) // 8, 'little')
+
+
+def unpack_cells(packed, size):
+    """pack_cells の逆変換（size はセルの数）"""
+    if np is not None:
+        bits = np.unpackbits(np.frombuffer(packed, dtype=np.uint8), count=size, bitorder='little')
+        return bits.tobytes()
+    digits = format(int.from_bytes(packed, 'little'), f'0{size}b')[::-1]
+    return digits.encode().translate(FROM_DIGITS)
+
+
+def write_checkpoint(path, data, meta):
+    """
+    盤面 data と設定 meta（JSONにできる dict。width と height は必須）を path に保存する
+    一時ファイルに書いてから置き換える
+    """
+    header = json.dumps(meta, ensure_ascii=False).encode()
+    body = zlib.compress(pack_cells(data), COMPRESS_LEVEL)
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(4, 'little'))
+        f.write(header)
+        f.write(body)
+    os.replace(temporary, path)
+
+
+def read_checkpoint(path):
+    """チェックポイントを読み、(設定の dict, 盤面の bytes) を返す"""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'チェックポイントのファイルではありません: {path}')
+        header = f.read(int.from_bytes(f.read(4), 'little'))
+        meta = json.loads(header)
+        body = f.read()
+    size = meta['width'] * meta['height']
+    packed = zlib.decompress(body)
+    if len(packed) != (size + 7) // 8:
+        raise ValueError(f'盤面の大きさが合いません: {path}')
+    return meta, unpack_cells(packed, size)
+
+
+class Checkpointer:
+    """
+    エンジンの盤面をバックグラウンドで定期的に保存する
+    - meta: 一緒に保存する設定（エンジン名・ルール・乱数の種など）。世代数と盤面の大きさは自動で入る
+    - interval: maybe_save() が実際に保存する間隔（秒）
+    with 文の中では Ctrl-C をすぐには起こさず、次の maybe_save() で KeyboardInterrupt にする
+    （世代の計算の途中で止まった盤面を保存しないため。2回押すとすぐに止まる）
+    """
+
+    def __init__(self, path, meta=None, interval=INTERVAL):
+        self.path = path
+        self.meta = dict(meta or {})
+        self.interval = interval
+        self.saved_generation = None  # 最後に書き終わった世代
+        self._last_save = time.monotonic()
+        self._pending = None  # まだ書いていない (設定, 盤面)
+        self._error = None
+        self._closed = False
+        self._interrupted = False
+        self._previous_handler = None
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._writer, name='checkpoint', daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        if threading.current_thread() is threading.main_thread():
+            self._previous_handler = signal.signal(signal.SIGINT, self._on_interrupt)
+        return self
+
+    def __exit__(self, *exc):
+        if self._previous_handler is not None:
+            signal.signal(signal.SIGINT, self._previous_handler)
+            self._previous_handler = None
+        self.close()
+
+    def _on_interrupt(self, signum, frame):
+        if self._interrupted:
+            raise KeyboardInterrupt  # 2回目はすぐに止める
+        self._interrupted = True
+
+    def maybe_save(self, engine):
+        """前の保存から interval 秒たっていれば保存する。Ctrl-C が押されていればここで止める"""
+        if self._interrupted:
+            raise KeyboardInterrupt
+        if time.monotonic() - self._last_save >= self.interval:
+            self.save(engine)
+
+    def seconds_until_save(self):
+        """次に maybe_save() が保存するまでの秒数（もう保存する時間なら0）"""
+        return max(0.0, self.interval - (time.monotonic() - self._last_save))
+
+    def save(self, engine):
+        """今の盤面を保存する（盤面の bytes を取り出すだけで、書き込みはスレッドに任せる）"""
+        self._raise_error()
+        meta = dict(self.meta, width=engine.width, height=engine.height, generation=engine.generation)
+        data = engine.to_bytes()
+        with self._condition:
+            self._pending = (meta, data)  # 書き待ちの古いものがあれば捨てる
+            self._condition.notify()
+        self._last_save = time.monotonic()
+
+    def close(self):
+        """書き待ちのチェックポイントを書き終えてからスレッドを止める"""
+        if self._closed:
+            return
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        self._raise_error()
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _writer(self):
+        """バックグラウンドのスレッド: 新しい盤面が来るたびに書く"""
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._pending is None:
+                    return
+                (meta, data), self._pending = self._pending, None
+            try:
+                write_checkpoint(self.path, data, meta)
+                self.saved_generation = meta['generation']
+            except Exception as e:  # 次の save() か close() で呼び出し側に伝える
+                self._error = e
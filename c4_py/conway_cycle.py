@@ -0,0 +1,127 @@
+# Conwayのライフゲーム - 周期（くり返し）の検出
+# - 盤面のハッシュは「生きたセルごとの64ビットの乱数」のXOR（Zobristハッシュ）
+#   セルが1つ変わるたびにそのセルの値をXORするだけで更新できる
+# - セルごとの乱数は表に持たず、セルの位置から毎回計算する（大きな盤面でもメモリを使わない）
+# - ハッシュ → 世代 の履歴（件数に上限あり）で同じ盤面に戻ったことを見つけ、
+#   周期と、くり返しが始まった世代を記録する
+# - 周期が分かれば、任意の世代 N の盤面には余りの分だけ進めればたどり着ける
+#
+# エンジンに changed_cells()（直前の step で変わったセルの添字）があればそれを使い、
+# なければ前の世代の to_bytes() と比べて変わったセルを探す
+from collections import OrderedDict
+
+try:
+    import numpy as np
+except ImportError:  # NumPyがなくても純Pythonで動く
+    np = None
+
+MASK64 = (1 << 64) - 1
+
+
+def cell_key(index, seed=0):
+    """セルの位置に対応する64ビットの乱数（splitmix64）"""
+    z = (index + seed * 0x9E3779B97F4A7C15 + 0x9E3779B97F4A7C15) & MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+    return z ^ (z >> 31)
+
+
+def xor_keys(indices, seed=0):
+    """添字の一覧に対応する乱数を全てXORした値"""
+    if np is not None and len(indices) > 64:
+        # NumPyのuint64はかけ算のあふれが 2^64 で折り返すので、そのまま同じ計算になる
+        with np.errstate(over='ignore'):
+            z = np.asarray(indices, dtype=np.uint64) + np.uint64((seed * 0x9E3779B97F4A7C15 + 0x9E3779B97F4A7C15) & MASK64)
+            z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+            z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+            z ^= z >> np.uint64(31)
+        return int(np.bitwise_xor.reduce(z))
+    h = 0
+    for index in indices:
+        h ^= cell_key(int(index), seed)
+    return h
+
+
+def live_indices(data):
+    """行優先の bytes から生きたセルの添字を返す"""
+    if np is not None:
+        return np.flatnonzero(np.frombuffer(data, dtype=np.uint8))
+    return [i for i, v in enumerate(data) if v]
+
+
+def changed_indices(old, new):
+    """2つの盤面（bytes）で違うセルの添字を返す"""
+    if np is not None:
+        return np.flatnonzero(np.frombuffer(old, dtype=np.uint8) != np.frombuffer(new, dtype=np.uint8))
+    return [i for i, (a, b) in enumerate(zip(old, new)) if a != b]
+
+
+class CycleDetector:
+    """
+    エンジンを包んで世代を進めながら、盤面のハッシュを差分で更新して周期を見つける
+    - history: 覚えておく世代数の上限（これより長い周期は見つけられない）
+    - 周期が見つかると start（くり返しが始まった世代）と period（周期）が入る
+    """
+
+    def __init__(self, engine, history=4096, seed=0):
+        self.engine = engine
+        self.history_size = history
+        self.seed = seed
+        self.start = None
+        self.period = None
+        self._history = OrderedDict()
+        self._tracks_changes = hasattr(engine, 'changed_cells')
+        self._previous = None if self._tracks_changes else engine.to_bytes()
+        # 最初の1回だけは盤面全体からハッシュを作る
+        self.hash = xor_keys(live_indices(engine.to_bytes()), seed)
+        self._remember()
+
+    @property
+    def found(self):
+        """周期が見つかったか"""
+        return self.period is not None
+
+    def step(self, generations=1):
+        """1世代ずつ進めてハッシュを更新する（周期が見つかっても止まらない）"""
+        for _ in range(generations):
+            self.engine.step()
+            if self._tracks_changes:
+                changed = self.engine.changed_cells()
+            else:
+                current = self.engine.to_bytes()
+                changed = changed_indices(self._previous, current)
+                self._previous = current
+            self.hash ^= xor_keys(changed, self.seed)
+            self._remember()
+
+    def run_until_cycle(self, max_generations):
+        """周期が見つかるか、max_generations 世代に着くまで進める。見つかれば (start, period)"""
+        while not self.found and self.engine.generation < max_generations:
+            self.step()
+        return (self.start, self.period) if self.found else None
+
+    def fast_forward(self, generation):
+        """
+        周期を使って generation 世代目の盤面まで進める（余りの分だけ実際に計算する）
+        generation は周期の始まり以降であればよい（今より前の世代にも戻れる）
+        """
+        if not self.found:
+            raise ValueError('まだ周期が見つかっていません')
+        if generation < self.start:
+            raise ValueError(f'周期が始まる前（{self.start} 世代より前）には戻れません')
+        current = (self.engine.generation - self.start) % self.period
+        target = (generation - self.start) % self.period
+        self.step((target - current) % self.period)
+        self.engine.generation = generation
+
+    def _remember(self):
+        """今のハッシュを履歴に入れ、前に見たハッシュなら周期を記録する"""
+        generation = self.engine.generation
+        seen = self._history.get(self.hash)
+        if seen is not None and not self.found:
+            self.start = seen
+            self.period = generation - seen
+        self._history[self.hash] = generation
+        self._history.move_to_end(self.hash)
+        if len(self._history) > self.history_size:
+            self._history.popitem(last=False)  # いちばん古い世代を忘れる
@@ -0,0 +1,146 @@
+# Conwayのライフゲーム - 純Python版の高速エンジン（NumPy不要）
+# - 盤面は行優先の平らな bytearray（1=生, 0=死）を2枚用意し、世代ごとに入れ替える
+# - 盤面全体を1つの大きな整数（1セル=1バイト）とみなし、整数の足し算とシフトで
+#   全セルの隣接数をまとめて数える（1バイトの最大値は19なので桁あふれしない）
+# - 左右の端のつなぎ方はマスクとしてあらかじめ作っておく（世代ごとの % 計算なし）
+# - 次の状態は bytes.translate の表引きで決める（セルごとの if はない。B/S 記法の任意のルールに対応）
+import re
+
+import conway
+from conway_rules import LIFE, normalize_rule, rule_table
+
+
+def translate_table(rule):
+    """
+    ルールを bytes.translate 用の表にする
+    添字 = 自分(0/1) * 10 + 自分を含む3×3の生きたセルの数（conway_rules の表は 自分 * 9 + 隣接の数）
+    """
+    table = rule_table(rule)
+    return bytes(
+        table[alive * 9 + total - alive] if 0 <= total - alive <= 8 else 0
+        for alive in (0, 1) for total in range(10)
+    ).ljust(256, b'\x00')
+
+
+# ライフゲーム（B3/S23）の表: 生きたセルは自分を含めて3か4、死んだセルは3で次も生きる
+NEXT_STATE = translate_table(LIFE)
+
+NONZERO = re.compile(rb'[^\x00]')
+
+
+class FastLife:
+    """純Python版のエンジン（conway.py と同じルール・トーラス盤面）"""
+
+    def __init__(self, width, height, data=None, rule=None):
+        self.width = width
+        self.height = height
+        self.generation = 0
+        self.rule = normalize_rule(rule or LIFE)
+        self._table = translate_table(self.rule)
+        self._cells = bytearray(data) if data is not None else bytearray(width * height)
+        self._next = bytearray(width * height)
+        self._population = None  # step_stats() が続けて数えている生きたセルの数（わからなければ None）
+
+        # 各行の左端・右端のバイトだけが 0xFF のマスク（行をまたいだシフトを直すのに使う）
+        first = int.from_bytes((b'\xff' + b'\x00' * (width - 1)) * height, 'big')
+        last = int.from_bytes((b'\x00' * (width - 1) + b'\xff') * height, 'big')
+        everything = (1 << (8 * width * height)) - 1
+        self._first = first
+        self._last = last
+        self._not_first = everything & ~first
+        self._not_last = everything & ~last
+        self._wrap_shift = 8 * (width - 1)
+
+    @classmethod
+    def from_cells(cls, cells, **kwargs):
+        """conway.py の盤面から作る"""
+        return cls(len(cells), len(cells[0]), conway.cells_to_bytes(cells), **kwargs)
+
+    @classmethod
+    def from_bytes(cls, width, height, data, **kwargs):
+        """行優先の bytes（1=生, 0=死）から作る"""
+        return cls(width, height, data, **kwargs)
+
+    def step(self, generations=1):
+        """generations 世代進める"""
+        for _ in range(generations):
+            self._advance()
+        self._population = None
+
+    def _advance(self):
+        """1世代進め、前の世代の盤面を整数にしたもの（計算に使った値）を返す"""
+        width = self.width
+        cells = self._cells
+        # 縦3セルの和: 上の行 + 自分の行 + 下の行（上下は盤面ごと1行ずらして作る）
+        alive = int.from_bytes(cells, 'big')
+        vertical = (
+            int.from_bytes(cells[-width:] + cells[:-width], 'big')
+            + alive
+            + int.from_bytes(cells[width:] + cells[:width], 'big')
+        )
+        # 横3列の和: 左の列と右の列をそろえて足す（端は同じ行の反対側から持ってくる）
+        left = (vertical >> 8) & self._not_first | (vertical << self._wrap_shift) & self._first
+        right = (vertical << 8) & self._not_last | (vertical >> self._wrap_shift) & self._last
+        keys = alive * 10 + left + vertical + right
+        self._next[:] = keys.to_bytes(width * self.height, 'big').translate(self._table)
+        self._cells, self._next = self._next, cells
+        self.generation += 1
+        return alive
+
+    def step_stats(self):
+        """
+        1世代進め、(生きたセルの数, 生まれた数, 死んだ数, 外接矩形) を返す
+        - 前の世代は計算に使った整数をそのまま使い、新しい盤面だけを整数にしてビットの数で数える
+          （1セル1バイトで値は0か1なので、ビットの数 = セルの数）
+        - 生きたセルの数は前の世代の数 + 生まれた数 - 死んだ数（数え直さない）
+        - 外接矩形は盤面を前後から最初の生きたセルまで探し、その間の行を OR して左右を探す
+          （ここだけは計算とは別に、生きたセルのある範囲の行をもう1回なめる）
+        """
+        population = self._population
+        old = self._advance()
+        new = int.from_bytes(self._cells, 'big')
+        births = (new & ~old).bit_count()
+        deaths = (old & ~new).bit_count()
+        if population is None:
+            population = old.bit_count()
+        self._population = population + births - deaths
+        return self._population, births, deaths, self._bounding_box()
+
+    def _bounding_box(self):
+        """生きたセルを囲む最小の長方形 (x0, y0, x1, y1)。生きたセルがなければ None"""
+        cells = self._cells
+        width = self.width
+        first = cells.find(1)
+        if first < 0:
+            return None
+        y0 = first // width
+        y1 = cells.rfind(1) // width
+        # その範囲の行を OR でまとめた1行から、左端と右端を探す
+        columns = 0
+        for y in range(y0, y1 + 1):
+            columns |= int.from_bytes(cells[y * width:(y + 1) * width], 'big')
+        row = columns.to_bytes(width, 'big')
+        return row.find(1), y0, row.rfind(1), y1
+
+    def population(self):
+        """生きたセルの数"""
+        if self._population is not None:
+            return self._population
+        return self._cells.count(1)
+
+    def changed_cells(self):
+        """直前の step で変わったセルの位置（行優先の添字のリスト）"""
+        if self.generation == 0:
+            return []
+        # 入れ替えたあとの _next には1つ前の世代が残っている（XORで違うバイトだけ0以外になる）
+        size = self.width * self.height
+        diff = int.from_bytes(self._cells, 'big') ^ int.from_bytes(self._next, 'big')
+        return [m.start() for m in NONZERO.finditer(diff.to_bytes(size, 'big'))]
+
+    def to_cells(self):
+        """conway.py の盤面に変換する"""
+        return conway.bytes_to_cells(self.width, self.height, self._cells)
+
+    def to_bytes(self):
+        """行優先の bytes に変換する"""
+        return bytes(self._cells)
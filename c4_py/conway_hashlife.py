@@ -0,0 +1,288 @@
+# Conwayのライフゲーム - Hashlifeエンジン
+# - 盤面を四分木で表し、同じ形のノードは1つだけ作る（ハッシュコンス）
+# - 「ノードの中心部を 2^j 世代後に進めた結果」をノードごとにメモしておき、
+#   繰り返しの多いパターンは何十億世代でも一気に進める
+# - ノード表が大きくなりすぎたら、今の盤面から辿れるノードだけ残して作り直す
+#
+# 注意: Hashlifeの盤面は無限平面。conway.py のトーラス盤面と結果が一致するのは、
+#       パターンが盤面の端をまたがない間だけ
+import conway
+
+
+class Node:
+    """四分木のノード（level 0 は1セル、level k は 2^k × 2^k セル）"""
+
+    __slots__ = ('nw', 'ne', 'sw', 'se', 'level', 'population')
+
+    def __init__(self, nw, ne, sw, se, level, population):
+        self.nw = nw
+        self.ne = ne
+        self.sw = sw
+        self.se = se
+        self.level = level
+        self.population = population
+
+
+OFF = Node(None, None, None, None, 0, 0)
+ON = Node(None, None, None, None, 0, 1)
+
+
+class HashLife:
+    """
+    Hashlife版のエンジン
+    - root: 盤面全体のノード、origin: root の左上の座標
+    - width / height: to_cells / to_bytes で取り出す範囲（元の盤面の大きさ）
+    - max_nodes: ノード表の上限の目安（超えたら、1回の大きな飛び越しの途中でも掃除する）
+    """
+
+    def __init__(self, width=conway.WIDTH, height=conway.HEIGHT, max_nodes=2_000_000):
+        self.width = width
+        self.height = height
+        self.max_nodes = max_nodes
+        self.generation = 0
+        self.collections = 0  # 掃除した回数
+        self._collect_at = max_nodes  # ノード表がこの数を超えたら掃除する
+        self._table = {}  # (nw, ne, sw, se) → ノード
+        self._results = {}  # (ノード, j) → 2^j 世代後の中心部
+        self._empty = [OFF]  # level ごとの空のノード
+
+        level = 3
+        while (1 << level) < max(width, height):
+            level += 1
+        self.root = self.empty(level)
+        self.origin = (0, 0)
+
+    # -------------------------------------------------------------------------
+    # 盤面との変換
+    # -------------------------------------------------------------------------
+    @classmethod
+    def from_cells(cls, cells, **kwargs):
+        """conway.py の盤面から作る"""
+        width = len(cells)
+        height = len(cells[0])
+        life = cls(width, height, **kwargs)
+        life.set_cells((x, y) for x in range(width) for y in range(height) if cells[x][y] == '#')
+        return life
+
+    @classmethod
+    def from_bytes(cls, width, height, data, **kwargs):
+        """行優先の bytes（1=生, 0=死）から作る"""
+        life = cls(width, height, **kwargs)
+        life.set_cells((i % width, i // width) for i, v in enumerate(data) if v)
+        return life
+
+    def set_cells(self, points):
+        """生きたセルの座標 (x, y) から盤面を作り直す（座標は0以上）"""
+        points = list(points)
+        level = self.root.level
+        while points and (1 << level) <= max(max(x, y) for x, y in points):
+            level += 1
+        self.root = self._build(points, level, 0, 0)
+        self.origin = (0, 0)
+
+    def live_cells(self, x=None, y=None, width=None, height=None):
+        """範囲内の生きたセルの座標 (x, y) を順に返す（省略時は元の盤面の範囲）"""
+        x = 0 if x is None else x
+        y = 0 if y is None else y
+        width = self.width if width is None else width
+        height = self.height if height is None else height
+        window = (x, y, x + width, y + height)
+
+        stack = [(self.root, self.origin[0], self.origin[1])]
+        while stack:
+            node, nx, ny = stack.pop()
+            size = 1 << node.level
+            if (node.population == 0 or nx >= window[2] or ny >= window[3]
+                    or nx + size <= window[0] or ny + size <= window[1]):
+                continue
+            if node.level == 0:
+                yield nx, ny
+                continue
+            half = size >> 1
+            stack.append((node.se, nx + half, ny + half))
+            stack.append((node.sw, nx, ny + half))
+            stack.append((node.ne, nx + half, ny))
+            stack.append((node.nw, nx, ny))
+
+    def to_bytes(self):
+        """元の盤面の範囲を行優先の bytes に変換する"""
+        data = bytearray(self.width * self.height)
+        for x, y in self.live_cells():
+            data[y * self.width + x] = 1
+        return bytes(data)
+
+    def to_cells(self):
+        """元の盤面の範囲を conway.py の盤面に変換する"""
+        return conway.bytes_to_cells(self.width, self.height, self.to_bytes())
+
+    def population(self):
+        """生きたセルの数（盤面の範囲外も含む）"""
+        return self.root.population
+
+    # -------------------------------------------------------------------------
+    # 世代を進める
+    # -------------------------------------------------------------------------
+    def step(self, generations=1):
+        """generations 世代進める（2進数の各桁ごとに 2^j 世代ずつ飛ばす）"""
+        j = 0
+        while generations:
+            if generations & 1:
+                self.step_pow2(j)
+            generations >>= 1
+            j += 1
+
+    def step_pow2(self, j):
+        """2^j 世代進める"""
+        if len(self._table) > self._collect_at:
+            self.collect()
+
+        # パターンが中心の半分に収まるまで広げ、さらに1段広げてから進める
+        # （2^j 世代で広がる距離が、結果として返る中心部からはみ出さないように）
+        while self.root.level < j + 2 or not self._is_padded(self.root):
+            self._expand()
+        self._expand()
+        half = 1 << (self.root.level - 2)
+        self.root = self._successor(self.root, j)
+        self.origin = (self.origin[0] + half, self.origin[1] + half)
+        self.generation += 1 << j
+
+    def collect(self):
+        """
+        今の盤面から辿れるノードだけ残し、メモも捨てる
+        _successor の途中で呼ばれても、計算中のノードは呼び出し元が持っているので消えない
+        （表から外れるだけで、同じ形のノードが2つできることがあるが結果は変わらない）
+        """
+        table = {}
+        stack = [self.root] + self._empty
+        seen = set()
+        while stack:
+            node = stack.pop()
+            if node.level == 0 or id(node) in seen:
+                continue
+            seen.add(id(node))
+            table[(node.nw, node.ne, node.sw, node.se)] = node
+            stack.extend((node.nw, node.ne, node.sw, node.se))
+        self._table = table
+        self._results = {}
+        self.collections += 1
+        # 今の盤面だけで上限に近いときは、掃除を繰り返さないよう次の掃除までの余裕をとる
+        self._collect_at = max(self.max_nodes, 2 * len(table))
+
+    # -------------------------------------------------------------------------
+    # 四分木の操作
+    # -------------------------------------------------------------------------
+    def join(self, nw, ne, sw, se):
+        """4つのノードをまとめた1段上のノード（同じ形なら同じノードを返す）"""
+        key = (nw, ne, sw, se)
+        node = self._table.get(key)
+        if node is None:
+            node = Node(nw, ne, sw, se, nw.level + 1,
+                        nw.population + ne.population + sw.population + se.population)
+            self._table[key] = node
+        return node
+
+    def empty(self, level):
+        """指定した level の空のノード"""
+        while len(self._empty) <= level:
+            e = self._empty[-1]
+            self._empty.append(self.join(e, e, e, e))
+        return self._empty[level]
+
+    def _centre(self, node):
+        """node を中心に置いた1段上のノード（周りは空）"""
+        e = self.empty(node.level - 1)
+        return self.join(
+            self.join(e, e, e, node.nw), self.join(e, e, node.ne, e),
+            self.join(e, node.sw, e, e), self.join(node.se, e, e, e),
+        )
+
+    def _expand(self):
+        """root を1段広げる"""
+        half = 1 << (self.root.level - 1)
+        self.root = self._centre(self.root)
+        self.origin = (self.origin[0] - half, self.origin[1] - half)
+
+    @staticmethod
+    def _is_padded(node):
+        """生きたセルが全て中心の半分の範囲に収まっているか"""
+        return node.population == (
+            node.nw.se.population + node.ne.sw.population
+            + node.sw.ne.population + node.se.nw.population
+        )
+
+    def _build(self, points, level, x0, y0):
+        """座標の一覧から四分木を作る"""
+        if not points:
+            return self.empty(level)
+        if level == 0:
+            return ON
+        half = 1 << (level - 1)
+        quadrants = ([], [], [], [])
+        for x, y in points:
+            quadrants[(x >= x0 + half) + 2 * (y >= y0 + half)].append((x, y))
+        return self.join(
+            self._build(quadrants[0], level - 1, x0, y0),
+            self._build(quadrants[1], level - 1, x0 + half, y0),
+            self._build(quadrants[2], level - 1, x0, y0 + half),
+            self._build(quadrants[3], level - 1, x0 + half, y0 + half),
+        )
+
+    def _life_4x4(self, node):
+        """level 2（4×4）のノードの中心2×2を1世代進める"""
+        grid = [[0] * 4 for _ in range(4)]
+        for qy, row in ((0, (node.nw, node.ne)), (2, (node.sw, node.se))):
+            for qx, quad in zip((0, 2), row):
+                grid[qy][qx] = quad.nw.population
+                grid[qy][qx + 1] = quad.ne.population
+                grid[qy + 1][qx] = quad.sw.population
+                grid[qy + 1][qx + 1] = quad.se.population
+
+        def next_cell(x, y):
+            neighbors = sum(grid[y + dy][x + dx] for dy in (-1, 0, 1) for dx in (-1, 0, 1)) - grid[y][x]
+            return ON if neighbors == 3 or (grid[y][x] and neighbors == 2) else OFF
+
+        return self.join(next_cell(1, 1), next_cell(2, 1), next_cell(1, 2), next_cell(2, 2))
+
+    def _successor(self, node, j):
+        """
+        level k のノードの中心部（level k-1）を 2^j 世代後に進めたノード（j ≤ k-2）
+        """
+        key = (node, j)
+        result = self._results.get(key)
+        if result is not None:
+            return result
+        if len(self._table) > self._collect_at:
+            self.collect()
+
+        if node.population == 0:
+            result = node.nw
+        elif node.level == 2:
+            result = self._life_4x4(node)
+        else:
+            join = self.join
+            nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+            # 重なり合う9つの部分（それぞれ1段下のノード）
+            parts = (
+                nw, join(nw.ne, ne.nw, nw.se, ne.sw), ne,
+                join(nw.sw, nw.se, sw.nw, sw.ne), join(nw.se, ne.sw, sw.ne, se.nw), join(ne.sw, ne.se, se.nw, se.ne),
+                sw, join(sw.ne, se.nw, sw.se, se.sw), se,
+            )
+            if j < node.level - 2:
+                # 世代数が小さいときは、各部分の中心だけを j 世代進めてつなぐ
+                c = [self._successor(part, j) for part in parts]
+                result = join(
+                    join(c[0].se, c[1].sw, c[3].ne, c[4].nw), join(c[1].se, c[2].sw, c[4].ne, c[5].nw),
+                    join(c[3].se, c[4].sw, c[6].ne, c[7].nw), join(c[4].se, c[5].sw, c[7].ne, c[8].nw),
+                )
+            else:
+                # 半分ずつ2回進める（合計 2^(k-2) 世代）
+                c = [self._successor(part, j - 1) for part in parts]
+                result = join(
+                    self._successor(join(c[0], c[1], c[3], c[4]), j - 1),
+                    self._successor(join(c[1], c[2], c[4], c[5]), j - 1),
+                    self._successor(join(c[3], c[4], c[6], c[7]), j - 1),
+                    self._successor(join(c[4], c[5], c[7], c[8]), j - 1),
+                )
+
+        self._results[key] = result
+        return result
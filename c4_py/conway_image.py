@@ -0,0 +1,85 @@
+# Conwayのライフゲーム - 盤面をPNG画像にする（Streamlit などのブラウザ表示用）
+# - 盤面（NumPy配列）を1セル1ビットの白黒画像にし、セルの大きさ（scale）倍に拡大してPNGにする
+#   （文字で描くと 512×512 以上の盤面はブラウザが追いつかないので、1枚の画像で送る）
+# - FrameCache は 世代 → PNG の bytes を新しい方から決まったバイト数まで覚えておく（巻き戻し用）
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+import io
+
+import numpy as np
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow がなければ png_frame だけ使えない
+    Image = None
+
+PNG_COMPRESS_LEVEL = 1  # 大きな盤面では圧縮率より速さを優先する
+FRAME_CACHE_BYTES = 64 * 1024 * 1024
+
+
+def png_frame(board, scale=1):
+    """盤面 board[y, x]（0/1）を、生きたセルを黒・死んだセルを白にしたPNGの bytes にする"""
+    if Image is None:
+        raise RuntimeError('PNG にするには Pillow（pip install pillow）が必要です')
+    height, width = board.shape
+    # モード '1' はビットが1なら白なので、死んだセルを1にして行ごとに詰める
+    image = Image.frombytes('1', (width, height), np.packbits(board == 0, axis=1).tobytes())
+    if scale > 1:
+        image = image.resize((width * scale, height * scale), Image.NEAREST)
+    out = io.BytesIO()
+    image.save(out, 'PNG', compress_level=PNG_COMPRESS_LEVEL)
+    return out.getvalue()
+
+
+class FrameCache:
+    """
+    世代 → 画像の bytes
+    世代の小さい方から捨てて、合計が max_bytes 以下になるようにする（世代は増える順に入れる）
+    """
+
+    def __init__(self, max_bytes=FRAME_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._frames = OrderedDict()
+        self._generations = []  # 覚えている世代（小さい順）
+
+    def __len__(self):
+        return len(self._frames)
+
+    def __contains__(self, generation):
+        return generation in self._frames
+
+    def get(self, generation):
+        return self._frames.get(generation)
+
+    def add(self, generation, frame):
+        """世代 generation の画像を覚える（今の最後の世代より後でなければならない）"""
+        if self._generations and generation <= self._generations[-1]:
+            raise ValueError(f'世代は増える順に入れてください: {generation}')
+        self._frames[generation] = frame
+        self._generations.append(generation)
+        self.total_bytes += len(frame)
+        while self.total_bytes > self.max_bytes and len(self._frames) > 1:
+            _, old = self._frames.popitem(last=False)
+            self._generations.pop(0)
+            self.total_bytes -= len(old)
+
+    @property
+    def first(self):
+        """覚えている一番古い世代（何もなければ None）"""
+        return self._generations[0] if self._generations else None
+
+    @property
+    def last(self):
+        """覚えている一番新しい世代（何もなければ None）"""
+        return self._generations[-1] if self._generations else None
+
+    def previous(self, generation):
+        """generation より前で覚えている一番新しい世代（なければ None）"""
+        i = bisect_left(self._generations, generation)
+        return self._generations[i - 1] if i > 0 else None
+
+    def next(self, generation):
+        """generation より後で覚えている一番古い世代（なければ None）"""
+        i = bisect_right(self._generations, generation)
+        return self._generations[i] if i < len(self._generations) else None
@@ -0,0 +1,259 @@
+# Conwayのライフゲーム - NumPy版エンジン
+# - 盤面は uint8 の2次元配列 board[y, x]（1=生, 0=死）
+# - 隣接セルの数は、ずらした配列の足し算で数える（端はトーラス状につながる）
+# - ルールは配列全体へのブール演算で適用する（セルごとの if はない）
+#   B3/S23 以外のルールは「自分 * 9 + 隣接の数」で表（conway_rules）を引く
+# - ターミナル表示とは別に import して使える
+import numpy as np
+
+import conway
+from conway_rules import TABLE_SIZE, is_life, normalize_rule, rule_table
+
+
+def random_board(width=conway.WIDTH, height=conway.HEIGHT, density=0.5, seed=None):
+    """ランダムな盤面を作る（density は生きたセルの割合）"""
+    rng = np.random.default_rng(seed)
+    return (rng.random((height, width)) < density).astype(np.uint8)
+
+
+def cells_to_array(cells):
+    """conway.py の盤面（cells[x][y] = '#' / ' '）を board[y, x] の配列に変換する"""
+    return (np.array(cells, dtype='U1') == '#').T.astype(np.uint8)
+
+
+def array_to_cells(board):
+    """board[y, x] の配列を conway.py の盤面に戻す"""
+    return [['#' if v else ' ' for v in column] for column in board.T.tolist()]
+
+
+def count_neighbors(board, out=None, work=None):
+    """
+    各セルの生きた隣接セルの数を数える（トーラス）
+    縦3セルの和を作ってから横3列を足し、最後に自分を引く（ずらした足し算は4回だけ）
+    out / work に同じ形の uint8 配列を渡すと、途中で配列を確保しない
+    最後の2つの軸を (y, x) とみなすので、盤面を重ねた (枚数, y, x) の配列もそのまま数えられる
+    """
+    if out is None:
+        out = np.empty_like(board)
+    if work is None:
+        work = np.empty_like(board)
+
+    # 縦方向: 上 + 自分 + 下
+    np.copyto(work, board)
+    work[..., 1:, :] += board[..., :-1, :]
+    work[..., 0, :] += board[..., -1, :]
+    work[..., :-1, :] += board[..., 1:, :]
+    work[..., -1, :] += board[..., 0, :]
+
+    # 横方向: 左 + 真ん中 + 右 - 自分
+    np.copyto(out, work)
+    out[..., 1:] += work[..., :-1]
+    out[..., 0] += work[..., -1]
+    out[..., :-1] += work[..., 1:]
+    out[..., -1] += work[..., 0]
+    out -= board
+    return out
+
+
+def apply_table(board, neighbors, table, out=None, work=None):
+    """ルールの表を「自分 * 9 + 隣接の数」で引いて次の状態を作る（neighbors は書き換わる）"""
+    if work is None:
+        work = np.empty_like(board)
+    np.multiply(board, 9, out=work)
+    neighbors += work
+    return np.take(table, neighbors, out=out)
+
+
+def step(board, out=None, neighbors=None, work=None, table=None):
+    """1世代進めた盤面を返す（生: 隣接2か3、誕生: 隣接3。table を渡すとそのルール）"""
+    neighbors = count_neighbors(board, neighbors, work)
+    if out is None:
+        out = np.empty_like(board)
+    if table is not None:
+        return apply_table(board, neighbors, table, out, work)
+    # 次も生きている = 隣接が3 または（生きていて隣接が2）
+    np.equal(neighbors, 2, out=out)
+    out &= board
+    out |= neighbors == 3
+    return out
+
+
+def step_padded(padded, out=None, table=None):
+    """
+    上下左右に1セルずつ縁（ハロー）の付いた配列から、縁を除いた内側の次の世代を計算する
+    （端はつなげない。タイルに分けて計算するときに使う）
+    """
+    center = padded[1:-1, 1:-1]
+    vertical = padded[:-2] + padded[1:-1] + padded[2:]
+    neighbors = vertical[:, :-2] + vertical[:, 1:-1] + vertical[:, 2:] - center
+    if out is None:
+        out = np.empty_like(center)
+    if table is not None:
+        return apply_table(center, neighbors, table, out)
+    np.equal(neighbors, 2, out=out)
+    out &= center
+    out |= neighbors == 3
+    return out
+
+
+def bounding_box(board):
+    """生きたセルを囲む最小の長方形 (x0, y0, x1, y1)（両端を含む）。生きたセルがなければ None"""
+    rows = np.flatnonzero(board.any(axis=1))
+    if len(rows) == 0:
+        return None
+    cols = np.flatnonzero(board[rows[0]:rows[-1] + 1].any(axis=0))
+    return int(cols[0]), int(rows[0]), int(cols[-1]), int(rows[-1])
+
+
+class NumpyLife:
+    """
+    NumPy版のエンジン
+    - 2枚の盤面を交互に使い、作業用の配列も使い回す（世代ごとの確保なし）
+    """
+
+    def __init__(self, board, rule=None):
+        # 渡された配列は書き換えない（2枚を交互に使うので、元の配列にも書き込んでしまう）
+        self.board = np.array(board, dtype=np.uint8, order='C')
+        self.height, self.width = self.board.shape
+        self.generation = 0
+        self.rule = normalize_rule(rule or 'B3/S23')
+        # B3/S23 はブール演算の方が速いので表を使わない
+        self._table = None if is_life(rule) else np.frombuffer(rule_table(rule), dtype=np.uint8)
+        self._next = np.empty_like(self.board)
+        self._neighbors = np.empty_like(self.board)
+        self._work = np.empty_like(self.board)
+        self._stats = None  # 今の盤面の (生きたセルの数, 外接矩形)。step() のあとはわからない
+
+    @classmethod
+    def from_cells(cls, cells, **kwargs):
+        """conway.py の盤面から作る"""
+        return cls(cells_to_array(cells), **kwargs)
+
+    @classmethod
+    def from_bytes(cls, width, height, data, **kwargs):
+        """行優先の bytes（1=生, 0=死）から作る"""
+        return cls(np.frombuffer(data, dtype=np.uint8).reshape(height, width), **kwargs)
+
+    def step(self, generations=1):
+        """generations 世代進める"""
+        for _ in range(generations):
+            step(self.board, self._next, self._neighbors, self._work, self._table)
+            self.board, self._next = self._next, self.board
+            self.generation += 1
+        self._stats = None
+
+    def step_stats(self):
+        """
+        1世代進め、(生きたセルの数, 生まれた数, 死んだ数, 外接矩形) を返す
+        - 生まれた数・死んだ数は、入れ替えたあとの2枚（新しい盤面と1つ前の盤面）から作業用の配列で数える
+          （NumPy では計算と数えるのを1回の走査にまとめられないので、ここは配列全体を2回なめる）
+        - 生きたセルの数は前の世代の数 + 生まれた数 - 死んだ数（数え直さない）
+        - 外接矩形は前の世代の矩形を1セル広げた範囲だけを調べる（盤面の端に届くときだけ全体を調べる）
+        """
+        if self._stats is None:
+            self._stats = (int(np.count_nonzero(self.board)), bounding_box(self.board))
+        population, box = self._stats
+        self.step()
+
+        new, old, work = self.board, self._next, self._work
+        np.bitwise_xor(new, old, out=work)
+        changed = int(np.count_nonzero(work))
+        np.bitwise_and(work, new, out=work)  # 変わったセルのうち今生きている = 生まれた
+        births = int(np.count_nonzero(work))
+        deaths = changed - births
+        population += births - deaths
+        box = self._next_box(box, changed) if population else None
+        self._stats = (population, box)
+        return population, births, deaths, box
+
+    def _next_box(self, box, changed):
+        """前の世代の外接矩形 box から、新しい盤面の外接矩形を求める"""
+        if changed == 0:
+            return box
+        if box is None or (self._table is not None and self._table[0]):
+            # B0 のルールでは生きたセルから離れたところにも生まれるので、毎回全体を調べる
+            return bounding_box(self.board)
+        x0, y0, x1, y1 = box
+        # 生まれるセルは生きたセルの隣だけ。端の行・列に生きたセルがなければ、1セル広げた中だけを見ればよい
+        if x0 < 1 or y0 < 1 or x1 > self.width - 2 or y1 > self.height - 2:
+            return bounding_box(self.board)
+        inner = bounding_box(self.board[y0 - 1:y1 + 2, x0 - 1:x1 + 2])
+        if inner is None:
+            return bounding_box(self.board)
+        return inner[0] + x0 - 1, inner[1] + y0 - 1, inner[2] + x0 - 1, inner[3] + y0 - 1
+
+    def population(self):
+        """生きたセルの数"""
+        if self._stats is not None:
+            return self._stats[0]
+        return int(np.count_nonzero(self.board))
+
+    def changed_cells(self):
+        """直前の step で変わったセルの位置（行優先の添字の配列）"""
+        if self.generation == 0:
+            return np.empty(0, dtype=np.intp)
+        # 入れ替えたあとの _next には1つ前の世代が残っている
+        return np.flatnonzero(self.board != self._next)
+
+    def to_cells(self):
+        """conway.py の盤面に変換する"""
+        return array_to_cells(self.board)
+
+    def to_bytes(self):
+        """行優先の bytes に変換する"""
+        return self.board.tobytes()
+
+
+BATCH_CELLS = 1 << 19  # BatchRuleLife が一度に計算するセル数の目安
+
+
+class BatchRuleLife:
+    """
+    同じ盤面から複数のルールを同時に進める
+    - 盤面をルールの数だけ重ねた (ルール数, y, x) の配列にし、隣接の数は全ルール分を一度に数える
+    - 表もルールの数だけつなげておき、「ルール番号 * 18 + 自分 * 9 + 隣接の数」で一度に引く
+    - 大きな盤面では、キャッシュに収まるルール数（BATCH_CELLS セル分）ずつに分けて計算する
+    """
+
+    def __init__(self, board, rules):
+        board = np.asarray(board, dtype=np.uint8)
+        self.rules = [normalize_rule(rule) for rule in rules]
+        self.height, self.width = board.shape
+        self.generation = 0
+        self.boards = np.repeat(board[None], len(self.rules), axis=0)
+        self._tables = np.frombuffer(b''.join(rule_table(rule) for rule in self.rules), dtype=np.uint8)
+        # 添字はルール数 * 18 まで入ればよいので、3640ルールまでは uint16、それより多ければ uint32
+        index_type = np.uint16 if len(self.rules) * TABLE_SIZE <= 0xFFFF else np.uint32
+        self._offsets = (np.arange(len(self.rules), dtype=index_type) * TABLE_SIZE)[:, None, None]
+        self._group = max(1, BATCH_CELLS // (self.width * self.height))
+        shape = (min(self._group, len(self.rules)), self.height, self.width)
+        self._neighbors = np.empty(shape, dtype=np.uint8)
+        self._work = np.empty(shape, dtype=np.uint8)
+        self._index = np.empty(shape, dtype=index_type)
+
+    @classmethod
+    def from_bytes(cls, width, height, data, rules):
+        """行優先の bytes（1=生, 0=死）から作る"""
+        return cls(np.frombuffer(data, dtype=np.uint8).reshape(height, width), rules)
+
+    def step(self, generations=1):
+        """全てのルールを generations 世代進める"""
+        for _ in range(generations):
+            for start in range(0, len(self.rules), self._group):
+                boards = self.boards[start:start + self._group]
+                n = len(boards)
+                neighbors = count_neighbors(boards, self._neighbors[:n], self._work[:n])
+                np.multiply(boards, 9, out=self._work[:n])
+                neighbors += self._work[:n]
+                np.add(neighbors, self._offsets[start:start + n], out=self._index[:n])
+                np.take(self._tables, self._index[:n], out=boards)
+            self.generation += 1
+
+    def populations(self):
+        """ルールごとの生きたセルの数 {ルール: 数}"""
+        counts = np.count_nonzero(self.boards, axis=(1, 2))
+        return dict(zip(self.rules, (int(c) for c in counts)))
+
+    def to_bytes(self, rule):
+        """指定したルールの盤面を行優先の bytes に変換する"""
+        return self.boards[self.rules.index(normalize_rule(rule))].tobytes()
@@ -0,0 +1,265 @@
+# Conwayのライフゲーム - パターンファイル（RLE / plaintext .cells）の読み書き
+# - 読み込みも書き出しも少しずつ流して処理する（ファイル全体を文字列にしない）
+# - 読み込んだパターンは「生きたセルの横並び (x, y, 長さ)」を順に返し、
+#   bytearray / NumPy配列 / メモリマップした配列の盤面に直接置く
+# - 置く位置（offset）と、盤面からはみ出した部分の扱い（端で折り返す / 切り捨てる）を選べる
+#
+# 使い方:
+#     with open('gosper.rle') as f:
+#         pattern = read_rle(f)
+#         board = new_board(200, 100)
+#         place(pattern, board, 200, 100, offset=(10, 10))
+import re
+
+CHUNK_SIZE = 1 << 16  # 読み込みの単位（文字数）
+LINE_LENGTH = 70  # RLEの1行の最大文字数
+
+RLE_HEADER = re.compile(r'x\s*=\s*(\d+)\s*,\s*y\s*=\s*(\d+)(?:\s*,\s*rule\s*=\s*([^\s,]+))?', re.IGNORECASE)
+RLE_TOKEN = re.compile(r'(\d*)([^\d\s])')
+LIVE_RUN = re.compile(rb'\x01+')
+CELLS_TO_BYTES = bytes(1 if b == ord('O') else 0 for b in range(256))  # 'O' → 1、それ以外 → 0
+
+
+class Pattern:
+    """
+    読み込み中のパターン
+    - width / height: パターンの大きさ（分からなければ None）
+    - rule: B/S 記法のルール（書いてなければ 'B3/S23'）
+    - runs: 生きたセルの横並び (x, y, 長さ) を順に返すイテレータ（1回だけ使える）
+    """
+
+    def __init__(self, width, height, rule, runs, name=None):
+        self.width = width
+        self.height = height
+        self.rule = rule
+        self.runs = runs
+        self.name = name
+
+
+# =============================================================================
+# 読み込み
+# =============================================================================
+def read_rle(stream):
+    """RLE形式のパターンを読む（ヘッダーだけ先に読み、本体は runs で少しずつ読む）"""
+    name = None
+    while True:
+        line = stream.readline()
+        if not line:
+            raise ValueError('RLEのヘッダー（x = ..., y = ...）がありません')
+        line = line.strip()
+        if line.startswith('#N'):
+            name = line[2:].strip()
+        if not line or line.startswith('#'):
+            continue
+        match = RLE_HEADER.match(line)
+        if not match:
+            raise ValueError(f'RLEのヘッダーが読めません: {line[:80]}')
+        width, height, rule = match.groups()
+        return Pattern(int(width), int(height), rule or 'B3/S23', _rle_runs(stream), name)
+
+
+def _rle_runs(stream):
+    """RLEの本体を CHUNK_SIZE ずつ読み、(x, y, 長さ) を返す"""
+    x = y = 0
+    rest = ''
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        text = rest + chunk
+        if chunk:
+            # 末尾の数字は次のかたまりに続くかもしれないので残しておく
+            cut = len(text)
+            while cut and text[cut - 1].isdigit():
+                cut -= 1
+            text, rest = text[:cut], text[cut:]
+        for count, tag in RLE_TOKEN.findall(text):
+            n = int(count) if count else 1
+            if tag in 'b.':
+                x += n
+            elif tag == '$':
+                x = 0
+                y += n
+            elif tag == '!':
+                return
+            else:
+                yield x, y, n
+                x += n
+        if not chunk:
+            return
+
+
+def read_cells(stream):
+    """plaintext（.cells）形式のパターンを読む（'O' か '*' が生きたセル）"""
+    name = None
+    width = height = None
+    if stream.seekable():
+        # 1回目は大きさだけ数えて、先頭に戻る
+        start = stream.tell()
+        width = height = 0
+        for line in stream:
+            if line.startswith('!'):
+                if line.startswith('!Name:'):
+                    name = line[6:].strip()
+                continue
+            width = max(width, len(line.rstrip('\r\n')))
+            height += 1
+        stream.seek(start)
+    return Pattern(width, height, 'B3/S23', _cells_runs(stream), name)
+
+
+def _cells_runs(stream):
+    """plaintextの本体を1行ずつ読み、(x, y, 長さ) を返す"""
+    y = 0
+    for line in stream:
+        if line.startswith('!'):
+            continue
+        row = line.rstrip('\r\n').replace('*', 'O').encode('ascii', 'replace')
+        for match in LIVE_RUN.finditer(row.translate(CELLS_TO_BYTES)):
+            yield match.start(), y, match.end() - match.start()
+        y += 1
+
+
+def read_pattern(stream, path=''):
+    """拡張子（.rle / .cells）でRLEかplaintextかを選んで読む"""
+    if path.endswith('.cells'):
+        return read_cells(stream)
+    return read_rle(stream)
+
+
+# =============================================================================
+# 盤面に置く
+# =============================================================================
+def new_board(width, height, kind='bytearray', path=None):
+    """
+    空の盤面を作る
+    kind: 'bytearray'（行優先の平らな配列）/ 'numpy'（board[y, x]）/ 'memmap'（path のファイルに対応付けた board[y, x]）
+    """
+    if kind == 'bytearray':
+        return bytearray(width * height)
+    import numpy as np
+    if kind == 'numpy':
+        return np.zeros((height, width), dtype=np.uint8)
+    if kind == 'memmap':
+        return np.memmap(path, dtype=np.uint8, mode='w+', shape=(height, width))
+    raise ValueError(f'未対応の盤面の種類です: {kind}')
+
+
+def place(pattern, board, width, height, offset=(0, 0), wrap=True):
+    """
+    パターンを盤面に置く（生きたセルを書き込むだけで、盤面の他の部分は変えない）
+    wrap=True なら盤面の端で反対側に折り返し、False ならはみ出した部分は捨てる
+    戻り値: 置いた生きたセルの数
+    """
+    flat = isinstance(board, (bytearray, memoryview))
+    ox, oy = offset
+    placed = 0
+    for x, y, n in pattern.runs:
+        x += ox
+        y += oy
+        if wrap:
+            y %= height
+            pieces = []
+            x %= width
+            while n > 0:
+                take = min(n, width - x)
+                pieces.append((x, take))
+                n -= take
+                x = 0
+        else:
+            if not 0 <= y < height:
+                continue
+            start, stop = max(x, 0), min(x + n, width)
+            pieces = [(start, stop - start)] if stop > start else []
+        for x, n in pieces:
+            if flat:
+                board[y * width + x:y * width + x + n] = b'\x01' * n
+            else:
+                board[y, x:x + n] = 1
+            placed += n
+    return placed
+
+
+def load_pattern(path, width=None, height=None, offset=(0, 0), wrap=True, kind='bytearray', memmap_path=None):
+    """
+    パターンファイルを読み込んで新しい盤面に置く
+    width / height を省略すると、パターン＋offset が収まる大きさにする
+    戻り値: (盤面, 幅, 高さ, パターン)
+    """
+    with open(path, encoding='utf-8') as f:
+        pattern = read_pattern(f, path)
+        if width is None:
+            width = (pattern.width or 1) + max(offset[0], 0)
+        if height is None:
+            height = (pattern.height or 1) + max(offset[1], 0)
+        board = new_board(width, height, kind, memmap_path)
+        place(pattern, board, width, height, offset, wrap)
+    return board, width, height, pattern
+
+
+# =============================================================================
+# 書き出し
+# =============================================================================
+def board_rows(board, width, height):
+    """盤面（bytes / bytearray / board[y, x] の配列）を1行ずつ bytes で返す"""
+    if isinstance(board, (bytes, bytearray, memoryview)):
+        view = memoryview(board)
+        for y in range(height):
+            yield bytes(view[y * width:(y + 1) * width])
+    else:
+        for y in range(height):
+            yield board[y].tobytes()
+
+
+def _wrapped(tokens, stream, line_length=LINE_LENGTH):
+    """トークンを1行 line_length 文字以内で書き出す"""
+    line = ''
+    for token in tokens:
+        if len(line) + len(token) > line_length:
+            stream.write(line + '\n')
+            line = ''
+        line += token
+    stream.write(line + '\n')
+
+
+def _rle_tokens(rows):
+    """行ごとに生きたセルの並びを 'b' / 'o' の連長に変え、トークンを順に返す"""
+    pending_rows = 0  # まだ書いていない改行（'$'）の数
+    for row in rows:
+        runs = [(m.start(), m.end()) for m in LIVE_RUN.finditer(row)]
+        if runs:
+            if pending_rows:
+                yield f'{pending_rows if pending_rows > 1 else ""}$'
+                pending_rows = 0
+            x = 0
+            for start, end in runs:
+                if start > x:
+                    yield f'{start - x if start - x > 1 else ""}b'
+                yield f'{end - start if end - start > 1 else ""}o'
+                x = end
+        pending_rows += 1
+    yield '!'
+
+
+def write_rle(stream, board, width, height, rule='B3/S23', name=None):
+    """盤面をRLE形式で書き出す（行ごとに連長を作って流す）"""
+    if name:
+        stream.write(f'#N {name}\n')
+    stream.write(f'x = {width}, y = {height}, rule = {rule}\n')
+    _wrapped(_rle_tokens(board_rows(board, width, height)), stream)
+
+
+def write_cells(stream, board, width, height, name=None):
+    """盤面をplaintext（.cells）形式で書き出す"""
+    if name:
+        stream.write(f'!Name: {name}\n')
+    table = bytes.maketrans(b'\x00\x01', b'.O')
+    for row in board_rows(board, width, height):
+        stream.write(row.translate(table).decode('ascii').rstrip('.') + '\n')
+
+
+def save_pattern(path, board, width, height, rule='B3/S23', name=None):
+    """拡張子（.rle / .cells）に合わせて書き出す"""
+    with open(path, 'w', encoding='utf-8') as f:
+        if path.endswith('.cells'):
+            write_cells(f, board, width, height, name)
+        else:
+            write_rle(f, board, width, height, rule, name)
@@ -0,0 +1,137 @@
+# Conwayのライフゲーム - 計算と表示を分けて動かす
+# - 計算側（FrameProducer）は別スレッドで世代を進め、盤面の bytes を上限つきのキューに入れる
+#   キューがいっぱいなら一番古い盤面を捨てて入れる（表示が遅くても計算は止まらない）
+# - 表示側（play / play_async）は決まったフレームレートでキューを空にし、一番新しい盤面だけを描く
+#   （表示が追いつかないときは途中の世代を飛ばす。計算が遅いときは同じ盤面を描き直さない）
+# - 表示側はふつうのスレッドでも asyncio のタスクでも動かせる
+import asyncio
+import queue
+import threading
+import time
+
+FPS = 30
+QUEUE_SIZE = 8
+
+
+class FrameProducer:
+    """
+    別スレッドでエンジンを進め、(世代, 盤面の bytes) をキューに入れる
+    - generations: 何世代目まで進めるか（None なら stop() まで）
+    - delay: 1世代ごとの待ち時間（秒）。0 ならできるだけ速く進める
+    - on_step: 1世代進めるたびに計算側のスレッドで呼ぶ関数（チェックポイントの保存など）
+    """
+
+    def __init__(self, engine, generations=None, delay=0.0, maxsize=QUEUE_SIZE, on_step=None):
+        self.engine = engine
+        self.generations = generations
+        self.delay = delay
+        self.on_step = on_step
+        self.frames = queue.Queue(maxsize)
+        self.produced = 0  # キューに入れた盤面の数
+        self.dropped = 0  # 表示される前に捨てた盤面の数
+        self.error = None
+        self._stop = threading.Event()
+        self._finished = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='life-producer', daemon=True)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def finished(self):
+        """計算が終わり、キューにも盤面が残っていないか"""
+        return self._finished.is_set() and self.frames.empty()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """計算を止め、スレッドが終わるまで待つ（世代の途中では止まらない）"""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _put(self, frame):
+        """キューに入れる。いっぱいなら一番古い盤面を捨てる"""
+        while True:
+            try:
+                self.frames.put_nowait(frame)
+                self.produced += 1
+                return
+            except queue.Full:
+                try:
+                    self.frames.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def _run(self):
+        engine = self.engine
+        try:
+            self._put((engine.generation, engine.to_bytes()))
+            while not self._stop.is_set() and (self.generations is None or engine.generation < self.generations):
+                engine.step()
+                if self.on_step is not None:
+                    self.on_step(engine)
+                self._put((engine.generation, engine.to_bytes()))
+                if self.delay:
+                    self._stop.wait(self.delay)
+        except BaseException as e:  # 表示側のスレッドで投げ直す（Ctrl-C で止めたときの KeyboardInterrupt も）
+            self.error = e
+        finally:
+            self._finished.set()
+
+    def latest(self):
+        """キューを空にして一番新しい盤面を返す（新しい盤面がなければ None）。途中の盤面は捨てる"""
+        frame = None
+        while True:
+            try:
+                newer = self.frames.get_nowait()
+            except queue.Empty:
+                break
+            if frame is not None:
+                self.dropped += 1
+            frame = newer
+        if frame is None and self.error is not None:
+            error, self.error = self.error, None
+            raise error
+        return frame
+
+
+def play(producer, draw, fps=FPS):
+    """
+    fps 回/秒で一番新しい盤面を draw(世代, bytes) に渡す（計算が終わり、最後の盤面を描いたら戻る）
+    スレッドの target にもそのまま使える
+    """
+    interval = 1 / fps
+    deadline = time.monotonic()
+    while True:
+        frame = producer.latest()
+        if frame is not None:
+            draw(*frame)
+        elif producer.finished:
+            producer.latest()  # 計算側で起きた例外があれば投げる
+            return
+        # 描くのに時間がかかって遅れた分は取り戻さず、次の時刻から数え直す
+        deadline = max(deadline + interval, time.monotonic())
+        time.sleep(max(0.0, deadline - time.monotonic()))
+
+
+async def play_async(producer, draw, fps=FPS):
+    """play の asyncio 版（待つ間はイベントループに戻る）"""
+    interval = 1 / fps
+    loop = asyncio.get_running_loop()
+    deadline = loop.time()
+    while True:
+        frame = producer.latest()
+        if frame is not None:
+            draw(*frame)
+        elif producer.finished:
+            producer.latest()
+            return
+        deadline = max(deadline + interval, loop.time())
+        await asyncio.sleep(max(0.0, deadline - loop.time()))
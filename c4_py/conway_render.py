@@ -0,0 +1,107 @@
+# Conwayのライフゲーム - 差分だけを書き出すターミナル表示
+# - 前のフレームを覚えておき、変わったセルだけ ANSI のカーソル移動で書き換える
+# - 変わったセルが多いときは、フレーム全体を1回の write でまとめて書く
+# - 半ブロック表示では、上下2行を1文字（▀ ▄ █）にまとめる
+# - 入力は行優先の bytes（1=生, 0=死）。どのエンジンの to_bytes() でも表示できる
+import sys
+
+HIDE_CURSOR = '\x1b[?25l'
+SHOW_CURSOR = '\x1b[?25h'
+CLEAR_SCREEN = '\x1b[2J'
+CURSOR_HOME = '\x1b[H'
+
+# 半ブロック表示: 上のセル + 2 * 下のセル → 文字
+HALF_BLOCKS = {0: ' ', 1: '▀', 2: '▄', 3: '█'}
+
+# 変わっていない文字がこれ以下の長さなら、カーソル移動せずに書き直してつなげる
+# （カーソル移動のエスケープ列の方が長くなるため）
+MERGE_GAP = 6
+
+
+def frame_lines(data, width, height, half_block=False, alive='#', dead=' '):
+    """盤面の bytes を表示用の行（文字列）のリストにする"""
+    if not half_block:
+        text = bytes(data).translate(bytes.maketrans(b'\x00\x01', (dead + alive).encode('ascii'))).decode('ascii')
+        return [text[y * width:(y + 1) * width] for y in range(height)]
+
+    # 2行ずつ「上 + 2 * 下」を整数の足し算でまとめて計算する（1セル1バイトなので桁あふれしない）
+    data = bytes(data)
+    if height % 2:
+        data += bytes(width)
+    lines = []
+    for y in range(0, height, 2):
+        top = int.from_bytes(data[y * width:(y + 1) * width], 'big')
+        bottom = int.from_bytes(data[(y + 1) * width:(y + 2) * width], 'big')
+        codes = (top + 2 * bottom).to_bytes(width, 'big').decode('latin-1')
+        lines.append(codes.translate(HALF_BLOCKS))
+    return lines
+
+
+def changed_runs(old, new):
+    """2つの行で違う部分を (開始列, 終了列) の一覧で返す（近い部分はつなげる）"""
+    runs = []
+    for x, (a, b) in enumerate(zip(old, new)):
+        if a == b:
+            continue
+        if runs and x - runs[-1][1] <= MERGE_GAP:
+            runs[-1][1] = x + 1
+        else:
+            runs.append([x, x + 1])
+    return runs
+
+
+class TerminalRenderer:
+    """
+    ターミナルに盤面を表示する
+    - full_redraw_ratio: 変わったセルの割合がこれを超えたらフレーム全体を書き直す
+    - 表示のたびに last_changed（変わったセル数）と last_written（書いた文字数）を記録する
+    """
+
+    def __init__(self, out=None, half_block=False, full_redraw_ratio=0.3, alive='#', dead=' '):
+        self.out = out or sys.stdout
+        self.half_block = half_block
+        self.full_redraw_ratio = full_redraw_ratio
+        self.alive = alive
+        self.dead = dead
+        self.last_changed = 0
+        self.last_written = 0
+        self._previous = None
+
+    def render(self, data, width, height):
+        """1フレーム表示する"""
+        lines = frame_lines(data, width, height, self.half_block, self.alive, self.dead)
+        previous = self._previous
+        self._previous = lines
+
+        if previous is None or len(previous) != len(lines) or len(previous[0]) != len(lines[0]):
+            self._write(HIDE_CURSOR + CLEAR_SCREEN + CURSOR_HOME + '\n'.join(lines))
+            self.last_changed = len(lines) * len(lines[0])
+            return
+
+        # 文字列の比較で変わった行だけを探し、その行の中で変わった部分を書く
+        parts = []
+        changed = 0
+        limit = self.full_redraw_ratio * len(lines) * len(lines[0])
+        for y, (old, new) in enumerate(zip(previous, lines)):
+            if old == new:
+                continue
+            for start, end in changed_runs(old, new):
+                changed += end - start
+                parts.append(f'\x1b[{y + 1};{start + 1}H{new[start:end]}')
+            if changed > limit:
+                # ほとんど変わったなら全体を1回で書いた方が速い
+                parts = [CURSOR_HOME + '\n'.join(lines)]
+                break
+        self.last_changed = changed
+        self._write(''.join(parts))
+
+    def close(self):
+        """カーソルを表示に戻し、盤面の下に移動する"""
+        rows = len(self._previous) if self._previous else 0
+        self._write(f'\x1b[{rows + 1};1H' + SHOW_CURSOR + '\n')
+
+    def _write(self, text):
+        """まとめて1回で書き出す"""
+        self.out.write(text)
+        self.out.flush()
+        self.last_written = len(text)
@@ -0,0 +1,65 @@
+# Conwayのライフゲーム - B/S 記法のルール
+# - 'B3/S23'（ライフゲーム）、'B36/S23'（HighLife）、'B2/S'（Seeds）などを読む
+#   'S23/B3' のような順番や、古い '23/3'（生存/誕生）の書き方も読める
+# - ルールは「(自分が生きているか, 隣接の数) → 次の状態」の表（18バイト）にする
+#   添字 = 自分(0/1) * 9 + 隣接の数(0～8)
+# - 表はNumPy版・純Python版のエンジンで共通に使う（セルごとの if はない）
+LIFE = 'B3/S23'
+TABLE_SIZE = 18
+
+# よく使うルールの名前
+NAMED_RULES = {
+    'life': 'B3/S23',
+    'highlife': 'B36/S23',
+    'seeds': 'B2/S',
+    'daynight': 'B3678/S34678',
+    'maze': 'B3/S12345',
+    'replicator': 'B1357/S1357',
+}
+
+
+def parse_rule(rule):
+    """ルールの文字列を (誕生する隣接数の集合, 生き残る隣接数の集合) にする"""
+    text = NAMED_RULES.get(rule.lower(), rule).replace(' ', '').upper()
+    parts = text.split('/')
+    if len(parts) != 2:
+        raise ValueError(f'B/S 記法のルールではありません: {rule}')
+
+    births = survivals = None
+    for part in parts:
+        if part.startswith('B'):
+            births = part[1:]
+        elif part.startswith('S'):
+            survivals = part[1:]
+    if births is None and survivals is None:
+        # 古い書き方: 生存/誕生
+        survivals, births = parts
+    if births is None or survivals is None or not all(d.isdigit() for d in births + survivals):
+        raise ValueError(f'B/S 記法のルールではありません: {rule}')
+    if any(int(d) > 8 for d in births + survivals):
+        raise ValueError(f'隣接の数は0～8です: {rule}')
+    return frozenset(int(d) for d in births), frozenset(int(d) for d in survivals)
+
+
+def format_rule(births, survivals):
+    """(誕生, 生存) を 'B3/S23' の形の文字列にする"""
+    return 'B' + ''.join(str(n) for n in sorted(births)) + '/S' + ''.join(str(n) for n in sorted(survivals))
+
+
+def normalize_rule(rule):
+    """ルールを 'B3/S23' の形にそろえる（名前や書き方の違いをなくす）"""
+    return format_rule(*parse_rule(rule))
+
+
+def rule_table(rule):
+    """ルールを18バイトの表にする（添字 = 自分 * 9 + 隣接の数）"""
+    births, survivals = parse_rule(rule)
+    return bytes(
+        1 if (alive and n in survivals) or (not alive and n in births) else 0
+        for alive in (0, 1) for n in range(9)
+    )
+
+
+def is_life(rule):
+    """ふつうのライフゲーム（B3/S23）か"""
+    return rule is None or normalize_rule(rule) == LIFE
@@ -0,0 +1,192 @@
+# Conwayのライフゲーム - 世代ごとの統計を流しながら処理する
+# - generation_stats() は世代を進めながら、世代ごとの小さな記録（GenerationStats）を1つずつ返すジェネレーター
+#   エンジンに step_stats() があれば、計算のときに手元にある新旧の盤面から数える
+#   （なければ前の世代の to_bytes() と比べる）
+# - 記録はそのまま流れていき、履歴は持たない（何百万世代でもメモリは増えない）
+# - 受け取る側は組み合わせて使う
+#     records = stop_on_extinction(generation_stats(engine, 1_000_000))
+#     average = RollingAverage(1000)
+#     with CsvSink('stats.csv') as csv:
+#         last = drain(observe(records, average, csv))
+import csv
+import struct
+from collections import deque, namedtuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPyがなくても純Pythonで動く
+    np = None
+
+# 外接矩形 (x0, y0, x1, y1) は両端を含む。生きたセルがないときは全部 -1
+# activity は変わったセル（生まれた + 死んだ）の盤面全体に対する割合
+GenerationStats = namedtuple(
+    'GenerationStats',
+    'generation population births deaths x0 y0 x1 y1 activity',
+)
+
+# バイナリの1記録（リトルエンディアン、48バイト）
+RECORD = struct.Struct('<QQQQiiiid')
+NO_BOX = (-1, -1, -1, -1)
+
+
+def bytes_stats(old, new, width):
+    """2つの盤面（bytes）から (生きたセルの数, 生まれた数, 死んだ数, 外接矩形) を数える（step_stats がないエンジン用）"""
+    if np is not None:
+        from conway_numpy import bounding_box
+
+        old = np.frombuffer(old, dtype=np.uint8)
+        new = np.frombuffer(new, dtype=np.uint8)
+        births = int(np.count_nonzero(new > old))
+        deaths = int(np.count_nonzero(new < old))
+        return int(np.count_nonzero(new)), births, deaths, bounding_box(new.reshape(-1, width))
+    births = sum(1 for a, b in zip(old, new) if b > a)
+    deaths = sum(1 for a, b in zip(old, new) if b < a)
+    live = [i for i, v in enumerate(new) if v]
+    if not live:
+        return 0, births, deaths, None
+    xs = {i % width for i in live}
+    return len(live), births, deaths, (min(xs), live[0] // width, max(xs), live[-1] // width)
+
+
+def generation_stats(engine, generations=None):
+    """
+    engine を generations 世代目まで（None なら止められるまで）1世代ずつ進め、
+    世代ごとに GenerationStats を返す
+    """
+    cells = engine.width * engine.height
+    step_stats = getattr(engine, 'step_stats', None)
+    previous = None if step_stats else engine.to_bytes()
+    while generations is None or engine.generation < generations:
+        if step_stats is not None:
+            population, births, deaths, box = step_stats()
+        else:
+            engine.step()
+            current = engine.to_bytes()
+            population, births, deaths, box = bytes_stats(previous, current, engine.width)
+            previous = current
+        yield GenerationStats(engine.generation, population, births, deaths,
+                              *(box or NO_BOX), (births + deaths) / cells)
+
+
+# =============================================================================
+# 流れの途中に入れるもの
+# =============================================================================
+def observe(records, *observers):
+    """記録をそのまま流しながら、1つずつ observers（記録を受け取る関数）に渡す"""
+    for record in records:
+        for observer in observers:
+            observer(record)
+        yield record
+
+
+def stop_when(records, condition):
+    """condition(記録) が真になった記録まで流して止める"""
+    for record in records:
+        yield record
+        if condition(record):
+            return
+
+
+def stop_on_extinction(records):
+    """生きたセルがなくなった世代まで流して止める"""
+    return stop_when(records, lambda record: record.population == 0)
+
+
+def drain(records):
+    """最後まで流し、最後の記録を返す（何もなければ None）"""
+    last = None
+    for last in records:
+        pass
+    return last
+
+
+# =============================================================================
+# 記録を受け取るもの（observe に渡す）
+# =============================================================================
+class RollingAverage:
+    """直近 window 世代の field の平均（覚えるのは window 個の値だけ）"""
+
+    def __init__(self, window, field='population'):
+        self.window = window
+        self.field = field
+        self.value = None
+        self._values = deque(maxlen=window)
+        self._total = 0
+
+    def __call__(self, record):
+        value = getattr(record, self.field)
+        if len(self._values) == self.window:
+            self._total -= self._values[0]
+        self._values.append(value)
+        self._total += value
+        self.value = self._total / len(self._values)
+
+
+class RunningSummary:
+    """field の件数・平均・最小・最大（値を覚えずに更新する）"""
+
+    def __init__(self, field='population'):
+        self.field = field
+        self.count = 0
+        self.mean = 0.0
+        self.minimum = None
+        self.maximum = None
+
+    def __call__(self, record):
+        value = getattr(record, self.field)
+        self.count += 1
+        self.mean += (value - self.mean) / self.count
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+
+
+class CsvSink:
+    """記録をCSVに1行ずつ書く（1行目は列名）"""
+
+    def __init__(self, path):
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(GenerationStats._fields)
+
+    def __call__(self, record):
+        self._writer.writerow(record)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+
+class BinarySink:
+    """記録を1つ48バイトの固定長（RECORD）で書く。read_binary で読める"""
+
+    def __init__(self, path):
+        self._file = open(path, 'wb')
+
+    def __call__(self, record):
+        self._file.write(RECORD.pack(*record))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+
+def read_binary(path):
+    """BinarySink で書いたファイルから記録を1つずつ読む"""
+    with open(path, 'rb') as f:
+        while chunk := f.read(RECORD.size):
+            yield GenerationStats(*RECORD.unpack(chunk))
+
+
+def open_sink(path):
+    """拡張子が .csv なら CsvSink、それ以外は BinarySink"""
+    return CsvSink(path) if path.lower().endswith('.csv') else BinarySink(path)
@@ -0,0 +1,146 @@
+"""
+Conwayのライフゲーム - Streamlit版
+    streamlit run conway_streamlit.py
+
+- 各世代はNumPyの盤面から作った1枚のPNGとして、1つの placeholder に描く
+- 再生・一時停止・1ステップは st.fragment の中だけをやり直す（スクリプト全体は毎フレーム動かない）
+- 描いた画像は世代ごとに覚えておき、巻き戻しは計算し直さずに画像を出すだけ
+"""
+
+import numpy as np
+import streamlit as st
+
+import conway
+from conway_image import FrameCache, png_frame
+from conway_rules import is_life, normalize_rule
+
+# ページ設定
+st.set_page_config(
+    page_title="ライフゲーム",
+    page_icon="🧬",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+# ブラウザで縮小・拡大されてもセルをぼかさない
+st.markdown("<style>img { image-rendering: pixelated; }</style>", unsafe_allow_html=True)
+
+# =============================================================================
+# 定数
+# =============================================================================
+SIZES = (128, 256, 512, 1024, 2048)
+ENGINE_CHOICES = ('numpy', 'active')  # B/S 記法のルールを使えて、大きな盤面でも速いエンジン
+DISPLAY_PIXELS = 1024  # 画像の長い辺がだいたいこの大きさになるようにセルを拡大する
+
+
+# =============================================================================
+# 盤面と画像
+# =============================================================================
+def board_array(engine):
+    """エンジンの盤面を board[y, x] の配列にする"""
+    return np.frombuffer(engine.to_bytes(), dtype=np.uint8).reshape(engine.height, engine.width)
+
+
+def new_life(settings):
+    """設定から新しい盤面を作り、0世代目の画像を覚える"""
+    size, density, seed, rule, engine_name = settings
+    data = conway.random_bytes(size, size, density, seed)
+    engine = conway.make_engine(engine_name, size, size, data, None if is_life(rule) else rule)
+    life = {
+        'settings': settings,
+        'engine': engine,
+        'scale': max(1, DISPLAY_PIXELS // size),
+        'cache': FrameCache(),
+        'view': 0,  # 表示している世代
+    }
+    life['cache'].add(0, png_frame(board_array(engine), life['scale']))
+    return life
+
+
+def step_forward(life, generations):
+    """
+    表示を1枚進める
+    覚えている先の世代があればその画像を出し、なければ generations 世代計算して画像を作る
+    """
+    cache = life['cache']
+    following = cache.next(life['view'])
+    if following is not None:
+        life['view'] = following
+        return
+    engine = life['engine']
+    engine.step(generations)
+    cache.add(engine.generation, png_frame(board_array(engine), life['scale']))
+    life['view'] = engine.generation
+
+
+def step_back(life):
+    """表示を1枚戻す（覚えている画像を出すだけ）"""
+    previous = life['cache'].previous(life['view'])
+    if previous is not None:
+        life['view'] = previous
+
+
+# =============================================================================
+# 設定（サイドバー）
+# =============================================================================
+with st.sidebar:
+    st.markdown("### ⚙️ 設定")
+    size = st.select_slider("盤面の大きさ", SIZES, value=512)
+    density = st.slider("最初に生きているセルの割合", 0.05, 0.95, 0.3, 0.05)
+    seed = int(st.number_input("乱数の種", min_value=0, value=0, step=1))
+    rule_text = st.text_input("ルール（B/S 記法）", "B3/S23", help="例: B3/S23, B36/S23, highlife, seeds")
+    engine_name = st.selectbox("エンジン", ENGINE_CHOICES)
+    fps = st.slider("1秒に描く回数", 1, 30, 10)
+    skip = st.slider("1枚ごとに進める世代数", 1, 50, 1)
+    restart = st.button("🔄 最初から", use_container_width=True)
+
+try:
+    rule = normalize_rule(rule_text)
+except ValueError as e:
+    st.error(str(e))
+    st.stop()
+
+# 盤面を決める設定が変わったら作り直す
+settings = (size, density, seed, rule, engine_name)
+if restart or 'life' not in st.session_state or st.session_state.life['settings'] != settings:
+    st.session_state.life = new_life(settings)
+    st.session_state.playing = False
+
+playing = st.session_state.get('playing', False)
+
+
+# =============================================================================
+# 表示（ここだけを毎フレームやり直す）
+# =============================================================================
+@st.fragment(run_every=1 / fps if playing else None)
+def life_view():
+    life = st.session_state.life
+    cache = life['cache']
+
+    col_play, col_back, col_step, col_first = st.columns(4)
+    if col_play.button("⏸️ 一時停止" if playing else "▶️ 再生", type="primary", use_container_width=True):
+        st.session_state.playing = not playing
+        st.rerun()  # 描く間隔（run_every）を変えるため、ここだけはスクリプト全体をやり直す
+    if col_back.button("⏪ 戻る", disabled=playing, use_container_width=True):
+        step_back(life)
+    if col_step.button("⏩ 1ステップ", disabled=playing, use_container_width=True):
+        step_forward(life, skip)
+    if col_first.button("⏮️ 覚えている最初へ", disabled=playing, use_container_width=True):
+        life['view'] = cache.first
+    if playing:
+        step_forward(life, skip)
+
+    # 画像は1つの placeholder に差し替える
+    frame = st.empty()
+    frame.image(cache.get(life['view']))
+
+    engine = life['engine']
+    st.caption(
+        f"世代 {life['view']:,}（計算済み {engine.generation:,}, 生きたセル {engine.population():,}） / "
+        f"{engine.width}×{engine.height}, {rule} / "
+        f"覚えている画像 {len(cache):,} 枚（{cache.first:,}～{cache.last:,} 世代, {cache.total_bytes / 1e6:.1f} MB）"
+    )
+
+
+st.markdown("## 🧬 ライフゲーム")
+life_view()
@@ -0,0 +1,275 @@
+# Conwayのライフゲーム - 複数プロセスでタイルに分けて計算するエンジン
+# - 盤面をタイルに分け、各タイルを共有メモリ（multiprocessing.shared_memory）に置く
+# - タイルは上下左右に1セルの縁（ハロー）を持ち、世代ごとに隣のタイルの端をコピーする
+# - 同期はバリアだけで行い、盤面をpickleしてプロセス間で送ることはない
+# - 各タイルは2枚の盤面を交互に使う（読む面と書く面）
+# - バリアは時間切れつき。ワーカーが落ちたり止まったりしたら、待っている全員のバリアを壊して
+#   step() は RuntimeError を投げる（close() も固まらずにワーカーを止めて共有メモリを解放する）
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+from threading import BrokenBarrierError
+
+import numpy as np
+
+import conway
+from conway_numpy import step_padded
+from conway_rules import is_life, normalize_rule, rule_table
+
+# 制御用の共有配列: [命令, 進める世代数, 今の面(0/1)]
+COMMAND_STEP = 0
+COMMAND_STOP = 1
+
+BARRIER_TIMEOUT = 60.0  # 1世代の計算や命令の受け渡しを待つ最長の秒数
+
+
+def split_sizes(total, parts):
+    """total を parts 個になるべく均等に分けたときの (開始位置, 大きさ) の一覧"""
+    base, extra = divmod(total, parts)
+    sizes = [base + (i < extra) for i in range(parts)]
+    starts = [sum(sizes[:i]) for i in range(parts)]
+    return list(zip(starts, sizes))
+
+
+def attach_tiles(names, shapes):
+    """共有メモリのタイルにつなぎ、(SharedMemoryの一覧, 配列の一覧) を返す"""
+    blocks = [shared_memory.SharedMemory(name=name) for name in names]
+    arrays = [np.ndarray(shape, dtype=np.uint8, buffer=block.buf) for block, shape in zip(blocks, shapes)]
+    return blocks, arrays
+
+
+def fill_halo(arrays, grid, index, face):
+    """タイル index の face 面の縁を、隣のタイル（トーラス）の内側の端で埋める"""
+    rows, cols = grid
+    ty, tx = divmod(index, cols)
+    tile = arrays[index][face]
+
+    def neighbor(dy, dx):
+        return arrays[((ty + dy) % rows) * cols + (tx + dx) % cols][face]
+
+    tile[0, 1:-1] = neighbor(-1, 0)[-2, 1:-1]  # 上
+    tile[-1, 1:-1] = neighbor(1, 0)[1, 1:-1]  # 下
+    tile[1:-1, 0] = neighbor(0, -1)[1:-1, -2]  # 左
+    tile[1:-1, -1] = neighbor(0, 1)[1:-1, 1]  # 右
+    tile[0, 0] = neighbor(-1, -1)[-2, -2]  # 左上
+    tile[0, -1] = neighbor(-1, 1)[-2, 1]  # 右上
+    tile[-1, 0] = neighbor(1, -1)[1, -2]  # 左下
+    tile[-1, -1] = neighbor(1, 1)[1, 1]  # 右下
+
+
+def worker(names, shapes, grid, my_tiles, control_name, start, sync, done, table=None,
+           timeout=BARRIER_TIMEOUT):
+    """
+    ワーカープロセス
+    start で命令を待ち、指定の世代数だけ「計算 → バリア → 縁の交換 → バリア」を繰り返す
+    例外や時間切れで抜けるときは全てのバリアを壊し、他のワーカーと親プロセスを待たせない
+    """
+    blocks, arrays = attach_tiles(names, shapes)
+    if table is not None:
+        table = np.frombuffer(table, dtype=np.uint8)
+    control_block = shared_memory.SharedMemory(name=control_name)
+    control = np.ndarray((3,), dtype=np.int64, buffer=control_block.buf)
+    try:
+        while True:
+            start.wait()  # 命令はいつ来るかわからないので、ここだけは時間切れなしで待つ
+            if control[0] == COMMAND_STOP:
+                break
+            face = int(control[2])
+            for _ in range(int(control[1])):
+                for index in my_tiles:
+                    tile = arrays[index]
+                    step_padded(tile[face], tile[1 - face, 1:-1, 1:-1], table)
+                sync.wait(timeout)  # 全タイルの内側が書き終わるまで待つ
+                for index in my_tiles:
+                    fill_halo(arrays, grid, index, 1 - face)
+                sync.wait(timeout)  # 全タイルの縁が埋まるまで待つ
+                face = 1 - face
+            done.wait(timeout)
+    except BaseException as e:
+        for barrier in (start, sync, done):
+            barrier.abort()
+        if not isinstance(e, BrokenBarrierError):
+            raise
+    finally:
+        del arrays, control
+        for block in blocks:
+            block.close()
+        control_block.close()
+
+
+class TiledLife:
+    """
+    複数プロセス版のエンジン（conway.py と同じルール・トーラス盤面）
+    - tiles: タイルの分け方 (縦の数, 横の数)。省略時はCPU数だけ横長の帯に分ける
+    - processes: ワーカープロセスの数（省略時はCPU数とタイル数の小さい方）
+    - timeout: 1世代の計算や命令の受け渡しを待つ最長の秒数
+    使い終わったら close() する（with 文でも使える）
+    """
+
+    def __init__(self, board, tiles=None, processes=None, rule=None, timeout=BARRIER_TIMEOUT):
+        board = np.asarray(board, dtype=np.uint8)
+        self.height, self.width = board.shape
+        self.generation = 0
+        self.rule = normalize_rule(rule or 'B3/S23')
+        table = None if is_life(rule) else rule_table(rule)  # 18バイトの表だけを渡す
+        cpus = os.cpu_count() or 1
+        if tiles is None:
+            tiles = (min(cpus, self.height), 1)
+        self.grid = tiles
+        self._row_splits = split_sizes(self.height, tiles[0])
+        self._col_splits = split_sizes(self.width, tiles[1])
+        n_tiles = tiles[0] * tiles[1]
+        self.timeout = timeout
+        self._closed = False
+        self._blocks = []
+        self._workers = []
+        try:
+            self._setup(board, n_tiles, min(processes or cpus, n_tiles), table)
+        except BaseException:
+            # 途中までに作った共有メモリとワーカーを残さない
+            self._release(force=True)
+            raise
+
+    def _setup(self, board, n_tiles, processes, table):
+        """共有メモリを作って盤面を書き込み、ワーカーを起動する"""
+        # タイルごとの共有メモリ: [面, 縦+2, 横+2]
+        self._shapes = []
+        for _, h in self._row_splits:
+            for _, w in self._col_splits:
+                shape = (2, h + 2, w + 2)
+                self._shapes.append(shape)
+                self._blocks.append(shared_memory.SharedMemory(create=True, size=int(np.prod(shape))))
+        self._arrays = [np.ndarray(shape, dtype=np.uint8, buffer=block.buf)
+                        for block, shape in zip(self._blocks, self._shapes)]
+        self._control_block = shared_memory.SharedMemory(create=True, size=3 * 8)
+        self._blocks.append(self._control_block)
+        self._control = np.ndarray((3,), dtype=np.int64, buffer=self._control_block.buf)
+        self._control[:] = (COMMAND_STEP, 0, 0)
+        self._load(board)
+
+        self._start = multiprocessing.Barrier(processes + 1)
+        self._done = multiprocessing.Barrier(processes + 1)
+        sync = multiprocessing.Barrier(processes)
+        names = [block.name for block in self._blocks[:-1]]
+        for p in range(processes):
+            my_tiles = list(range(p, n_tiles, processes))
+            process = multiprocessing.Process(
+                target=worker,
+                args=(names, self._shapes, self.grid, my_tiles, self._control_block.name,
+                      self._start, sync, self._done, table, self.timeout),
+                daemon=True,
+            )
+            process.start()
+            self._workers.append(process)
+
+    @classmethod
+    def from_cells(cls, cells, **kwargs):
+        """conway.py の盤面から作る"""
+        return cls.from_bytes(len(cells), len(cells[0]), conway.cells_to_bytes(cells), **kwargs)
+
+    @classmethod
+    def from_bytes(cls, width, height, data, **kwargs):
+        """行優先の bytes（1=生, 0=死）から作る"""
+        return cls(np.frombuffer(data, dtype=np.uint8).reshape(height, width), **kwargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _tiles(self):
+        """(タイル番号, 行の範囲, 列の範囲) を順に返す"""
+        index = 0
+        for y0, h in self._row_splits:
+            for x0, w in self._col_splits:
+                yield index, slice(y0, y0 + h), slice(x0, x0 + w)
+                index += 1
+
+    def _load(self, board):
+        """盤面をタイルに書き込み、縁も埋める"""
+        face = int(self._control[2])
+        for index, rows, cols in self._tiles():
+            self._arrays[index][face, 1:-1, 1:-1] = board[rows, cols]
+        for index, _, _ in self._tiles():
+            fill_halo(self._arrays, self.grid, index, face)
+
+    def _check_workers(self):
+        """落ちたワーカーがあれば、全部止めて RuntimeError を投げる"""
+        dead = [(i, process.exitcode) for i, process in enumerate(self._workers) if not process.is_alive()]
+        if dead:
+            self._release(force=True)
+            detail = ', '.join(f'{i}番(終了コード {code})' for i, code in dead)
+            raise RuntimeError(f'ワーカープロセスが終了しています: {detail}')
+
+    def step(self, generations=1):
+        """
+        generations 世代進める（ワーカーが終わるまで待つ）
+        ワーカーが落ちたり時間切れになったりしたら、全部止めて RuntimeError を投げる
+        """
+        if self._closed:
+            raise RuntimeError('close() した TiledLife は進められません')
+        if generations <= 0:
+            return
+        self._check_workers()
+        self._control[0] = COMMAND_STEP
+        self._control[1] = generations
+        try:
+            self._start.wait(self.timeout)
+            self._done.wait(self.timeout * generations)
+        except BrokenBarrierError:
+            self._check_workers()
+            self._release(force=True)
+            raise RuntimeError(f'ワーカープロセスが {self.timeout} 秒以内に応答しませんでした') from None
+        self._control[2] = (int(self._control[2]) + generations) % 2
+        self.generation += generations
+
+    def to_array(self):
+        """board[y, x] の uint8 配列に変換する"""
+        face = int(self._control[2])
+        board = np.empty((self.height, self.width), dtype=np.uint8)
+        for index, rows, cols in self._tiles():
+            board[rows, cols] = self._arrays[index][face, 1:-1, 1:-1]
+        return board
+
+    def population(self):
+        """生きたセルの数"""
+        face = int(self._control[2])
+        return sum(int(np.count_nonzero(tile[face, 1:-1, 1:-1])) for tile in self._arrays)
+
+    def to_bytes(self):
+        """行優先の bytes に変換する"""
+        return self.to_array().tobytes()
+
+    def to_cells(self):
+        """conway.py の盤面に変換する"""
+        return conway.bytes_to_cells(self.width, self.height, self.to_bytes())
+
+    def close(self):
+        """ワーカーを止めて共有メモリを解放する（応答しないワーカーは強制終了する）"""
+        if self._closed:
+            return
+        self._closed = True
+        force = False
+        try:
+            self._control[0] = COMMAND_STOP
+            self._start.wait(self.timeout)
+        except BrokenBarrierError:
+            force = True
+        self._release(force)
+
+    def _release(self, force=False):
+        """ワーカーを終わらせ、作った共有メモリを閉じて消す"""
+        self._closed = True
+        for process in self._workers:
+            if force:
+                process.terminate()
+            process.join(self.timeout)
+            if process.is_alive():
+                process.kill()
+                process.join()
+        self._arrays = self._control = None
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
@@ -0,0 +1,96 @@
+"""conway_patterns: RLE / plaintext の読み書きの往復"""
+
+import io
+import random
+
+import pytest
+
+import conway_patterns
+from conway_patterns import (
+    load_pattern, new_board, place, read_cells, read_pattern, read_rle, save_pattern, write_cells, write_rle,
+)
+
+GLIDER_RLE = '#N Glider\nx = 3, y = 3, rule = B3/S23\nbo$2bo$3o!\n'
+
+
+def random_board(width, height, density=0.3, seed=0):
+    rng = random.Random(seed)
+    return bytearray(1 if rng.random() < density else 0 for _ in range(width * height))
+
+
+def reload(pattern, width, height):
+    board = new_board(width, height)
+    place(pattern, board, width, height)
+    return board
+
+
+def test_read_rle_glider():
+    pattern = read_rle(io.StringIO(GLIDER_RLE))
+    assert (pattern.width, pattern.height, pattern.rule, pattern.name) == (3, 3, 'B3/S23', 'Glider')
+    assert list(pattern.runs) == [(1, 0, 1), (2, 1, 1), (0, 2, 3)]
+
+
+@pytest.mark.parametrize('width, height, seed', [(1, 1, 0), (13, 7, 1), (150, 40, 2)])
+def test_rle_round_trip(width, height, seed):
+    board = random_board(width, height, seed=seed)
+    out = io.StringIO()
+    write_rle(out, board, width, height, rule='B36/S23', name='soup')
+    text = out.getvalue()
+    assert all(len(line) <= conway_patterns.LINE_LENGTH for line in text.splitlines())
+
+    pattern = read_rle(io.StringIO(text))
+    assert (pattern.width, pattern.height, pattern.rule, pattern.name) == (width, height, 'B36/S23', 'soup')
+    assert reload(pattern, width, height) == board
+
+
+@pytest.mark.parametrize('width, height, seed', [(1, 1, 0), (13, 7, 1), (150, 40, 2)])
+def test_cells_round_trip(width, height, seed):
+    board = random_board(width, height, seed=seed)
+    out = io.StringIO()
+    write_cells(out, board, width, height, name='soup')
+    pattern = read_cells(io.StringIO(out.getvalue()))
+    assert pattern.name == 'soup'
+    assert reload(pattern, width, height) == board
+
+
+def test_rle_counts_split_across_chunks(monkeypatch):
+    # 連長の数字が読み込みの区切りをまたいでも同じに読める
+    monkeypatch.setattr(conway_patterns, 'CHUNK_SIZE', 3)
+    pattern = read_rle(io.StringIO('x = 40, y = 2\n12b25o$40o!'))
+    assert list(pattern.runs) == [(12, 0, 25), (0, 1, 40)]
+
+
+def test_rle_without_header_is_rejected():
+    with pytest.raises(ValueError):
+        read_rle(io.StringIO('#C comment only\n'))
+    with pytest.raises(ValueError):
+        read_rle(io.StringIO('bo$2bo$3o!\n'))
+
+
+@pytest.mark.parametrize('suffix', ['.rle', '.cells'])
+def test_save_and_load_pattern(tmp_path, suffix):
+    width, height = 37, 11
+    board = random_board(width, height, seed=3)
+    board[0] = board[width - 1] = 1  # 大きさが右端・左端まで出るように
+    board[(height - 1) * width] = 1
+    path = str(tmp_path / f'soup{suffix}')
+    save_pattern(path, board, width, height, name='soup')
+
+    loaded, loaded_width, loaded_height, pattern = load_pattern(path)
+    assert (loaded_width, loaded_height) == (width, height)
+    assert loaded == board
+    assert pattern.name == 'soup'
+    with open(path, encoding='utf-8') as f:
+        assert reload(read_pattern(f, path), width, height) == board
+
+
+def test_place_wraps_or_clips():
+    pattern = read_rle(io.StringIO('x = 3, y = 1\n3o!'))
+    board = new_board(4, 2)
+    assert place(pattern, board, 4, 2, offset=(2, 1)) == 3
+    assert board == bytearray([0, 0, 0, 0, 1, 0, 1, 1])  # 同じ行の左端に折り返す
+
+    pattern = read_rle(io.StringIO('x = 3, y = 1\n3o!'))
+    board = new_board(4, 2)
+    assert place(pattern, board, 4, 2, offset=(2, 1), wrap=False) == 2
+    assert board == bytearray([0, 0, 0, 0, 0, 0, 1, 1])
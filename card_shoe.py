@@ -0,0 +1,115 @@
+"""
+X/Y/Z カード対戦ゲーム - シュー（有限の山札）モード
+- 通常は毎回 X/Y/Z から復元抽出で配るが、シューモードでは複数デッキを混ぜた山札から配る
+- 山札が一定量（penetration）まで減ったら配る前にシャッフルし直す
+- 残りカードの枚数（カウント）は1枚引くごとにO(1)で更新し、
+  次に配る3枚の役の確率もカウントからO(1)で計算できる
+"""
+
+import random
+
+CARDS = ['X', 'Y', 'Z']
+CARD_INDEX = {card: i for i, card in enumerate(CARDS)}
+COPIES_PER_DECK = 4  # 1デッキ = X/Y/Z 各4枚
+
+
+def comb3(n):
+    """n枚から3枚を選ぶ組み合わせの数"""
+    return n * (n - 1) * (n - 2) // 6 if n >= 3 else 0
+
+
+def rank_probabilities(counts):
+    """
+    残りカードの枚数 [X, Y, Z] から、次に3枚配ったときの役の確率を返す
+    戻り値: {3: 3枚同じ, 2: 3枚全部違う, 1: 2枚+1枚}
+    """
+    total = comb3(sum(counts))
+    if total == 0:
+        return {3: 0.0, 2: 0.0, 1: 0.0}
+    same = sum(comb3(n) for n in counts) / total
+    all_different = counts[0] * counts[1] * counts[2] / total
+    return {3: same, 2: all_different, 1: 1.0 - same - all_different}
+
+
+class Shoe:
+    """複数デッキを混ぜた山札"""
+
+    def __init__(self, decks=6, penetration=0.75, rng=None):
+        self.decks = decks
+        self.penetration = penetration
+        self.rng = rng or random.Random()
+        self.reshuffles = 0
+        self.shuffle()
+
+    def shuffle(self):
+        """全カードを戻してシャッフル"""
+        self.cards = [card for card in CARDS for _ in range(COPIES_PER_DECK * self.decks)]
+        self.rng.shuffle(self.cards)
+        self.pos = 0
+        self.counts = [COPIES_PER_DECK * self.decks] * len(CARDS)
+        self.cut = int(len(self.cards) * self.penetration)  # ここまで配ったらシャッフル
+
+    @property
+    def remaining(self):
+        """山札に残っている枚数"""
+        return len(self.cards) - self.pos
+
+    def draw(self):
+        """1枚引く（カウントもO(1)で更新）"""
+        card = self.cards[self.pos]
+        self.pos += 1
+        self.counts[CARD_INDEX[card]] -= 1
+        return card
+
+    @classmethod
+    def from_counts(cls, counts, decks=6, penetration=0.75, rng=None):
+        """
+        残りカードの枚数 [X, Y, Z] から山札を作り直す（スナップショットからの復元用）
+        配り済みのカードは先頭に置き、残りのカードの順番はシャッフルし直す
+        """
+        shoe = cls(decks, penetration, rng)
+        full = COPIES_PER_DECK * decks
+        if len(counts) != len(CARDS) or not all(0 <= n <= full for n in counts):
+            raise ValueError(f"残りカードの枚数が正しくありません: {counts}")
+        dealt = [card for card, n in zip(CARDS, counts) for _ in range(full - n)]
+        rest = [card for card, n in zip(CARDS, counts) for _ in range(n)]
+        shoe.rng.shuffle(rest)
+        shoe.cards = dealt + rest
+        shoe.pos = len(dealt)
+        shoe.counts = list(counts)
+        return shoe
+
+    def _shuffle_before(self, cards):
+        """cards 枚配る前に、シャッフル位置を過ぎているか足りなければシャッフル"""
+        if self.pos >= self.cut or self.remaining < cards:
+            self.shuffle()
+            self.reshuffles += 1
+
+    def deal_hand(self):
+        """3枚配る（シャッフル位置を過ぎていたら先にシャッフル）"""
+        self._shuffle_before(3)
+        return [self.draw() for _ in range(3)]
+
+    def deal_round(self, players=2):
+        """
+        players 人に3枚ずつ配る
+        シャッフルは配り始める前にだけ行う（1人目と2人目の間では山札を混ぜ直さない）
+        """
+        self._shuffle_before(3 * players)
+        return [[self.draw() for _ in range(3)] for _ in range(players)]
+
+    def distribution(self):
+        """残りカードの割合 {カード: 割合}"""
+        remaining = self.remaining
+        return {card: self.counts[i] / remaining for i, card in enumerate(CARDS)}
+
+    def rank_probabilities(self):
+        """次に配る3枚の役の確率"""
+        return rank_probabilities(self.counts)
+
+    def unseen_counts(self, hidden_hand):
+        """見えていないカードの枚数 = 山札の残り + まだ見えていない手札（CPUの手札など）"""
+        counts = list(self.counts)
+        for card in hidden_hand:
+            counts[CARD_INDEX[card]] += 1
+        return counts
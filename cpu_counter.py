@@ -0,0 +1,124 @@
+"""
+X/Y/Z カード対戦ゲーム - CPUの反撃（カード交換）
+- プレイヤーの行動のあと、CPUも1回だけカードを交換できる（反撃モード）
+- CPUが知っているのは自分の手札と、交換でプレイヤーに渡したカードの位置だけ
+- 最善手は 27×27 通りの手札の組み合わせからあらかじめ計算して表にしておき、
+  対戦中は表を1回引くだけ（O(1)）
+- 表はプレイヤーの手札を「見えている情報と矛盾しないものが等確率」として作る
+  CPUのコメントや開示（ヒント）はプレイヤーが見る情報で、CPUの判断には使わない
+
+表の作り直し:
+    python cpu_counter.py
+"""
+
+import os
+
+from game_snapshot import CARDS, CODE_TO_HAND, HAND_TO_CODE
+
+try:
+    from cpu_counter_table import EV_TABLE
+except ImportError:  # 表の生成前
+    EV_TABLE = None
+
+# 見えている情報: 0=何も知らない, 1+位置*3+カード=その位置のカードを知っている
+KNOWN_STATES = 1 + 3 * len(CARDS)
+
+# 行動: 0=交換しない, 1+CPUの位置*3+プレイヤーの位置=その2枚を交換
+ACTIONS = 1 + 3 * 3
+
+
+def encode_known(known):
+    """(プレイヤーの位置, カード) または None を 0～9 の整数に変換"""
+    if known is None:
+        return 0
+    pos, card = known
+    return 1 + pos * 3 + CARDS.index(card)
+
+
+def decode_action(action):
+    """行動の整数を (CPUの位置, プレイヤーの位置) に戻す（交換しないならNone）"""
+    if action == 0:
+        return None
+    return divmod(action - 1, 3)
+
+
+def apply_action(player_hand, cpu_hand, action):
+    """行動を適用した新しい手札を返す"""
+    new_player_hand = list(player_hand)
+    new_cpu_hand = list(cpu_hand)
+    swap = decode_action(action)
+    if swap is not None:
+        cpu_idx, player_idx = swap
+        new_player_hand[player_idx], new_cpu_hand[cpu_idx] = cpu_hand[cpu_idx], player_hand[player_idx]
+    return new_player_hand, new_cpu_hand
+
+
+def possible_player_hands(known):
+    """見えている情報と矛盾しないプレイヤーの手札の一覧"""
+    if known is None:
+        return CODE_TO_HAND
+    pos, card = known
+    return [hand for hand in CODE_TO_HAND if hand[pos] == card]
+
+
+# =============================================================================
+# 表の生成（オフライン）
+# =============================================================================
+def build_table(compare_hands):
+    """
+    全てのCPU手札 × 見えている情報について、勝ち=+1, 負け=-1, 引き分け=0 の平均が最大の行動を計算
+    プレイヤーの手札は、見えている情報と矛盾しないものが等確率だと仮定する
+    （最悪の場合を最大にする表も作れるが、全ての場合で平均の表と同じ行動になるので作らない）
+    """
+    ev_table = bytearray(len(CODE_TO_HAND) * KNOWN_STATES)
+
+    for cpu_code, cpu_hand in enumerate(CODE_TO_HAND):
+        for known_code in range(KNOWN_STATES):
+            known = None if known_code == 0 else divmod(known_code - 1, 3)
+            if known is not None:
+                known = (known[0], CARDS[known[1]])
+            candidates = possible_player_hands(known)
+
+            scores = []
+            for action in range(ACTIONS):
+                total = 0
+                for player_hand in candidates:
+                    new_player_hand, new_cpu_hand = apply_action(player_hand, cpu_hand, action)
+                    total -= compare_hands(new_player_hand, new_cpu_hand)
+                scores.append(total / len(candidates))
+
+            # 同点なら番号の小さい行動（交換しない）を選ぶ
+            ev_table[cpu_code * KNOWN_STATES + known_code] = max(range(ACTIONS), key=lambda a: (scores[a], -a))
+
+    return bytes(ev_table)
+
+
+def write_table_module(path, ev_table):
+    """表をPythonモジュールとして書き出す"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('# このファイルは cpu_counter.py が自動生成したもの（手で編集しないこと）\n')
+        f.write('# 添字: CPU手札コード * 10 + 見えている情報, 値: 行動（0=交換しない）\n')
+        f.write(f'EV_TABLE = bytes.fromhex("{ev_table.hex()}")\n')
+
+
+# =============================================================================
+# 対戦中の判断
+# =============================================================================
+def choose_counter(cpu_hand, known=None):
+    """
+    CPUの反撃を表から1回引いて決める
+    known: CPUが知っているプレイヤーのカード (位置, カード)。知らなければNone
+    戻り値: (CPUの位置, プレイヤーの位置)。交換しないならNone
+    """
+    action = EV_TABLE[HAND_TO_CODE[tuple(cpu_hand)] * KNOWN_STATES + encode_known(known)]
+    return decode_action(action)
+
+
+if __name__ == "__main__":
+    from game01 import compare_hands
+
+    ev = build_table(compare_hands)
+    out_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cpu_counter_table.py')
+    write_table_module(out_path, ev)
+    passes = sum(1 for action in ev if action == 0)
+    print(f"書き出しました: {out_path}（{len(ev)}通り、うち交換しない {passes}通り）")
@@ -0,0 +1,3 @@
+# このファイルは cpu_counter.py が自動生成したもの（手で編集しないこと）
+# 添字: CPU手札コード * 10 + 見えている情報, 値: 行動（0=交換しない）
+EV_TABLE = bytes.fromhex("000000000000000000000707080108070209070301070101080201090301040405010504020604030404010404020504030600000000000000000000010401010502010603010000000000000000000001020401010502010603010102040201050301060101040101050201060300000000000000000000010107010108020109030000000000000000000007010708020807030907000000000000000000000401040502050403060404040401050402060403040104040205040306040000000000000000000004050104040205040306000000000000000000000104010205020106030101010104020105030106070801070702080703090101010702010803010900000000000000000000")
@@ -8,13 +8,27 @@ X/Y/Z カード対戦ゲーム
 
 import random
 
+from card_shoe import Shoe, rank_probabilities
+from cpu_counter import choose_counter
 
-def deal_hand():
-    """ランダムに3枚のカードを配る"""
+POSITION_NAMES = ['左', 'まん中', '右']
+
+
+def deal_hand(shoe=None):
+    """ランダムに3枚のカードを配る（シューを渡すとシューから配る）"""
+    if shoe is not None:
+        return shoe.deal_hand()
     cards = ['X', 'Y', 'Z']
     return [random.choice(cards) for _ in range(3)]
 
 
+def deal_round(shoe=None):
+    """プレイヤーとCPUに3枚ずつ配る（シューは2人分を配る前にだけシャッフルする）"""
+    if shoe is not None:
+        return shoe.deal_round()
+    return deal_hand(), deal_hand()
+
+
 def get_hand_rank(hand):
     """
     役の強さを判定
@@ -170,6 +184,16 @@ def get_rank_name(hand):
         return "【2枚+1枚】"
 
 
+def get_counting_hint(shoe, cpu_hand):
+    """シューの見えていないカードから、CPUの役の確率を返す（カウンティングのヒント）"""
+    counts = shoe.unseen_counts(cpu_hand)
+    probs = rank_probabilities(counts)
+    return (
+        f"  🃏 見えていないカード: X={counts[0]} Y={counts[1]} Z={counts[2]}"
+        f"（CPUが3枚同じ {probs[3]:.0%} / 3種全部 {probs[2]:.0%} / 2枚+1枚 {probs[1]:.0%}）"
+    )
+
+
 def select_position(prompt, valid_options):
     """ユーザーに位置を選択させる"""
     while True:
@@ -179,7 +203,7 @@ def select_position(prompt, valid_options):
         print("無効な入力です。もう一度選んでください。")
 
 
-def play_round(win_count):
+def play_round(win_count, cpu_counter=False, shoe=None):
     """1ラウンドをプレイ（引き分けなら再配布でループ）"""
     
     while True:  # 引き分けの場合は再配布してループ
@@ -190,8 +214,7 @@ def play_round(win_count):
         print("=" * 50)
         
         # カードを配る
-        player_hand = deal_hand()
-        cpu_hand = deal_hand()
+        player_hand, cpu_hand = deal_round(shoe)
         
         # プレイヤーの手札を表示
         print("\n▼ あなたの手札:")
@@ -204,6 +227,8 @@ def play_round(win_count):
         
         # 難易度に応じたカード開示
         print(get_card_reveal(cpu_hand, win_count))
+        if shoe is not None:
+            print(get_counting_hint(shoe, cpu_hand))
         
         # 交換するかどうか（地獄篇以上は強制交換）
         if mode in ["地獄篇", "無限地獄篇"]:
@@ -242,6 +267,17 @@ def play_round(win_count):
         else:
             print("\n★ 交換なし！ ★")
         
+        # CPUの反撃（反撃モードのみ）: CPUが知っているのは自分が渡したカードの位置だけ
+        if cpu_counter:
+            known = (player_index, player_hand[player_index]) if do_exchange == 'はい' else None
+            counter = choose_counter(cpu_hand, known)
+            if counter is None:
+                print("\n▼ CPUは反撃してこなかった")
+            else:
+                counter_cpu, counter_player = counter
+                player_hand[counter_player], cpu_hand[counter_cpu] = cpu_hand[counter_cpu], player_hand[counter_player]
+                print(f"\n▼ CPUの反撃！ CPUの[{POSITION_NAMES[counter_cpu]}]とあなたの[{POSITION_NAMES[counter_player]}]が交換された")
+        
         print("\n▼ 現在のあなたの手札:")
         display_hand(player_hand)
         print(f"  役: {get_rank_name(player_hand)}")
@@ -311,14 +347,23 @@ def main():
   50～99連勝: 鬼       → 役のヒントが曖昧に
   100～199連勝: 地獄篇  → 「交換しない」を選べない
   200連勝～: 無限地獄篇 → CPUが30%の確率で嘘をつく
+
+【CPU反撃モード】
+  あなたの交換のあと、CPUも1回だけカードを交換してくる
+
+【シューモード】
+  6デッキ（X/Y/Z 各24枚）の山札から配り、3/4まで減ったらシャッフル
+  見えていないカードの枚数からCPUの役の確率がわかる
 """)
     
+    cpu_counter = input("CPU反撃モードで遊びますか？ (y/n): ").strip().lower() == 'y'
+    shoe = Shoe() if input("シューモードで遊びますか？ (y/n): ").strip().lower() == 'y' else None
     input("[Enter]を押してゲーム開始！")
     
     win_count = 0
     
     while True:
-        if play_round(win_count):
+        if play_round(win_count, cpu_counter, shoe):
             win_count += 1
             
             # 難易度変更の通知
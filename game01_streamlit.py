@@ -3,9 +3,20 @@ X/Y/Z カード対戦ゲーム - Streamlit版
 """
 
 import streamlit as st
+import html
+import os
 import random
+import re
 import urllib.parse
 
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from game_snapshot import SnapshotStore, is_client_token, new_client_token
+from game_token import RevisionFloor, decode_state_token, encode_state_token, newer_snapshot
+from card_shoe import Shoe, rank_probabilities
+from cpu_counter import choose_counter
+from session_memory import SessionMeter
+
 # ページ設定
 st.set_page_config(
     page_title="X/Y/Z カード対戦",
@@ -16,7 +27,7 @@ st.set_page_config(
 )
 
 # カスタムCSS
-st.markdown("""
+CUSTOM_CSS = """
 <style>
     /* スマホ対応: 余白・フォントをさらに圧縮 */
     .block-container {
@@ -124,8 +135,28 @@ st.markdown("""
         h4, h5 { font-size: 0.95rem !important; }
         .stMarkdown, p { font-size: 0.9rem !important; }
     }
+    /* 軽量表示（?render=lite）用 */
+    .lite-row {
+        display: flex;
+        align-items: center;
+        gap: 8px;
+    }
+    .milestone {
+        font-weight: bold;
+        text-align: center;
+        padding: 6px;
+        border-radius: 8px;
+        background: #fdecea;
+        color: #b03a2e;
+    }
 </style>
-""", unsafe_allow_html=True)
+"""
+# 軽量表示ではコメントと空白を除いた版を送る
+MINIFIED_CSS = re.sub(r"\s*([{}:;,])\s*", r"\1", re.sub(r"/\*.*?\*/|\s+", " ", CUSTOM_CSS)).strip()
+
+# 表示モード: ?render=lite または環境変数 XYZ_RENDER_MODE=lite で軽量表示
+lite_render = st.query_params.get("render", os.environ.get("XYZ_RENDER_MODE", "full")) == "lite"
+st.markdown(MINIFIED_CSS if lite_render else CUSTOM_CSS, unsafe_allow_html=True)
 
 # =============================================================================
 # 定数
@@ -135,6 +166,14 @@ WINS_AGAINST = {'X': 'Y', 'Y': 'Z', 'Z': 'X'}  # X→Yに勝つ
 POSITION_TO_INDEX = {"左": 0, "まん中": 1, "右": 2}
 APP_URL = "https://testgame0125.streamlit.app"
 SHARE_HASHTAG = "#XYZカード対戦"
+SNAPSHOT_PATH = os.environ.get("XYZ_SNAPSHOT_PATH", "xyz_snapshots_ja.bin")
+# 全レプリカで共有するリビジョンの下限（未設定なら共有しない。game_token の注意を参照）
+REVISION_FLOOR_PATH = os.environ.get("XYZ_REVISION_FLOOR_PATH")
+IDLE_SECONDS = float(os.environ.get("XYZ_IDLE_SECONDS", "600"))  # これ以上放置されたセッションは圧縮
+# ?mem=1 のメモリレポートは XYZ_MEMORY_REPORT=1 のサーバー（管理用）でだけ出す
+MEMORY_REPORT = os.environ.get("XYZ_MEMORY_REPORT") == "1"
+# タイトル画面のチェックボックスで選ぶ設定（ウィジェットの key もこの名前）
+OPTION_KEYS = ('cpu_counter', 'shoe_mode', 'counting_hint')
 
 # 難易度設定 (閾値, モード名, アイコン)
 DIFFICULTY_LEVELS = [
@@ -146,14 +185,71 @@ DIFFICULTY_LEVELS = [
     (float('inf'), "無限地獄篇", "👹"),
 ]
 
+# 難易度変更通知 (連勝数: (種類, メッセージ))
+MILESTONE_MESSAGES = {
+    10: ("warning", "🔥 やりがいモード突入！ヒントが減ります..."),
+    30: ("warning", "🔥🔥 挑戦モード突入！カード開示がなくなります..."),
+    50: ("warning", "🔥🔥🔥 鬼モード突入！役のヒントが曖昧に..."),
+    100: ("error", "💀 地獄篇突入！交換は必須になります..."),
+    200: ("error", "👹 無限地獄篇突入！CPUが嘘をつくようになります..."),
+}
+
+# 軽量表示用のHTMLテンプレート（1画面 = 1要素。埋めるのは動的な値だけ）
+HELP_BOX_HTML = (
+    '<div class="help-box">'
+    '<div>・力関係：X＞Y＞Z＞X</div>'
+    '<div>・役：同3枚 ＞ 全部違う ＞ 2枚+1枚</div>'
+    '<div>・同役はマジョリティ勝負</div>'
+    '<hr style="margin:4px 0;" />'
+    '<div>・地獄篇以上は交換必須</div>'
+    '</div>'
+)
+LITE_PLAYING_TEMPLATE = (
+    '<h3>第{round_no}戦　{mode_icon} {mode}モード（{win_count}連勝中）</h3><hr/>'
+    '<div class="lite-row"><b>🎴 あなたの手札</b>{player_cards}</div>'
+    '<p><b>役: {player_rank}</b></p><hr/>'
+    '<div class="lite-row"><b>🤖 CPUのコメント</b><div class="cpu-comment">{cpu_comment}</div></div>'
+    '<p>{reveal}</p>{shoe_hint}<hr/>'
+    + HELP_BOX_HTML
+)
+LITE_RESULT_TEMPLATE = (
+    '<h2>🎯 対戦結果</h2><hr/>'
+    '<p>{exchange_log}</p>'
+    '<h3>🤖 CPUの手札</h3>{cpu_cards}<p><b>役: {cpu_rank}</b></p>'
+    '<h3>🎴 あなたの手札</h3>{player_cards}<p><b>役: {player_rank}</b></p><hr/>'
+    '{outcome}{share}'
+)
+LITE_OUTCOME_TEMPLATES = {
+    1: '<div class="win-text">🎉 勝利！！ 🎉</div>{milestone}<div class="result-text">🏆 {win_count} 連勝！</div>',
+    -1: '<div class="lose-text">💀 敗北... 💀</div><div class="result-text">最終結果: {win_count} 連勝でした！</div>',
+    0: '<div class="draw-text">😐 引き分け！</div><div class="result-text">カードを配り直します...</div>',
+}
+LITE_SHARE_TEMPLATE = (
+    '<p><b>SNSで連勝記録を知らせよう</b><br/>'
+    '<a href="{x_share_url}" target="_blank">Xで投稿</a>　'
+    '<a href="https://www.instagram.com/" target="_blank">Instagramを開く</a></p>'
+    '<p><code>{caption}</code></p>'
+)
+FOOTER_HTML = "<div style='text-align: center; color: #888;'>X/Y/Z カード対戦ゲーム v1.1</div>"
+BOLD_PATTERN = re.compile(r"\*\*(.+?)\*\*")
+
 # =============================================================================
 # ゲームロジック関数
 # =============================================================================
-def deal_hand():
-    """ランダムに3枚のカードを配る"""
+def deal_hand(shoe=None):
+    """ランダムに3枚のカードを配る（シューを渡すとシューから配る）"""
+    if shoe is not None:
+        return shoe.deal_hand()
     return [random.choice(CARDS) for _ in range(3)]
 
 
+def deal_round(shoe=None):
+    """プレイヤーとCPUに3枚ずつ配る（シューは2人分を配る前にだけシャッフルする）"""
+    if shoe is not None:
+        return shoe.deal_round()
+    return deal_hand(), deal_hand()
+
+
 def get_hand_rank(hand):
     """
     役の強さを判定
@@ -239,12 +335,17 @@ def build_share_text(win_count, result_label):
     return f"{result_label}！連勝記録は{win_count}連勝でした。{SHARE_HASHTAG}"
 
 
+def build_x_share_url(share_text):
+    """Xの投稿画面のURLを生成"""
+    tweet_text = urllib.parse.quote(share_text)
+    tweet_url = urllib.parse.quote(APP_URL)
+    return f"https://twitter.com/intent/tweet?text={tweet_text}&url={tweet_url}"
+
+
 def render_share_section(win_count, result_label):
     """SNS共有セクションを表示"""
     share_text = build_share_text(win_count, result_label)
-    tweet_text = urllib.parse.quote(share_text)
-    tweet_url = urllib.parse.quote(APP_URL)
-    x_share_url = f"https://twitter.com/intent/tweet?text={tweet_text}&url={tweet_url}"
+    x_share_url = build_x_share_url(share_text)
 
     st.markdown("**SNSで連勝記録を知らせよう**")
     col_share1, col_share2 = st.columns(2)
@@ -256,22 +357,34 @@ def render_share_section(win_count, result_label):
         "Instagram用キャプション（コピーして投稿）",
         value=f"{share_text} {APP_URL}",
         label_visibility="collapsed",
+        key="share_caption",
     )
 
 
 # =============================================================================
 # CPU関連関数
 # =============================================================================
-def get_cpu_comment(hand, win_count):
-    """CPUの手札に応じたコメントを生成"""
+def roll_cpu_lie(win_count):
+    """
+    配布時にCPUが嘘をつくかを決める（無限地獄篇: 30%の確率）
+    0 は嘘なし、1～4 はどの嘘をつくか。ラウンドと一緒に保存し、再読み込みしても変わらない
+    """
+    mode, _ = get_difficulty_mode(win_count)
+    if mode == "無限地獄篇" and random.random() < 0.3:
+        return random.randint(1, 4)
+    return 0
+
+
+def get_cpu_comment(hand, win_count, lie=0):
+    """CPUの手札に応じたコメントを生成（lie は roll_cpu_lie の値）"""
     mode, _ = get_difficulty_mode(win_count)
     majority = get_majority(hand)
     rank = get_hand_rank(hand)
     
-    # 無限地獄篇: 30%の確率で嘘をつく
-    if mode == "無限地獄篇" and random.random() < 0.3:
-        majority = random.choice([c for c in CARDS if c != majority])
-        rank = random.choice([r for r in [1, 2, 3] if r != rank])
+    # 嘘: マジョリティと役を本当とは別のものに言い換える
+    if lie:
+        majority = [c for c in CARDS if c != majority][(lie - 1) % 2]
+        rank = [r for r in [1, 2, 3] if r != rank][(lie - 1) // 2]
     
     # 3種全部の場合は笑い声なしで「まあ、そこそこだ」
     if rank == 2:
@@ -317,6 +430,163 @@ def display_cards(hand):
     return f'<div style="text-align: center;">{cards_html}</div>'
 
 
+def build_round_view(player_hand, cpu_hand, win_count, hint=None, lie=0):
+    """
+    ラウンドの表示用の値をまとめて計算（配布時・交換時に1回だけ）
+    hint に前の値を渡すと、CPUのコメントと開示はそのまま引き継ぐ
+    lie はラウンドのCPUの嘘（roll_cpu_lie。保存されるので復元後も同じコメントになる）
+    """
+    if hint is None:
+        reveal = get_card_reveal(cpu_hand, win_count)
+        hint = {
+            'cpu_comment': get_cpu_comment(cpu_hand, win_count, lie),
+            'reveal': reveal,
+            'reveal_html': BOLD_PATTERN.sub(r"<b>\1</b>", reveal),
+        }
+    return {
+        **{key: hint[key] for key in ('cpu_comment', 'reveal', 'reveal_html')},
+        'player_rank': get_hand_rank(player_hand),
+        'cpu_rank': get_hand_rank(cpu_hand),
+        'player_rank_name': get_rank_name(player_hand),
+        'cpu_rank_name': get_rank_name(cpu_hand),
+        'player_cards': display_cards(player_hand),
+        'cpu_cards': display_cards(cpu_hand),
+        'outcome': compare_hands(player_hand, cpu_hand),
+    }
+
+
+def get_round_view():
+    """現在のラウンドの表示用の値（復元直後などで未計算ならここで計算）"""
+    if st.session_state.get('round_view') is None:
+        st.session_state.round_view = build_round_view(
+            st.session_state.player_hand,
+            st.session_state.cpu_hand,
+            st.session_state.win_count,
+            lie=st.session_state.cpu_lie,
+        )
+    return st.session_state.round_view
+
+
+def get_counting_hint(shoe, cpu_hand):
+    """シューの見えていないカードから、CPUの役の確率を返す（カウンティングのヒント）"""
+    counts = shoe.unseen_counts(cpu_hand)
+    probs = rank_probabilities(counts)
+    return (
+        f"🃏 見えていないカード X:{counts[0]} Y:{counts[1]} Z:{counts[2]}"
+        f"（山札の残り{shoe.remaining}枚）／ CPUが3枚同じ {probs[3]:.0%}・"
+        f"3種全部 {probs[2]:.0%}・2枚+1枚 {probs[1]:.0%}"
+    )
+
+
+def get_shoe_hint():
+    """
+    ラウンドのカウンティングのヒント（表示しないならNone）
+    復元直後などで未計算なら、シューと配られたCPUの手札から計算し直す
+    """
+    if st.session_state.get('shoe_hint') is None:
+        shoe = st.session_state.get('shoe')
+        if shoe is not None and st.session_state.counting_hint and st.session_state.game_state == 'playing':
+            st.session_state.shoe_hint = get_counting_hint(shoe, st.session_state.cpu_hand)
+    return st.session_state.shoe_hint
+
+
+def format_exchange_log(log):
+    """交換ログの表示用テキスト"""
+    msg = (
+        f"交換ログ: あなた[{log['player_pos']}] {log['before_player']} ↔ "
+        f"CPU[{log['cpu_pos']}] {log['before_cpu']}"
+    )
+    if log.get("no_visible_change"):
+        msg += "（同じカード同士なので見た目は変わりません）"
+    return msg
+
+
+def format_cpu_exchange_log(log):
+    """CPUの反撃ログの表示用テキスト"""
+    return (
+        f"CPUの反撃: CPU[{log['cpu_pos']}] {log['before_cpu']} ↔ "
+        f"あなた[{log['player_pos']}] {log['before_player']}"
+    )
+
+
+def render_playing_lite(mode, mode_icon, can_skip):
+    """ゲームプレイ画面を軽量表示（HTML1つ + ラジオ2つ + ボタン）"""
+    win_count = st.session_state.win_count
+    view = get_round_view()
+    st.markdown(
+        LITE_PLAYING_TEMPLATE.format(
+            round_no=win_count + 1,
+            mode_icon=mode_icon,
+            mode=mode,
+            win_count=win_count,
+            player_cards=view['player_cards'],
+            player_rank=view['player_rank_name'],
+            cpu_comment=view['cpu_comment'],
+            reveal=view['reveal_html'],
+            shoe_hint=f"<p>{get_shoe_hint()}</p>" if get_shoe_hint() else "",
+        ),
+        unsafe_allow_html=True,
+    )
+
+    player_choice = st.radio("あなたのカード", list(POSITION_TO_INDEX), horizontal=True, key="player_choice")
+    cpu_choice = st.radio("CPUのカード", list(POSITION_TO_INDEX), horizontal=True, key="cpu_choice")
+    if st.button("🔄 交換して勝負！", type="primary", use_container_width=True):
+        finish_with_exchange(player_choice, cpu_choice)
+        st.rerun()
+    if can_skip and st.button("⏭️ 交換せずに勝負！", use_container_width=True):
+        finish_without_exchange()
+        st.rerun()
+
+
+def render_result_lite(result):
+    """結果画面を軽量表示（HTML1つ + ボタン1つ）"""
+    win_count = st.session_state.win_count
+    log = st.session_state.get("last_exchange")
+    view = get_round_view()
+
+    milestone = ""
+    if result == 1 and win_count in MILESTONE_MESSAGES:
+        milestone = f'<div class="milestone">{MILESTONE_MESSAGES[win_count][1]}</div>'
+
+    exchange_log = format_exchange_log(log) if log else "交換ログ: 今回は交換なし"
+    if st.session_state.get("cpu_exchange"):
+        exchange_log += "<br/>" + format_cpu_exchange_log(st.session_state.cpu_exchange)
+
+    share = ""
+    if result != 0:
+        share_text = build_share_text(win_count, "勝利" if result == 1 else "敗北")
+        share = LITE_SHARE_TEMPLATE.format(
+            x_share_url=html.escape(build_x_share_url(share_text)),
+            caption=html.escape(f"{share_text} {APP_URL}"),
+        )
+
+    st.markdown(
+        LITE_RESULT_TEMPLATE.format(
+            exchange_log=exchange_log,
+            cpu_cards=view['cpu_cards'],
+            cpu_rank=view['cpu_rank_name'],
+            player_cards=view['player_cards'],
+            player_rank=view['player_rank_name'],
+            outcome=LITE_OUTCOME_TEMPLATES[result].format(milestone=milestone, win_count=win_count),
+            share=share,
+        ),
+        unsafe_allow_html=True,
+    )
+
+    if result == 1:
+        if st.button("▶️ 次の対戦へ", type="primary", use_container_width=True):
+            start_new_round()
+            st.rerun()
+    elif result == -1:
+        if st.button("🔄 もう一度プレイ", type="primary", use_container_width=True):
+            reset_game()
+            st.rerun()
+    else:
+        if st.button("🔄 再配布", type="primary", use_container_width=True):
+            start_new_round()
+            st.rerun()
+
+
 # =============================================================================
 # セッション状態管理
 # =============================================================================
@@ -329,19 +599,159 @@ def init_session_state():
         'cpu_hand': [],
         'result_processed': False,  # 結果処理済みフラグ
         'last_exchange': None,  # 直近の交換ログ（なければNone）
+        'revision': 0,  # 保存するたびに進む番号（古いトークンで巻き戻さないため）
+        'cpu_lie': 0,  # このラウンドのCPUの嘘（roll_cpu_lie）
+        'round_view': None,  # ラウンドの表示用の値（build_round_view）
+        'cpu_counter': False,  # CPU反撃モード
+        'cpu_exchange': None,  # CPUの反撃ログ（なければNone）
+        'shoe_mode': False,  # シューモード（有限の山札から配る）
+        'counting_hint': False,  # シューのカウンティングのヒントを表示
+        'shoe': None,  # シュー（Shoe）
+        'shoe_hint': None,  # カウンティングのヒント（なければNone）
     }
     for key, value in defaults.items():
         if key not in st.session_state:
             st.session_state[key] = value
+    # タイトル画面のチェックボックス（key で直接つながっている）は、表示しない画面では
+    # Streamlit に消されてしまうので、毎回書き戻して残す
+    for key in OPTION_KEYS:
+        st.session_state[key] = st.session_state[key]
+
+    # 初回のみ: クライアントトークンを決めて、保存済みの状態を復元
+    if 'client_token' not in st.session_state:
+        restore_snapshot()
+
+
+@st.cache_resource
+def get_snapshot_store():
+    """プロセス全体で共有するスナップショットストア"""
+    return SnapshotStore(SNAPSHOT_PATH)
+
+
+@st.cache_resource
+def get_revision_floor():
+    """プロセス全体で共有するリビジョンの下限"""
+    return RevisionFloor(REVISION_FLOOR_PATH)
+
+
+def restore_snapshot():
+    """
+    URLから状態を復元
+    - クライアントトークン（?sid=）のスナップショットと、署名付きトークン（?s=）の新しい方を使う
+    - トークンはスナップショットのないサーバーでも復元できるが、
+      スナップショットや共有の下限より古いトークン（ブックマークしたURLなど）は使わない
+    """
+    token = st.query_params.get("sid")
+    if not is_client_token(token):  # ない・形式が違う（手で書き換えた等）なら新しく発行
+        token = new_client_token()
+        st.query_params["sid"] = token
+    st.session_state.client_token = token
+
+    positions = list(POSITION_TO_INDEX)
+    snapshot = newer_snapshot(
+        get_snapshot_store().restore(token, positions=positions),
+        decode_state_token(st.query_params.get("s", ""), token, positions=positions),
+        floor=get_revision_floor().get(token),
+    )
+    if snapshot:
+        for key, value in snapshot.items():
+            st.session_state[key] = value
+        st.session_state.round_view = None
+
+
+def save_snapshot():
+    """現在の状態をスナップショットと署名付きトークン（?s=）に保存"""
+    client_token = st.session_state.client_token
+    revision = get_snapshot_store().save(client_token, st.session_state)
+    if revision != st.session_state.revision:
+        get_revision_floor().raise_to(client_token, revision)  # 他のレプリカでも古いトークンを弾く
+    st.session_state.revision = revision
+
+    state_token = encode_state_token(st.session_state, client_token)
+    if st.query_params.get("s") != state_token:
+        st.query_params["s"] = state_token
 
 
 def start_new_round():
     """新しいラウンドを開始"""
-    st.session_state.player_hand = deal_hand()
-    st.session_state.cpu_hand = deal_hand()
+    shoe = None
+    if st.session_state.shoe_mode:
+        if st.session_state.get('shoe') is None:
+            st.session_state.shoe = Shoe()
+        shoe = st.session_state.shoe
+    st.session_state.player_hand, st.session_state.cpu_hand = deal_round(shoe)
+    st.session_state.shoe_hint = None
+    if shoe is not None and st.session_state.counting_hint:
+        st.session_state.shoe_hint = get_counting_hint(shoe, st.session_state.cpu_hand)
     st.session_state.game_state = 'playing'
     st.session_state.result_processed = False  # リセット
     st.session_state.last_exchange = None
+    st.session_state.cpu_exchange = None
+    st.session_state.cpu_lie = roll_cpu_lie(st.session_state.win_count)
+    st.session_state.round_view = build_round_view(
+        st.session_state.player_hand,
+        st.session_state.cpu_hand,
+        st.session_state.win_count,
+        lie=st.session_state.cpu_lie,
+    )
+
+
+def finish_with_exchange(player_choice, cpu_choice):
+    """カードを交換して結果画面へ"""
+    new_player_hand, new_cpu_hand, exchange_log = exchange_cards(
+        st.session_state.player_hand,
+        st.session_state.cpu_hand,
+        player_choice,
+        cpu_choice,
+    )
+    st.session_state.player_hand = new_player_hand
+    st.session_state.cpu_hand = new_cpu_hand
+    st.session_state.last_exchange = exchange_log
+    apply_cpu_counter(known=(exchange_log['player_idx'], exchange_log['after_player']))
+    st.session_state.game_state = 'result'
+
+
+def finish_without_exchange():
+    """交換せずに結果画面へ"""
+    st.session_state.last_exchange = None
+    apply_cpu_counter(known=None)
+    st.session_state.game_state = 'result'
+
+
+def apply_cpu_counter(known):
+    """
+    反撃モードならCPUもカードを交換し、ラウンドの表示用の値を作り直す
+    known: CPUが知っているプレイヤーのカード (位置, カード)。知らなければNone
+    """
+    hint = get_round_view()
+    st.session_state.cpu_exchange = None
+    if st.session_state.cpu_counter:
+        counter = choose_counter(st.session_state.cpu_hand, known)
+        if counter is not None:
+            positions = list(POSITION_TO_INDEX)
+            cpu_idx, player_idx = counter
+            new_player_hand, new_cpu_hand, cpu_exchange = exchange_cards(
+                st.session_state.player_hand,
+                st.session_state.cpu_hand,
+                positions[player_idx],
+                positions[cpu_idx],
+            )
+            st.session_state.player_hand = new_player_hand
+            st.session_state.cpu_hand = new_cpu_hand
+            st.session_state.cpu_exchange = cpu_exchange
+
+    st.session_state.round_view = build_round_view(
+        st.session_state.player_hand, st.session_state.cpu_hand, st.session_state.win_count, hint=hint
+    )
+
+
+def settle_result():
+    """勝敗を判定し、勝利時のカウントアップを一度だけ実行"""
+    result = get_round_view()['outcome']
+    if result == 1 and not st.session_state.result_processed:
+        st.session_state.win_count += 1
+        st.session_state.result_processed = True
+    return result
 
 
 def reset_game():
@@ -352,9 +762,36 @@ def reset_game():
     st.session_state.cpu_hand = []
     st.session_state.result_processed = False
     st.session_state.last_exchange = None
+    st.session_state.cpu_exchange = None
+    st.session_state.round_view = None
+    st.session_state.shoe = None  # 新しいゲームは新しいシューで
+    st.session_state.shoe_hint = None
+
+
+@st.cache_resource
+def get_session_meter():
+    """プロセス全体で共有するセッションメモリ計測"""
+    return SessionMeter(
+        extra_keys=[
+            "round_view", "cpu_exchange", "shoe_hint",
+            "player_choice", "cpu_choice", "share_caption",
+        ],
+        idle_seconds=IDLE_SECONDS,
+        positions=list(POSITION_TO_INDEX),
+        trace=os.environ.get("XYZ_MEMORY_TRACE") == "1",
+    )
 
 
-# 初期化
+@st.fragment(run_every=get_session_meter().compact_interval)
+def session_heartbeat():
+    """放置されたセッションの圧縮（compact_interval ごとに自分のスレッドで再実行される）"""
+    ctx = get_script_run_ctx()
+    get_session_meter().heartbeat(ctx.session_id, ctx.session_state)
+
+
+# 初期化（圧縮されていたセッションはここで元に戻る）
+script_ctx = get_script_run_ctx()
+get_session_meter().begin(script_ctx.session_id, script_ctx.session_state)
 init_session_state()
 
 # =============================================================================
@@ -415,6 +852,10 @@ if st.session_state.game_state == 'title':
         """)
     
     st.markdown("---")
+    st.checkbox("🤖 CPU反撃モード（あなたの交換のあと、CPUも1回だけ交換してくる）", key="cpu_counter")
+    st.checkbox("🃏 シューモード（6デッキの山札から配り、3/4まで減ったらシャッフル）", key="shoe_mode")
+    if st.session_state.shoe_mode:
+        st.checkbox("🔢 カウンティングのヒントを表示", key="counting_hint")
     if st.button("🎮 ゲームスタート", type="primary", use_container_width=True):
         start_new_round()
         st.rerun()
@@ -422,8 +863,13 @@ if st.session_state.game_state == 'title':
 # -----------------------------------------------------------------------------
 # ゲームプレイ画面
 # -----------------------------------------------------------------------------
+elif st.session_state.game_state == 'playing' and lite_render:
+    mode, mode_icon = get_difficulty_mode(st.session_state.win_count)
+    render_playing_lite(mode, mode_icon, can_skip=mode not in ["地獄篇", "無限地獄篇"])
+
 elif st.session_state.game_state == 'playing':
     mode, mode_icon = get_difficulty_mode(st.session_state.win_count)
+    view = get_round_view()
     
     # ヘッダー（1行にまとめて縦幅を削減）
     st.markdown(
@@ -436,8 +882,8 @@ elif st.session_state.game_state == 'playing':
     with hand_col1:
         st.markdown("**🎴 あなたの手札**")
     with hand_col2:
-        st.markdown(display_cards(st.session_state.player_hand), unsafe_allow_html=True)
-    st.markdown(f"**役: {get_rank_name(st.session_state.player_hand)}**")
+        st.markdown(view['player_cards'], unsafe_allow_html=True)
+    st.markdown(f"**役: {view['player_rank_name']}**")
     st.markdown("---")
     
     # CPUのコメント（横並び）
@@ -445,9 +891,10 @@ elif st.session_state.game_state == 'playing':
     with cpu_col1:
         st.markdown("**🤖 CPUのコメント**")
     with cpu_col2:
-        cpu_comment = get_cpu_comment(st.session_state.cpu_hand, st.session_state.win_count)
-        st.markdown(f'<div class="cpu-comment">{cpu_comment}</div>', unsafe_allow_html=True)
-    st.markdown(get_card_reveal(st.session_state.cpu_hand, st.session_state.win_count))
+        st.markdown(f'<div class="cpu-comment">{view["cpu_comment"]}</div>', unsafe_allow_html=True)
+    st.markdown(view['reveal'])
+    if get_shoe_hint():
+        st.caption(get_shoe_hint())
     st.markdown("---")
     
     # 交換選択 + ミニルール表示
@@ -480,78 +927,51 @@ elif st.session_state.game_state == 'playing':
         col1, col2 = st.columns(2)
         with col1:
             if st.button("🔄 交換して勝負！", type="primary", use_container_width=True):
-                new_player_hand, new_cpu_hand, exchange_log = exchange_cards(
-                    st.session_state.player_hand,
-                    st.session_state.cpu_hand,
-                    player_choice,
-                    cpu_choice,
-                )
-                st.session_state.player_hand = new_player_hand
-                st.session_state.cpu_hand = new_cpu_hand
-                st.session_state.last_exchange = exchange_log
-                st.session_state.game_state = 'result'
+                finish_with_exchange(player_choice, cpu_choice)
                 st.rerun()
 
         with col2:
             if can_skip:
                 if st.button("⏭️ 交換せずに勝負！", use_container_width=True):
-                    st.session_state.last_exchange = None
-                    st.session_state.game_state = 'result'
+                    finish_without_exchange()
                     st.rerun()
             else:
                 st.button("🚫 交換必須！", disabled=True, use_container_width=True)
 
     with help_col:
         st.markdown("**ミニルール**")
-        st.markdown(
-            """
-            <div class="help-box">
-            <div>・力関係：X＞Y＞Z＞X</div>
-            <div>・役：同3枚 ＞ 全部違う ＞ 2枚+1枚</div>
-            <div>・同役はマジョリティ勝負</div>
-            <hr style="margin:4px 0;" />
-            <div>・地獄篇以上は交換必須</div>
-            </div>
-            """,
-            unsafe_allow_html=True,
-        )
+        st.markdown(HELP_BOX_HTML, unsafe_allow_html=True)
 
 # -----------------------------------------------------------------------------
 # 結果画面
 # -----------------------------------------------------------------------------
+elif st.session_state.game_state == 'result' and lite_render:
+    render_result_lite(settle_result())
+
 elif st.session_state.game_state == 'result':
-    result = compare_hands(st.session_state.player_hand, st.session_state.cpu_hand)
-    
-    # 勝利時のカウントアップは一度だけ実行
-    if result == 1 and not st.session_state.result_processed:
-        st.session_state.win_count += 1
-        st.session_state.result_processed = True
+    result = settle_result()
+    view = get_round_view()
     
     st.markdown("## 🎯 対戦結果")
     st.markdown("---")
 
     # 交換ログ（交換したのに変わって見えない、位置が違う等の検証用）
     if st.session_state.get("last_exchange"):
-        log = st.session_state.last_exchange
-        msg = (
-            f"交換ログ: あなた[{log['player_pos']}] {log['before_player']} ↔ "
-            f"CPU[{log['cpu_pos']}] {log['before_cpu']}"
-        )
-        if log.get("no_visible_change"):
-            msg += "（同じカード同士なので見た目は変わりません）"
-        st.info(msg)
+        st.info(format_exchange_log(st.session_state.last_exchange))
     else:
         st.caption("交換ログ: 今回は交換なし")
+    if st.session_state.get("cpu_exchange"):
+        st.warning(format_cpu_exchange_log(st.session_state.cpu_exchange))
     
     # CPUの手札
     st.markdown("### 🤖 CPUの手札")
-    st.markdown(display_cards(st.session_state.cpu_hand), unsafe_allow_html=True)
-    st.markdown(f"**役: {get_rank_name(st.session_state.cpu_hand)}**")
+    st.markdown(view['cpu_cards'], unsafe_allow_html=True)
+    st.markdown(f"**役: {view['cpu_rank_name']}**")
     
     # プレイヤーの手札
     st.markdown("### 🎴 あなたの手札")
-    st.markdown(display_cards(st.session_state.player_hand), unsafe_allow_html=True)
-    st.markdown(f"**役: {get_rank_name(st.session_state.player_hand)}**")
+    st.markdown(view['player_cards'], unsafe_allow_html=True)
+    st.markdown(f"**役: {view['player_rank_name']}**")
     st.markdown("---")
     
     # 勝敗表示
@@ -559,15 +979,8 @@ elif st.session_state.game_state == 'result':
         st.markdown('<div class="win-text">🎉 勝利！！ 🎉</div>', unsafe_allow_html=True)
         
         # 難易度変更通知
-        milestone_messages = {
-            10: ("warning", "🔥 やりがいモード突入！ヒントが減ります..."),
-            30: ("warning", "🔥🔥 挑戦モード突入！カード開示がなくなります..."),
-            50: ("warning", "🔥🔥🔥 鬼モード突入！役のヒントが曖昧に..."),
-            100: ("error", "💀 地獄篇突入！交換は必須になります..."),
-            200: ("error", "👹 無限地獄篇突入！CPUが嘘をつくようになります..."),
-        }
-        if st.session_state.win_count in milestone_messages:
-            msg_type, msg = milestone_messages[st.session_state.win_count]
+        if st.session_state.win_count in MILESTONE_MESSAGES:
+            msg_type, msg = MILESTONE_MESSAGES[st.session_state.win_count]
             getattr(st, msg_type)(msg)
         
         st.markdown(f'<div class="result-text">🏆 {st.session_state.win_count} 連勝！</div>', unsafe_allow_html=True)
@@ -598,8 +1011,18 @@ elif st.session_state.game_state == 'result':
 # -----------------------------------------------------------------------------
 # フッター
 # -----------------------------------------------------------------------------
-st.markdown("---")
-st.markdown(
-    "<div style='text-align: center; color: #888;'>X/Y/Z カード対戦ゲーム v1.1</div>",
-    unsafe_allow_html=True
-)
+if lite_render:
+    st.markdown("<hr/>" + FOOTER_HTML, unsafe_allow_html=True)
+else:
+    st.markdown("---")
+    st.markdown(FOOTER_HTML, unsafe_allow_html=True)
+
+# メモリレポート（XYZ_MEMORY_REPORT=1 のサーバーで ?mem=1 のときだけ表示）
+if MEMORY_REPORT and st.query_params.get("mem") == "1":
+    st.code(get_session_meter().format_report())
+
+# 連勝をサーバー再起動後も残す
+save_snapshot()
+# 放置されたセッションは、このセッション自身の定期的なフラグメントの再実行で縮める
+session_heartbeat()
+get_session_meter().end(script_ctx.session_id, script_ctx.session_state)
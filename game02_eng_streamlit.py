@@ -3,9 +3,18 @@ X/Y/Z Card Battle - Streamlit (English)
 """
 
 import streamlit as st
+import os
 import random
 import urllib.parse
 
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from card_shoe import Shoe, rank_probabilities
+from cpu_counter import choose_counter
+from game_snapshot import SnapshotStore, is_client_token, new_client_token
+from game_token import RevisionFloor, decode_state_token, encode_state_token, newer_snapshot
+from session_memory import SessionMeter
+
 # Page config
 st.set_page_config(
     page_title="X/Y/Z Card Battle",
@@ -129,6 +138,14 @@ WINS_AGAINST = {'X': 'Y', 'Y': 'Z', 'Z': 'X'}
 POSITION_TO_INDEX = {"Left": 0, "Middle": 1, "Right": 2}
 APP_URL = "https://testgame0125.streamlit.app"
 SHARE_HASHTAG = "#XYZCardBattle"
+SNAPSHOT_PATH = os.environ.get("XYZ_SNAPSHOT_PATH_EN", "xyz_snapshots_en.bin")
+# Revision floor shared by all replicas (not shared when unset; see game_token)
+REVISION_FLOOR_PATH = os.environ.get("XYZ_REVISION_FLOOR_PATH_EN")
+IDLE_SECONDS = float(os.environ.get("XYZ_IDLE_SECONDS", "600"))
+# The ?mem=1 report is only served when XYZ_MEMORY_REPORT=1 (admin servers)
+MEMORY_REPORT = os.environ.get("XYZ_MEMORY_REPORT") == "1"
+# Title-screen options (also the checkbox widget keys)
+OPTION_KEYS = ('cpu_counter', 'shoe_mode', 'counting_hint')
 
 DIFFICULTY_LEVELS = [
     (10, "Easy", "🟢"),
@@ -142,10 +159,19 @@ DIFFICULTY_LEVELS = [
 # =============================================================================
 # Game logic
 # =============================================================================
-def deal_hand():
+def deal_hand(shoe=None):
+    if shoe is not None:
+        return shoe.deal_hand()
     return [random.choice(CARDS) for _ in range(3)]
 
 
+def deal_round(shoe=None):
+    # A shoe only reshuffles before dealing both hands, never between them
+    if shoe is not None:
+        return shoe.deal_round()
+    return deal_hand(), deal_hand()
+
+
 def get_hand_rank(hand):
     unique_count = len(set(hand))
     return {1: 3, 3: 2, 2: 1}[unique_count]
@@ -188,14 +214,23 @@ def get_rank_name(hand):
 # =============================================================================
 # CPU helpers
 # =============================================================================
-def get_cpu_comment(hand, win_count):
+def roll_cpu_lie(win_count):
+    # Decided once per deal and saved with the round, so reloading can't re-roll it.
+    # 0 means no lie, 1-4 picks which lie the CPU tells (Endless Hell: 30%)
+    mode, _ = get_difficulty_mode(win_count)
+    if mode == "Endless Hell" and random.random() < 0.3:
+        return random.randint(1, 4)
+    return 0
+
+
+def get_cpu_comment(hand, win_count, lie=0):
     mode, _ = get_difficulty_mode(win_count)
     majority = get_majority(hand)
     rank = get_hand_rank(hand)
 
-    if mode == "Endless Hell" and random.random() < 0.3:
-        majority = random.choice([c for c in CARDS if c != majority])
-        rank = random.choice([r for r in [1, 2, 3] if r != rank])
+    if lie:
+        majority = [c for c in CARDS if c != majority][(lie - 1) % 2]
+        rank = [r for r in [1, 2, 3] if r != rank][(lie - 1) // 2]
 
     if rank == 2:
         return "\"Well, not bad.\""
@@ -236,10 +271,67 @@ def display_cards(hand):
     return f'<div style="text-align: center;">{cards_html}</div>'
 
 
+def build_round_view(player_hand, cpu_hand, win_count, hint=None, lie=0):
+    # Computed once per deal / exchange; passing the previous view as hint keeps
+    # the CPU comment and reveal. lie is the round's saved roll_cpu_lie value, so
+    # a view rebuilt after a reload shows the same comment
+    if hint is None:
+        hint = {
+            'cpu_comment': get_cpu_comment(cpu_hand, win_count, lie),
+            'reveal': get_card_reveal(cpu_hand, win_count),
+        }
+    return {
+        'cpu_comment': hint['cpu_comment'],
+        'reveal': hint['reveal'],
+        'player_rank': get_hand_rank(player_hand),
+        'cpu_rank': get_hand_rank(cpu_hand),
+        'player_rank_name': get_rank_name(player_hand),
+        'cpu_rank_name': get_rank_name(cpu_hand),
+        'player_cards': display_cards(player_hand),
+        'cpu_cards': display_cards(cpu_hand),
+        'outcome': compare_hands(player_hand, cpu_hand),
+    }
+
+
+def get_round_view():
+    if st.session_state.get('round_view') is None:
+        st.session_state.round_view = build_round_view(
+            st.session_state.player_hand,
+            st.session_state.cpu_hand,
+            st.session_state.win_count,
+            lie=st.session_state.cpu_lie,
+        )
+    return st.session_state.round_view
+
+
+def get_counting_hint(shoe, cpu_hand):
+    # Card counting hint: the CPU's rank odds from the cards the player hasn't seen
+    counts = shoe.unseen_counts(cpu_hand)
+    probs = rank_probabilities(counts)
+    return (
+        f"🃏 Unseen cards X:{counts[0]} Y:{counts[1]} Z:{counts[2]} "
+        f"({shoe.remaining} left in the shoe) / CPU three of a kind {probs[3]:.0%}, "
+        f"all different {probs[2]:.0%}, two + one {probs[1]:.0%}"
+    )
+
+
+def get_shoe_hint():
+    # None when the hint is off; recomputed from the shoe after a restore
+    if st.session_state.get('shoe_hint') is None:
+        shoe = st.session_state.get('shoe')
+        if shoe is not None and st.session_state.counting_hint and st.session_state.game_state == 'playing':
+            st.session_state.shoe_hint = get_counting_hint(shoe, st.session_state.cpu_hand)
+    return st.session_state.shoe_hint
+
+
 def build_share_text(win_count, result_label):
     return f"{result_label}! My streak is {win_count} wins. {SHARE_HASHTAG}"
 
 
+def format_cpu_exchange_log(log):
+    return f"CPU counter: CPU[{log['cpu_pos']}] {log['before_cpu']} ↔ You[{log['player_pos']}] {log['before_player']}"
+
+
 def render_share_section(win_count, result_label):
     share_text = build_share_text(win_count, result_label)
     tweet_text = urllib.parse.quote(share_text)
@@ -256,6 +348,7 @@ def render_share_section(win_count, result_label):
         "Instagram caption (copy & paste)",
         value=f"{share_text} {APP_URL}",
         label_visibility="collapsed",
+        key="share_caption",
     )
 
 
@@ -269,17 +362,90 @@ def init_session_state():
         'player_hand': [],
         'cpu_hand': [],
         'result_processed': False,
+        'revision': 0,
+        'cpu_lie': 0,
+        'round_view': None,
+        'cpu_counter': False,
+        'cpu_exchange': None,
+        'shoe_mode': False,
+        'counting_hint': False,
+        'shoe': None,
+        'shoe_hint': None,
     }
     for key, value in defaults.items():
         if key not in st.session_state:
             st.session_state[key] = value
+    # Streamlit drops a keyed widget's value on screens that don't render it, so write the options back
+    for key in OPTION_KEYS:
+        st.session_state[key] = st.session_state[key]
+
+    if 'client_token' not in st.session_state:
+        restore_snapshot(defaults)
+
+
+@st.cache_resource
+def get_snapshot_store():
+    return SnapshotStore(SNAPSHOT_PATH)
+
+
+@st.cache_resource
+def get_revision_floor():
+    return RevisionFloor(REVISION_FLOOR_PATH)
+
+
+def restore_snapshot(keys):
+    # Use whichever is newer: the local snapshot saved under ?sid= or the signed
+    # state token (?s=), which lets any replica resume the round. A token older
+    # than the snapshot or the shared revision floor (e.g. a bookmarked URL) is ignored
+    token = st.query_params.get("sid")
+    if not is_client_token(token):  # missing or malformed (e.g. edited by hand): issue a new one
+        token = new_client_token()
+        st.query_params["sid"] = token
+    st.session_state.client_token = token
+
+    positions = list(POSITION_TO_INDEX)
+    snapshot = newer_snapshot(
+        get_snapshot_store().restore(token, positions=positions),
+        decode_state_token(st.query_params.get("s", ""), token, positions=positions),
+        floor=get_revision_floor().get(token),
+    )
+    if snapshot:
+        for key in keys:
+            st.session_state[key] = snapshot.get(key)
+
+
+def save_snapshot():
+    client_token = st.session_state.client_token
+    revision = get_snapshot_store().save(client_token, st.session_state)
+    if revision != st.session_state.revision:
+        get_revision_floor().raise_to(client_token, revision)  # Other replicas reject older tokens too
+    st.session_state.revision = revision
+
+    state_token = encode_state_token(st.session_state, client_token)
+    if st.query_params.get("s") != state_token:
+        st.query_params["s"] = state_token
 
 
 def start_new_round():
-    st.session_state.player_hand = deal_hand()
-    st.session_state.cpu_hand = deal_hand()
+    shoe = None
+    if st.session_state.shoe_mode:
+        if st.session_state.get('shoe') is None:
+            st.session_state.shoe = Shoe()
+        shoe = st.session_state.shoe
+    st.session_state.player_hand, st.session_state.cpu_hand = deal_round(shoe)
+    st.session_state.shoe_hint = None
+    if shoe is not None and st.session_state.counting_hint:
+        st.session_state.shoe_hint = get_counting_hint(shoe, st.session_state.cpu_hand)
     st.session_state.game_state = 'playing'
     st.session_state.result_processed = False
+    st.session_state.cpu_exchange = None
+    st.session_state.cpu_lie = roll_cpu_lie(st.session_state.win_count)
+    st.session_state.round_view = build_round_view(
+        st.session_state.player_hand,
+        st.session_state.cpu_hand,
+        st.session_state.win_count,
+        lie=st.session_state.cpu_lie,
+    )
 
 
 def reset_game():
@@ -288,8 +454,59 @@ def reset_game():
     st.session_state.player_hand = []
     st.session_state.cpu_hand = []
     st.session_state.result_processed = False
+    st.session_state.cpu_exchange = None
+    st.session_state.round_view = None
+    st.session_state.shoe = None  # A new game gets a fresh shoe
+    st.session_state.shoe_hint = None
+
+
+def apply_cpu_counter(known):
+    # In counter mode the CPU swaps one card back after the player acts, then the view is rebuilt.
+    # known is the player's card the CPU knows about as (index, card), or None
+    hint = get_round_view()
+    st.session_state.cpu_exchange = None
+    if st.session_state.cpu_counter:
+        counter = choose_counter(st.session_state.cpu_hand, known)
+        if counter is not None:
+            positions = list(POSITION_TO_INDEX)
+            cpu_idx, player_idx = counter
+            player_hand, cpu_hand = st.session_state.player_hand, st.session_state.cpu_hand
+            st.session_state.cpu_exchange = {
+                'cpu_pos': positions[cpu_idx],
+                'player_pos': positions[player_idx],
+                'before_cpu': cpu_hand[cpu_idx],
+                'before_player': player_hand[player_idx],
+            }
+            player_hand[player_idx], cpu_hand[cpu_idx] = cpu_hand[cpu_idx], player_hand[player_idx]
+
+    st.session_state.round_view = build_round_view(
+        st.session_state.player_hand, st.session_state.cpu_hand, st.session_state.win_count, hint=hint
+    )
+
+
+@st.cache_resource
+def get_session_meter():
+    return SessionMeter(
+        extra_keys=[
+            "round_view", "cpu_exchange", "shoe_hint",
+            "player_choice", "cpu_choice", "share_caption",
+        ],
+        idle_seconds=IDLE_SECONDS,
+        positions=list(POSITION_TO_INDEX),
+        trace=os.environ.get("XYZ_MEMORY_TRACE") == "1",
+    )
 
 
+@st.fragment(run_every=get_session_meter().compact_interval)
+def session_heartbeat():
+    # Reruns every compact_interval in this session's own thread and compacts it once it is idle
+    ctx = get_script_run_ctx()
+    get_session_meter().heartbeat(ctx.session_id, ctx.session_state)
+
+
+# Idle sessions that were compacted are inflated here
+script_ctx = get_script_run_ctx()
+get_session_meter().begin(script_ctx.session_id, script_ctx.session_state)
 init_session_state()
 
 # =============================================================================
@@ -348,6 +565,10 @@ if st.session_state.game_state == 'title':
         """)
 
     st.markdown("---")
+    st.checkbox("🤖 CPU counter mode (after your exchange, the CPU swaps one card back)", key="cpu_counter")
+    st.checkbox("🃏 Shoe mode (deal from a 6-deck shoe, reshuffled once 3/4 is used)", key="shoe_mode")
+    if st.session_state.shoe_mode:
+        st.checkbox("🔢 Show card counting hint", key="counting_hint")
     if st.button("🎮 Start Game", type="primary", use_container_width=True):
         start_new_round()
         st.rerun()
@@ -355,6 +576,7 @@ if st.session_state.game_state == 'title':
 # Gameplay
 elif st.session_state.game_state == 'playing':
     mode, mode_icon = get_difficulty_mode(st.session_state.win_count)
+    view = get_round_view()
 
     st.markdown(
         f"### Round {st.session_state.win_count + 1}  {mode_icon} {mode} ({st.session_state.win_count} wins)"
@@ -365,17 +587,18 @@ elif st.session_state.game_state == 'playing':
     with hand_col1:
         st.markdown("**🎴 Your hand**")
     with hand_col2:
-        st.markdown(display_cards(st.session_state.player_hand), unsafe_allow_html=True)
-    st.markdown(f"**Hand: {get_rank_name(st.session_state.player_hand)}**")
+        st.markdown(view['player_cards'], unsafe_allow_html=True)
+    st.markdown(f"**Hand: {view['player_rank_name']}**")
     st.markdown("---")
 
     cpu_col1, cpu_col2 = st.columns([1, 3])
     with cpu_col1:
         st.markdown("**🤖 CPU comment**")
     with cpu_col2:
-        cpu_comment = get_cpu_comment(st.session_state.cpu_hand, st.session_state.win_count)
-        st.markdown(f'<div class="cpu-comment">{cpu_comment}</div>', unsafe_allow_html=True)
-    st.markdown(get_card_reveal(st.session_state.cpu_hand, st.session_state.win_count))
+        st.markdown(f'<div class="cpu-comment">{view["cpu_comment"]}</div>', unsafe_allow_html=True)
+    st.markdown(view['reveal'])
+    if get_shoe_hint():
+        st.caption(get_shoe_hint())
     st.markdown("---")
 
     exchange_col, help_col = st.columns([3, 2])
@@ -387,10 +610,10 @@ elif st.session_state.game_state == 'playing':
         col1, col2 = st.columns(2)
         with col1:
             st.markdown("**Select your card:**")
-            player_choice = st.radio("Player", ["Left", "Middle", "Right"], horizontal=True, label_visibility="collapsed")
+            player_choice = st.radio("Player", ["Left", "Middle", "Right"], horizontal=True, label_visibility="collapsed", key="player_choice")
         with col2:
             st.markdown("**Select CPU card:**")
-            cpu_choice = st.radio("CPU", ["Left", "Middle", "Right"], horizontal=True, label_visibility="collapsed")
+            cpu_choice = st.radio("CPU", ["Left", "Middle", "Right"], horizontal=True, label_visibility="collapsed", key="cpu_choice")
 
         col1, col2 = st.columns(2)
         with col1:
@@ -399,12 +622,15 @@ elif st.session_state.game_state == 'playing':
                 player_idx = POSITION_TO_INDEX[player_choice]
                 st.session_state.player_hand[player_idx], st.session_state.cpu_hand[cpu_idx] = \
                     st.session_state.cpu_hand[cpu_idx], st.session_state.player_hand[player_idx]
+                # The CPU knows the card it just handed over
+                apply_cpu_counter(known=(player_idx, st.session_state.player_hand[player_idx]))
                 st.session_state.game_state = 'result'
                 st.rerun()
 
         with col2:
             if can_skip:
                 if st.button("⏭️ Battle without exchange", use_container_width=True):
+                    apply_cpu_counter(known=None)
                     st.session_state.game_state = 'result'
                     st.rerun()
             else:
@@ -427,7 +653,8 @@ elif st.session_state.game_state == 'playing':
 
 # Result
 elif st.session_state.game_state == 'result':
-    result = compare_hands(st.session_state.player_hand, st.session_state.cpu_hand)
+    view = get_round_view()
+    result = view['outcome']
 
     if result == 1 and not st.session_state.result_processed:
         st.session_state.win_count += 1
@@ -436,13 +663,16 @@ elif st.session_state.game_state == 'result':
     st.markdown("## 🎯 Result")
     st.markdown("---")
 
+    if st.session_state.get("cpu_exchange"):
+        st.warning(format_cpu_exchange_log(st.session_state.cpu_exchange))
+
     st.markdown("### 🤖 CPU hand")
-    st.markdown(display_cards(st.session_state.cpu_hand), unsafe_allow_html=True)
-    st.markdown(f"**Hand: {get_rank_name(st.session_state.cpu_hand)}**")
+    st.markdown(view['cpu_cards'], unsafe_allow_html=True)
+    st.markdown(f"**Hand: {view['cpu_rank_name']}**")
 
     st.markdown("### 🎴 Your hand")
-    st.markdown(display_cards(st.session_state.player_hand), unsafe_allow_html=True)
-    st.markdown(f"**Hand: {get_rank_name(st.session_state.player_hand)}**")
+    st.markdown(view['player_cards'], unsafe_allow_html=True)
+    st.markdown(f"**Hand: {view['player_rank_name']}**")
     st.markdown("---")
 
     if result == 1:
@@ -490,3 +720,13 @@ st.markdown(
     "<div style='text-align: center; color: #888;'>X/Y/Z Card Battle v1.1</div>",
     unsafe_allow_html=True
 )
+
+# Memory report (only with ?mem=1 on servers with XYZ_MEMORY_REPORT=1)
+if MEMORY_REPORT and st.query_params.get("mem") == "1":
+    st.code(get_session_meter().format_report())
+
+# Keep the streak across server restarts
+save_snapshot()
+# Idle sessions are compacted by their own periodic fragment rerun
+session_heartbeat()
+get_session_meter().end(script_ctx.session_id, script_ctx.session_state)
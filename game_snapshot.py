@@ -0,0 +1,306 @@
+"""
+X/Y/Z カード対戦ゲーム - セッションのスナップショット保存
+- ゲーム状態を17バイトのバイナリに詰める（保存するたびに進むリビジョン付き）
+- 書き込みはまとめて後からファイルへ追記（write-behind）
+- クライアントトークンをキーにして、サーバー再起動後も連勝を復元
+"""
+
+import atexit
+import logging
+import os
+import re
+import secrets
+import struct
+import threading
+
+from card_shoe import Shoe
+
+logger = logging.getLogger(__name__)
+
+CARDS = ['X', 'Y', 'Z']
+GAME_STATES = ['title', 'playing', 'result']
+SNAPSHOT_VERSION = 3
+
+# バージョン, 連勝数, 画面, フラグ, プレイヤー手札, CPU手札, 交換ログ, リビジョン, シューの残り枚数 X/Y/Z
+RECORD = struct.Struct('<BIBBBBBIBBB')
+# バージョンごとのレコード長（新しい項目は末尾に足し、古いレコードは0で埋めて読む）
+RECORD_SIZES = {1: 10, 2: 14, SNAPSHOT_VERSION: RECORD.size}
+NO_HAND = 0xFF
+FLAG_RESULT_PROCESSED = 0x01
+FLAG_HAS_EXCHANGE = 0x02
+FLAG_CPU_COUNTER = 0x04
+# フラグの3～5ビット目: そのラウンドのCPUの嘘（0 は嘘なし、1～4 は嘘の内容）
+LIE_SHIFT = 3
+LIE_MASK = 0b111
+FLAG_SHOE_MODE = 0x40
+FLAG_COUNTING_HINT = 0x80
+
+# new_client_token() が作るトークン（URL用Base64の16文字）
+CLIENT_TOKEN_PATTERN = re.compile(r'[A-Za-z0-9_-]{16}')
+
+# 手札 ⇔ 0～26 の整数コード（3進数で3桁）
+CODE_TO_HAND = [
+    (a, b, c) for a in CARDS for b in CARDS for c in CARDS
+]
+HAND_TO_CODE = {hand: code for code, hand in enumerate(CODE_TO_HAND)}
+
+
+# =============================================================================
+# エンコード / デコード
+# =============================================================================
+def encode_hand(hand):
+    """手札を0～26の整数コードに変換（空の手札はNO_HAND）"""
+    if not hand:
+        return NO_HAND
+    return HAND_TO_CODE[tuple(hand)]
+
+
+def decode_hand(code):
+    """整数コードを手札（リスト）に戻す"""
+    if code == NO_HAND:
+        return []
+    return list(CODE_TO_HAND[code])
+
+
+def encode_state(state, revision=None):
+    """
+    セッション状態（辞書風のオブジェクト）を17バイトに詰める
+    シューは残りカードの枚数だけを残す（並び順は復元時にシャッフルし直す。シューがなければ全部0）
+    revision を省略すると state の 'revision'（なければ0）を使う
+    """
+    if revision is None:
+        revision = state.get('revision', 0)
+    flags = 0
+    if state.get('result_processed'):
+        flags |= FLAG_RESULT_PROCESSED
+    if state.get('cpu_counter'):
+        flags |= FLAG_CPU_COUNTER
+    flags |= (state.get('cpu_lie') or 0) << LIE_SHIFT
+    if state.get('shoe_mode'):
+        flags |= FLAG_SHOE_MODE
+    if state.get('counting_hint'):
+        flags |= FLAG_COUNTING_HINT
+    shoe = state.get('shoe')
+    shoe_counts = shoe.counts if shoe is not None else (0, 0, 0)
+
+    # 交換ログ: 位置2ビット×2 + カード2ビット×2 = 1バイト
+    exchange = 0
+    log = state.get('last_exchange')
+    if log:
+        flags |= FLAG_HAS_EXCHANGE
+        exchange = (
+            log['player_idx']
+            | log['cpu_idx'] << 2
+            | CARDS.index(log['before_player']) << 4
+            | CARDS.index(log['before_cpu']) << 6
+        )
+
+    return RECORD.pack(
+        SNAPSHOT_VERSION,
+        state.get('win_count', 0),
+        GAME_STATES.index(state.get('game_state', 'title')),
+        flags,
+        encode_hand(state.get('player_hand')),
+        encode_hand(state.get('cpu_hand')),
+        exchange,
+        revision,
+        *shoe_counts,
+    )
+
+
+def upgrade_record(data):
+    """古い形式のレコードを今の形式にする（足りない項目は0）。知らない形式なら ValueError"""
+    if not data or RECORD_SIZES.get(data[0]) != len(data):
+        raise ValueError(f"未対応のスナップショット形式です: {data[:1].hex()}")
+    return bytes([SNAPSHOT_VERSION]) + data[1:] + bytes(RECORD.size - len(data))
+
+
+def record_revision(data):
+    """レコードのリビジョン（data が None なら0）"""
+    return RECORD.unpack(data)[7] if data else 0
+
+
+def decode_state(data, positions=("左", "まん中", "右")):
+    """レコードをセッション状態の辞書に戻す（positionsは交換ログの位置名）"""
+    if len(data) != RECORD.size or data[0] != SNAPSHOT_VERSION:
+        data = upgrade_record(data)
+    _, win_count, screen, flags, player_code, cpu_code, exchange, revision, *shoe_counts = RECORD.unpack(data)
+
+    player_hand = decode_hand(player_code)
+    cpu_hand = decode_hand(cpu_code)
+
+    last_exchange = None
+    if flags & FLAG_HAS_EXCHANGE:
+        player_idx = exchange & 0b11
+        cpu_idx = exchange >> 2 & 0b11
+        before_player = CARDS[exchange >> 4 & 0b11]
+        before_cpu = CARDS[exchange >> 6 & 0b11]
+        last_exchange = {
+            "player_pos": positions[player_idx],
+            "cpu_pos": positions[cpu_idx],
+            "player_idx": player_idx,
+            "cpu_idx": cpu_idx,
+            "before_player": before_player,
+            "before_cpu": before_cpu,
+            "after_player": before_cpu,
+            "after_cpu": before_player,
+            "no_visible_change": before_player == before_cpu,
+        }
+
+    return {
+        'game_state': GAME_STATES[screen],
+        'win_count': win_count,
+        'player_hand': player_hand,
+        'cpu_hand': cpu_hand,
+        'result_processed': bool(flags & FLAG_RESULT_PROCESSED),
+        'last_exchange': last_exchange,
+        'cpu_counter': bool(flags & FLAG_CPU_COUNTER),
+        'cpu_lie': flags >> LIE_SHIFT & LIE_MASK,
+        'revision': revision,
+        'shoe_mode': bool(flags & FLAG_SHOE_MODE),
+        'counting_hint': bool(flags & FLAG_COUNTING_HINT),
+        'shoe': Shoe.from_counts(shoe_counts) if any(shoe_counts) else None,
+    }
+
+
+def new_client_token():
+    """クライアントを識別するランダムなトークンを生成"""
+    return secrets.token_urlsafe(12)
+
+
+def is_client_token(token):
+    """new_client_token() が作る形式のトークンか（URLから受け取った値の検証用）"""
+    return isinstance(token, str) and CLIENT_TOKEN_PATTERN.fullmatch(token) is not None
+
+
+# =============================================================================
+# スナップショットストア
+# =============================================================================
+class SnapshotStore:
+    """
+    クライアントトークン → スナップショット（17バイト）の保存先
+    - 読み込みはメモリ上の辞書から（復元は数マイクロ秒）
+    - 書き込みは溜めておき、一定間隔または一定件数でファイルへ追記
+    - ファイルは「トークン長, トークン, レコード」の追記ログ
+    """
+
+    def __init__(self, path, flush_interval=2.0, batch_size=256):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._snapshots = {}  # 最新のスナップショット
+        self._pending = {}  # まだファイルに書いていない分
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+
+        self._load()
+
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def save(self, token, state):
+        """
+        状態を保存し、保存したリビジョンを返す
+        中身が変わったときだけリビジョンを1つ進める（変化がなければ何もしない）
+        """
+        if not is_client_token(token):
+            raise ValueError(f"クライアントトークンの形式が違います: {token!r}")
+        with self._lock:
+            current = self._snapshots.get(token)
+            revision = max(state.get('revision', 0), record_revision(current))
+            data = encode_state(state, revision)
+            if data == current:
+                return revision
+            revision += 1
+            data = encode_state(state, revision)
+            self._snapshots[token] = data
+            self._pending[token] = data
+            if len(self._pending) >= self.batch_size:
+                self._wakeup.set()
+        return revision
+
+    def restore(self, token, positions=("左", "まん中", "右")):
+        """保存済みの状態を返す（なければNone）"""
+        data = self._snapshots.get(token)
+        if data is None:
+            return None
+        return decode_state(data, positions)
+
+    def flush(self):
+        """溜まっている書き込みをファイルへ追記"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        chunks = []
+        for token, data in pending.items():
+            key = token.encode('ascii')
+            chunks.append(bytes([len(key)]) + key + data)
+        try:
+            with open(self.path, 'ab') as f:
+                f.write(b''.join(chunks))
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError:
+            # 書けなかった分を戻す（その間に保存された新しい状態が優先）
+            with self._lock:
+                self._pending = {**pending, **self._pending}
+            raise
+
+    def close(self):
+        """書き込みスレッドを止めて、残りを書き出す"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        self.flush()
+
+    def _flush_loop(self):
+        """一定間隔でflushするバックグラウンドスレッド"""
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:  # 書けなかった分は次の flush でもう一度書く（スレッドは止めない）
+                logger.exception("スナップショットの書き込みに失敗しました")
+
+    def _load(self):
+        """追記ログを読み込み、古いレコードが多ければ書き直す"""
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, 'rb') as f:
+            raw = f.read()
+
+        records = 0
+        pos = 0
+        while pos < len(raw):
+            key_len = raw[pos]
+            start = pos + 1 + key_len
+            size = RECORD_SIZES.get(raw[start]) if start < len(raw) else None
+            if size is None or start + size > len(raw):
+                break  # 書き込み途中で落ちた末尾（や読めない形式）は捨てる
+            token = raw[pos + 1:start].decode('ascii')
+            self._snapshots[token] = upgrade_record(raw[start:start + size])
+            records += 1
+            pos = start + size
+
+        # 同じトークンの古いレコードが半分以上なら詰め直す
+        if records > 2 * len(self._snapshots) or pos < len(raw):
+            self._compact()
+
+    def _compact(self):
+        """最新のレコードだけでファイルを書き直す"""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            for token, data in self._snapshots.items():
+                key = token.encode('ascii')
+                f.write(bytes([len(key)]) + key + data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
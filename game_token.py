@@ -0,0 +1,138 @@
+"""
+X/Y/Z カード対戦ゲーム - 暗号化・署名付きゲーム状態トークン
+- game_snapshot の17バイト表現を暗号化し、HMAC-SHA256（先頭12バイト）を付けてURL用Base64に
+- どのサーバー（レプリカ）でもトークンだけでセッションを復元できる
+- 連勝数の書き換えなど改ざんされたトークンは受け付けない
+- CPUの手札が読めないよう中身は暗号化する（署名をIVにした SIV 方式。同じ状態なら同じトークン）
+- クライアントトークン（?sid=）ごとに署名が変わるので、他のセッションのトークンは使えない
+- レコードのリビジョンより古いトークンは使わない（newer_snapshot）
+- クライアントトークンごとに、どこかのサーバーが保存した一番新しいリビジョン（下限）を
+  全台で共有するファイル（RevisionFloor）に残し、それより古いトークンは弾く（古いURLの再利用を防ぐ）
+
+注意: レプリカ間で同じ鍵を使うため、環境変数 XYZ_TOKEN_SECRET を全台に設定すること。
+      未設定の場合はプロセスごとのランダム鍵になり、そのプロセスでしか検証できない。
+      同じように XYZ_REVISION_FLOOR_PATH に全台から見える同じパスを設定すること。
+      未設定の場合は下限を共有できず、古いトークンを弾けるのはそのサーバーに新しいスナップショットがあるときだけ
+      （スナップショットを持たない別のレプリカでは、正しく署名された古いトークンも受け付けてしまう）。
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import sqlite3
+import threading
+
+from game_snapshot import RECORD, decode_state, encode_state
+
+TAG_SIZE = 12
+TOKEN_SIZE = RECORD.size + TAG_SIZE
+
+_secret = os.environ.get("XYZ_TOKEN_SECRET")
+SECRET_KEY = _secret.encode() if _secret else secrets.token_bytes(32)
+
+
+def _subkey(key, purpose):
+    """鍵から用途ごとの鍵（署名用・暗号化用）を作る"""
+    return hmac.new(key, purpose, hashlib.sha256).digest()
+
+
+def _sign(payload, client_token, key):
+    """クライアントトークン + ペイロードの署名（HMAC-SHA256の先頭TAG_SIZEバイト）"""
+    message = client_token.encode('ascii') + b'\0' + payload
+    return hmac.new(_subkey(key, b'sign'), message, hashlib.sha256).digest()[:TAG_SIZE]
+
+
+def _xor_keystream(data, tag, key):
+    """署名から作った鍵ストリームとXOR（暗号化と復号は同じ操作）"""
+    stream = hmac.new(_subkey(key, b'encrypt'), tag, hashlib.sha256).digest()
+    return bytes(a ^ b for a, b in zip(data, stream))
+
+
+def encode_state_token(state, client_token, key=SECRET_KEY):
+    """セッション状態を暗号化・署名付きトークン（39文字）に変換"""
+    payload = encode_state(state)
+    tag = _sign(payload, client_token, key)
+    raw = _xor_keystream(payload, tag, key) + tag
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def decode_state_token(token, client_token, key=SECRET_KEY, positions=("左", "まん中", "右")):
+    """
+    トークンを復号・検証してセッション状態の辞書に戻す
+    形式が違う・署名が合わない（別のクライアントトークンのものを含む）場合はNone
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+    except (ValueError, TypeError):
+        return None
+    if len(raw) != TOKEN_SIZE:
+        return None
+
+    encrypted, tag = raw[:RECORD.size], raw[RECORD.size:]
+    payload = _xor_keystream(encrypted, tag, key)
+    if not hmac.compare_digest(tag, _sign(payload, client_token, key)):
+        return None
+
+    try:
+        return decode_state(payload, positions)
+    except (ValueError, IndexError):
+        return None
+
+
+def newer_snapshot(stored, from_token, floor=0):
+    """
+    サーバーのスナップショットとトークンの状態から新しい方を返す
+    リビジョンが同じか古いトークン、下限（RevisionFloor）より古いトークンは使わない（巻き戻し防止）
+    下限より古いスナップショット（別のレプリカで先に進んだセッション）も使わない
+    """
+    if stored is not None and stored['revision'] < floor:
+        stored = None
+    if from_token is None or from_token['revision'] < floor:
+        return stored
+    if stored is None or from_token['revision'] > stored['revision']:
+        return from_token
+    return stored
+
+
+class RevisionFloor:
+    """
+    クライアントトークン → 保存された一番新しいリビジョン（全レプリカで共有する SQLite ファイル）
+    - 保存のたびに raise_to() で引き上げる（下がることはない）
+    - 復元のときに get() の値より古いトークンを newer_snapshot で弾く
+    - path が None なら何も覚えない（下限は常に0）
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._db = None
+        self._lock = threading.Lock()
+        if path is not None:
+            self._db = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('CREATE TABLE IF NOT EXISTS floors (sid TEXT PRIMARY KEY, revision INTEGER NOT NULL)')
+
+    def get(self, client_token):
+        """クライアントトークンの下限（知らなければ0）"""
+        if self._db is None:
+            return 0
+        with self._lock:
+            row = self._db.execute('SELECT revision FROM floors WHERE sid = ?', (client_token,)).fetchone()
+        return row[0] if row else 0
+
+    def raise_to(self, client_token, revision):
+        """下限を revision まで引き上げる（今の下限の方が大きければそのまま）"""
+        if self._db is None:
+            return
+        with self._lock:
+            self._db.execute(
+                'INSERT INTO floors (sid, revision) VALUES (?, ?) '
+                'ON CONFLICT(sid) DO UPDATE SET revision = max(revision, excluded.revision)',
+                (client_token, revision),
+            )
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
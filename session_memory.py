@@ -0,0 +1,194 @@
+"""
+X/Y/Z カード対戦ゲーム - セッションごとのメモリ計測とアイドルセッションの圧縮
+- 各セッションの状態・ウィジェットの値が何バイト使っているかを記録
+- tracemalloc で1回の再実行中に確保したメモリのピークを記録
+- 一定時間操作のないセッションは game_snapshot の17バイト表現に縮め、次の操作で元に戻す
+- プロセス内で大きいセッションから順にレポート
+- 他のセッションの状態には触らない。compact_idle() はロックの中で記録に「圧縮待ち」の印を付けるだけで、
+  実際に縮めるのはそのセッション自身のスレッド（heartbeat() を呼ぶ定期的なフラグメントの再実行）
+- セッションが生きているかは heartbeat() の間隔で見る（タブを閉じると止まるので、expire_seconds で記録を消す）
+
+注意: tracemalloc はプロセス全体で1つなので、同時に再実行しているセッションが
+      あるとピーク値には他のセッションの分も混ざる（目安として使うこと）。
+"""
+
+import sys
+import threading
+import time
+import tracemalloc
+
+from game_snapshot import decode_state, encode_state
+
+COMPACT_KEY = '_compact'
+
+# 17バイトに詰めて残すキー（圧縮時にはこれに extra_keys を加えて消す）
+STATE_KEYS = [
+    'game_state', 'win_count', 'player_hand', 'cpu_hand', 'result_processed', 'last_exchange', 'revision',
+    'cpu_lie', 'cpu_counter', 'shoe_mode', 'counting_hint', 'shoe',
+]
+
+
+def deep_sizeof(value, seen=None):
+    """オブジェクトが参照している中身も含めたおおよそのバイト数"""
+    if seen is None:
+        seen = set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += deep_sizeof(key, seen) + deep_sizeof(item, seen)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += deep_sizeof(item, seen)
+    return size
+
+
+class SessionMeter:
+    """
+    プロセス内の全セッションのメモリ使用量を記録し、アイドルセッションを圧縮する
+    - begin(): 再実行の最初に呼ぶ（圧縮されていれば元に戻す）
+    - end(): 再実行の最後に呼ぶ（キーごとのバイト数を記録）
+    - heartbeat(): 各セッションで compact_interval ごとに呼ぶ（圧縮待ちなら自分の状態を縮める）
+    """
+
+    def __init__(self, extra_keys=(), idle_seconds=600.0, compact_interval=30.0, expire_seconds=3600.0,
+                 positions=("左", "まん中", "右"), trace=False):
+        self.compact_keys = STATE_KEYS + list(extra_keys)
+        self.idle_seconds = idle_seconds
+        self.compact_interval = compact_interval
+        self.expire_seconds = expire_seconds
+        self.positions = positions
+        self._sessions = {}  # session_id -> 記録（辞書）
+        self._lock = threading.Lock()
+        self._last_compact = time.monotonic()
+
+        if trace and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def begin(self, session_id, state):
+        """再実行の開始: 圧縮済みなら状態を戻し、ピーク計測を始める"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                entry = {
+                    'bytes': {},
+                    'total': 0,
+                    'rerun_peak': 0,
+                    'compacted': 0,
+                    'start': 0,
+                }
+                self._sessions[session_id] = entry
+            entry['last_seen'] = entry['last_beat'] = now
+            entry['running'] = True
+            entry['pending'] = False  # 操作があったので圧縮しない
+
+            if COMPACT_KEY in state:
+                self._inflate(state)
+                entry['compacted'] = 0
+
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            entry['start'] = tracemalloc.get_traced_memory()[0]
+
+        if now - self._last_compact >= self.compact_interval:
+            self.compact_idle(now)
+
+    def end(self, session_id, state):
+        """再実行の終了: キーごとのバイト数と再実行中のピークを記録"""
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return
+
+        if tracemalloc.is_tracing():
+            entry['rerun_peak'] = tracemalloc.get_traced_memory()[1] - entry['start']
+
+        sizes = {key: deep_sizeof(value) for key, value in state.filtered_state.items()}
+        with self._lock:
+            entry['bytes'] = sizes
+            entry['total'] = sum(sizes.values())
+            entry['running'] = False
+
+    def compact_idle(self, now=None):
+        """
+        idle_seconds 以上操作のないセッションに圧縮待ちの印を付け、印を付けた数を返す
+        （状態には触らない。縮めるのはそのセッションの heartbeat()）
+        heartbeat が expire_seconds 以上止まっているセッション（タブを閉じた）の記録は消す
+        """
+        if now is None:
+            now = time.monotonic()
+        marked = 0
+        with self._lock:
+            self._last_compact = now
+            for session_id, entry in list(self._sessions.items()):
+                if now - entry['last_beat'] >= self.expire_seconds:
+                    del self._sessions[session_id]  # 終了したセッション
+                    continue
+                if entry['running'] or entry['compacted'] or entry['pending']:
+                    continue
+                if now - entry['last_seen'] >= self.idle_seconds:
+                    entry['pending'] = True
+                    marked += 1
+        return marked
+
+    def heartbeat(self, session_id, state):
+        """
+        セッション自身のスレッドから定期的に呼ぶ（操作とは数えない）
+        圧縮待ちの印があれば、ここで自分の状態を最小限に縮める。縮めたら True
+        """
+        now = time.monotonic()
+        if now - self._last_compact >= self.compact_interval:
+            self.compact_idle(now)  # 全員が放置していても印が付くように
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return False
+            entry['last_beat'] = now
+            if not entry['pending'] or entry['running']:
+                return False
+            entry['pending'] = False
+
+        snapshot = {key: state[key] for key in STATE_KEYS if key in state}
+        state[COMPACT_KEY] = encode_state(snapshot)
+        for key in self.compact_keys:
+            if key in state:
+                del state[key]
+
+        with self._lock:
+            entry['compacted'] = deep_sizeof(state[COMPACT_KEY])
+        return True
+
+    def report(self, top=10):
+        """大きいセッションから順に (session_id, 記録) のリストを返す"""
+        with self._lock:
+            rows = [(session_id, dict(entry)) for session_id, entry in self._sessions.items()]
+        rows.sort(key=lambda row: row[1]['compacted'] or row[1]['total'], reverse=True)
+        return rows[:top]
+
+    def format_report(self, top=10):
+        """report() を表示用のテキストにする"""
+        now = time.monotonic()
+        rows = self.report(top)
+        lines = [f"セッション数: {len(self._sessions)}"]
+        for session_id, entry in rows:
+            idle = now - entry['last_seen']
+            if entry['compacted']:
+                lines.append(f"{session_id[:8]}  圧縮済み {entry['compacted']}B  アイドル{idle:.0f}秒")
+                continue
+            largest = sorted(entry['bytes'].items(), key=lambda item: item[1], reverse=True)[:3]
+            detail = ", ".join(f"{key}={size}B" for key, size in largest)
+            lines.append(
+                f"{session_id[:8]}  {entry['total']}B  ピーク{entry['rerun_peak']}B  "
+                f"アイドル{idle:.0f}秒  ({detail})"
+            )
+        return "\n".join(lines)
+
+    def _inflate(self, state):
+        """圧縮された状態を元に戻す（ウィジェットは初期値に戻る）"""
+        data = state[COMPACT_KEY]
+        del state[COMPACT_KEY]
+        for key, value in decode_state(data, self.positions).items():
+            state[key] = value
@@ -0,0 +1,88 @@
+"""card_shoe: シューの枚数の数え方と役の確率"""
+
+import itertools
+import random
+from collections import Counter
+
+import pytest
+
+from card_shoe import CARDS, Shoe, rank_probabilities
+
+
+def counts_of(cards):
+    counter = Counter(cards)
+    return [counter[card] for card in CARDS]
+
+
+def test_new_shoe_counts():
+    shoe = Shoe(rng=random.Random(1))
+    assert shoe.counts == [24, 24, 24]
+    assert shoe.remaining == 72
+    assert counts_of(shoe.cards) == [24, 24, 24]
+    assert shoe.cut == 54
+
+
+def test_counts_follow_the_cards_drawn():
+    shoe = Shoe(rng=random.Random(2))
+    drawn = []
+    for _ in range(5):
+        player, cpu = shoe.deal_round()
+        drawn += player + cpu
+    assert shoe.remaining == 72 - 30
+    assert shoe.counts == [24 - n for n in counts_of(drawn)]
+    assert shoe.counts == counts_of(shoe.cards[shoe.pos:])
+
+
+def test_reshuffles_only_before_a_round():
+    shoe = Shoe(rng=random.Random(3))
+    for _ in range(9):  # 54枚配ると、ちょうどシャッフル位置
+        shoe.deal_round()
+    assert shoe.pos == 54 and shoe.reshuffles == 0
+    shoe.deal_round()
+    assert shoe.reshuffles == 1
+    assert shoe.pos == 6
+    assert sum(shoe.counts) == 66
+
+
+def test_reshuffles_when_too_few_cards_remain():
+    shoe = Shoe(decks=1, penetration=1.0, rng=random.Random(4))
+    shoe.deal_round()
+    shoe.deal_round()
+    assert shoe.remaining == 0 and shoe.reshuffles == 0
+    shoe.deal_hand()
+    assert shoe.reshuffles == 1 and shoe.remaining == 9
+
+
+def test_from_counts_restores_counts_and_dealt_cards():
+    shoe = Shoe.from_counts([20, 13, 18], rng=random.Random(5))
+    assert shoe.counts == [20, 13, 18]
+    assert shoe.remaining == 51
+    assert counts_of(shoe.cards[shoe.pos:]) == [20, 13, 18]
+    assert counts_of(shoe.cards) == [24, 24, 24]
+
+
+@pytest.mark.parametrize('counts', [[25, 0, 0], [-1, 3, 3], [1, 2]])
+def test_from_counts_rejects_impossible_counts(counts):
+    with pytest.raises(ValueError):
+        Shoe.from_counts(counts)
+
+
+def test_unseen_counts_adds_the_hidden_hand():
+    shoe = Shoe.from_counts([10, 11, 12])
+    assert shoe.unseen_counts(['X', 'Z', 'Z']) == [11, 11, 14]
+    assert shoe.counts == [10, 11, 12]
+
+
+@pytest.mark.parametrize('counts', [[3, 3, 3], [5, 1, 2], [0, 4, 6], [2, 1, 0]])
+def test_rank_probabilities_match_enumeration(counts):
+    cards = [card for card, n in zip(CARDS, counts) for _ in range(n)]
+    ranks = Counter(len(set(hand)) for hand in itertools.combinations(cards, 3))
+    total = sum(ranks.values())
+    probs = rank_probabilities(counts)
+    assert probs[3] == pytest.approx(ranks[1] / total)
+    assert probs[2] == pytest.approx(ranks[3] / total)
+    assert probs[1] == pytest.approx(ranks[2] / total)
+
+
+def test_rank_probabilities_with_fewer_than_three_cards():
+    assert rank_probabilities([1, 1, 0]) == {3: 0.0, 2: 0.0, 1: 0.0}
@@ -0,0 +1,141 @@
+"""game_snapshot: 17バイトのレコードとスナップショットストア"""
+
+import pytest
+
+from card_shoe import Shoe
+from game_snapshot import (
+    RECORD,
+    SNAPSHOT_VERSION,
+    SnapshotStore,
+    decode_state,
+    encode_state,
+    is_client_token,
+    new_client_token,
+    record_revision,
+    upgrade_record,
+)
+
+
+def playing_state(**changes):
+    state = {
+        'game_state': 'playing',
+        'win_count': 123,
+        'player_hand': ['X', 'Y', 'Z'],
+        'cpu_hand': ['Z', 'Z', 'Y'],
+        'result_processed': False,
+        'last_exchange': None,
+        'cpu_counter': False,
+        'cpu_lie': 0,
+        'revision': 7,
+        'shoe_mode': False,
+        'counting_hint': False,
+        'shoe': None,
+    }
+    state.update(changes)
+    return state
+
+
+def test_round_trip():
+    state = playing_state()
+    data = encode_state(state)
+    assert len(data) == RECORD.size == 17
+    assert decode_state(data) == state
+
+
+def test_round_trip_flags_exchange_and_shoe():
+    shoe = Shoe()
+    shoe.deal_round()
+    exchange = {
+        "player_pos": "右", "cpu_pos": "左", "player_idx": 2, "cpu_idx": 0,
+        "before_player": "Y", "before_cpu": "X", "after_player": "X", "after_cpu": "Y",
+        "no_visible_change": False,
+    }
+    state = playing_state(
+        game_state='result', result_processed=True, last_exchange=exchange,
+        cpu_counter=True, cpu_lie=4, shoe_mode=True, counting_hint=True, shoe=shoe,
+    )
+    restored = decode_state(encode_state(state))
+    assert restored.pop('shoe').counts == shoe.counts
+    state.pop('shoe')
+    assert restored == state
+
+
+def test_empty_hands_and_positions():
+    state = playing_state(game_state='title', player_hand=[], cpu_hand=[], last_exchange={
+        "player_idx": 1, "cpu_idx": 1, "before_player": "Z", "before_cpu": "Z",
+    })
+    restored = decode_state(encode_state(state), positions=("Left", "Middle", "Right"))
+    assert restored['player_hand'] == [] and restored['cpu_hand'] == []
+    assert restored['last_exchange']['player_pos'] == "Middle"
+    assert restored['last_exchange']['no_visible_change']
+
+
+def test_revision_argument_overrides_state():
+    data = encode_state(playing_state(revision=3), revision=9)
+    assert record_revision(data) == 9
+    assert record_revision(None) == 0
+
+
+def test_version_1_record_is_upgraded():
+    # バージョン1は 連勝数〜交換ログ までの10バイト（フラグの上位ビットもリビジョンもない）
+    v1 = bytes([1]) + (42).to_bytes(4, 'little') + bytes([2, 0x01, 5, 13, 0])
+    upgraded = upgrade_record(v1)
+    assert upgraded[0] == SNAPSHOT_VERSION and len(upgraded) == RECORD.size
+    state = decode_state(v1)
+    assert state['win_count'] == 42
+    assert state['game_state'] == 'result'
+    assert state['result_processed']
+    assert state['revision'] == 0
+    assert state['shoe'] is None
+
+
+def test_unknown_record_is_rejected():
+    with pytest.raises(ValueError):
+        decode_state(bytes([99]) + bytes(16))
+    with pytest.raises(ValueError):
+        upgrade_record(bytes([1, 2, 3]))
+
+
+def test_client_token_format():
+    token = new_client_token()
+    assert is_client_token(token)
+    assert not is_client_token(token[:-1])
+    assert not is_client_token(token[:-1] + '!')
+    assert not is_client_token(None)
+
+
+def test_store_bumps_revision_only_on_change(tmp_path):
+    store = SnapshotStore(str(tmp_path / 'snapshots.bin'))
+    try:
+        token = new_client_token()
+        state = playing_state(revision=0)
+        assert store.save(token, state) == 1
+        assert store.save(token, dict(state, revision=1)) == 1
+        state = dict(state, revision=1, win_count=124)
+        assert store.save(token, state) == 2
+        assert store.restore(token)['win_count'] == 124
+        assert store.restore(new_client_token()) is None
+        with pytest.raises(ValueError):
+            store.save('not a token', state)
+    finally:
+        store.close()
+
+
+def test_store_survives_restart_and_truncated_tail(tmp_path):
+    path = str(tmp_path / 'snapshots.bin')
+    tokens = [new_client_token() for _ in range(3)]
+    store = SnapshotStore(path)
+    for i, token in enumerate(tokens):
+        store.save(token, playing_state(win_count=i, revision=0))
+    store.save(tokens[0], playing_state(win_count=10, revision=1))
+    store.close()
+
+    with open(path, 'ab') as f:
+        f.write(bytes([16]) + b'x' * 16 + bytes([SNAPSHOT_VERSION, 1, 2]))  # 書き込み途中で落ちた末尾
+
+    store = SnapshotStore(path)
+    try:
+        assert [store.restore(token)['win_count'] for token in tokens] == [10, 1, 2]
+        assert store.restore(tokens[0])['revision'] == 2
+    finally:
+        store.close()
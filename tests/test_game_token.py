@@ -0,0 +1,106 @@
+"""game_token: 暗号化・署名付きトークン、古いトークンの扱い"""
+
+import base64
+
+from game_snapshot import new_client_token
+from game_token import RevisionFloor, decode_state_token, encode_state_token, newer_snapshot
+
+KEY = b'k' * 32
+
+
+def make_state(**changes):
+    state = {
+        'game_state': 'playing',
+        'win_count': 57,
+        'player_hand': ['Y', 'Y', 'X'],
+        'cpu_hand': ['Z', 'X', 'Y'],
+        'revision': 8,
+    }
+    state.update(changes)
+    return state
+
+
+def flip_byte(token, index):
+    raw = bytearray(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    raw[index] ^= 0x01
+    return base64.urlsafe_b64encode(bytes(raw)).rstrip(b'=').decode('ascii')
+
+
+def test_round_trip():
+    sid = new_client_token()
+    token = encode_state_token(make_state(), sid, KEY)
+    assert len(token) == 39
+    restored = decode_state_token(token, sid, KEY)
+    assert restored['win_count'] == 57
+    assert restored['cpu_hand'] == ['Z', 'X', 'Y']
+    assert restored['revision'] == 8
+
+
+def test_same_state_gives_same_token_and_hides_the_hands():
+    sid = new_client_token()
+    token = encode_state_token(make_state(), sid, KEY)
+    assert token == encode_state_token(make_state(), sid, KEY)
+    other = encode_state_token(make_state(cpu_hand=['X', 'X', 'X']), sid, KEY)
+    # 中身は暗号化されているので、CPUの手札だけ違っても先頭から違う
+    assert token[:4] != other[:4]
+
+
+def test_tampered_token_is_rejected():
+    sid = new_client_token()
+    token = encode_state_token(make_state(), sid, KEY)
+    for index in (1, 10, 20):  # 連勝数・リビジョン・署名
+        assert decode_state_token(flip_byte(token, index), sid, KEY) is None
+
+
+def test_other_session_or_key_is_rejected():
+    sid = new_client_token()
+    token = encode_state_token(make_state(), sid, KEY)
+    assert decode_state_token(token, new_client_token(), KEY) is None
+    assert decode_state_token(token, sid, b'x' * 32) is None
+
+
+def test_malformed_token_is_rejected():
+    sid = new_client_token()
+    token = encode_state_token(make_state(), sid, KEY)
+    for bad in ('', 'abc', token[:-4], token + 'AAAA', '!' * 39):
+        assert decode_state_token(bad, sid, KEY) is None
+
+
+def test_newer_snapshot_ignores_older_tokens():
+    stored = make_state(revision=10)
+    assert newer_snapshot(stored, None) is stored
+    assert newer_snapshot(None, make_state(revision=3))['revision'] == 3
+    assert newer_snapshot(stored, make_state(revision=9)) is stored
+    assert newer_snapshot(stored, make_state(revision=10)) is stored
+    assert newer_snapshot(stored, make_state(revision=11))['revision'] == 11
+
+
+def test_newer_snapshot_applies_the_floor():
+    # スナップショットのないレプリカでも、下限より古いトークンは使わない
+    assert newer_snapshot(None, make_state(revision=8), floor=11) is None
+    assert newer_snapshot(None, make_state(revision=11), floor=11)['revision'] == 11
+    # 下限より古いスナップショット（別のレプリカで先に進んだ）も使わない
+    assert newer_snapshot(make_state(revision=6), make_state(revision=8), floor=11) is None
+    assert newer_snapshot(make_state(revision=6), make_state(revision=12), floor=11)['revision'] == 12
+
+
+def test_revision_floor_is_shared_through_the_file(tmp_path):
+    path = str(tmp_path / 'floor.db')
+    sid = new_client_token()
+    first, second = RevisionFloor(path), RevisionFloor(path)
+    try:
+        assert second.get(sid) == 0
+        first.raise_to(sid, 11)
+        first.raise_to(sid, 9)  # 下がらない
+        assert second.get(sid) == 11
+        assert second.get(new_client_token()) == 0
+    finally:
+        first.close()
+        second.close()
+
+
+def test_revision_floor_without_path_is_always_zero():
+    floor = RevisionFloor()
+    sid = new_client_token()
+    floor.raise_to(sid, 5)
+    assert floor.get(sid) == 0